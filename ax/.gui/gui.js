@@ -42,7 +42,9 @@ var hiddenTableData = [
 			{ "text": "FULLYBAYESIAN", "value": "FULLYBAYESIAN" },
 			//{ "text": "LEGACY_BOTORCH", "value": "LEGACY_BOTORCH" },
 			{ "text": "UNIFORM", "value": "UNIFORM" },
-			{ "text": "BO_MIXED", "value": "BO_MIXED" }
+			{ "text": "BO_MIXED", "value": "BO_MIXED" },
+			{ "text": "LOCAL_GP", "value": "LOCAL_GP" },
+			{ "text": "TPE", "value": "TPE" }
 		], "required": true,
 		info: `
 			<ul>
@@ -55,6 +57,8 @@ var hiddenTableData = [
 			    <!--<li>LEGACY_BOTORCH: ???</li>-->
 			    <li>UNIFORM: Random (uniformly distributed)</li>
 			    <li>BO_MIXED: '<i><a href='https://ax.dev/api/_modules/ax/modelbridge/dispatch_utils.html'>BO_MIXED</a></i>' optimizes all range parameters once for each combination of choice parameters, then takes the optimum of those optima. The cost associated with this method grows with the number of combinations, and so it is only used when the number of enumerated discrete combinations is below some maximum value.</li>
+			    <li>LOCAL_GP: A <i><a target='_blank' href='https://arxiv.org/pdf/1910.01739'>TuRBO</a></i>-style trust region around the best point so far, with a GP that is only fitted on the observations closest to it. Generation time stays roughly flat, recommended for runs with thousands of trials</li>
+			    <li>TPE: A <i><a target='_blank' href='https://papers.nips.cc/paper_files/paper/2011/hash/86e8f7ab32cfd12577bc2619bc635690-Abstract.html'>Tree-structured Parzen Estimator</a></i> that handles range and choice parameters natively and only needs numpy, no torch. Generates large batches in milliseconds, recommended for cheap evaluations and tens of thousands of trials</li>
 			</ul>
 `,
 		"help": "The model chosen here tries to make an informed choice (except SOBOL, which means random search) about where to look for new hyperparameters. Different models are useful for different optimization problems, though which is best for what is something that I still need to search exactly (TODO!)"
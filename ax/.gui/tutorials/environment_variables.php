@@ -71,6 +71,13 @@
 		<td><samp>export PRINT_SEPERATOR=1</samp></td>
 		<td>Prints a seperator line after OmniOpt2 runs (useful for automated tests)</td>
 	</tr>
+	<tr>
+		<th class="section-header invert_in_dark_mode" colspan=2>Set by OmniOpt2 for your program</th>
+	</tr>
+	<tr>
+		<td><samp>OO_RESULT_FILE</samp></td>
+		<td>Path of a file your program can write its results to as JSON, instead of printing <samp>RESULT: ...</samp> lines. See <a href="tutorials.php?tutorial=run_sh#result-file">Write results to a file instead of stdout</a></td>
+	</tr>
 	<tr>
 		<th class="section-header invert_in_dark_mode" colspan=2>Plot-Script</th>
 	</tr>
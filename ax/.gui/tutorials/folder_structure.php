@@ -44,13 +44,22 @@ twice, the paths <samp>runs/my_experiment/0</samp> and <samp>runs/my_experiment/
 
 <h4 id="get_next_trials"><samp>get_next_trials.csv</samp></h4>
 
-<p>A CSV file that contains the current time, the number of jobs <samp>ax_client.get_next_trials()</samp> got and the number it requested to get.</p>
+<p>A CSV file that contains the current time, the number of jobs <samp>ax_client.get_next_trials()</samp> got, the number it requested to get and how many seconds generating this batch took (see <samp>--generation_batch_mode</samp>).</p>
 
-<pre>2024-06-25 08:55:46,1,20
-2024-06-25 08:56:41,2,20
-2024-06-25 08:57:14,5,20
-2024-06-25 08:57:33,7,20
-2024-06-25 08:59:54,15,20
+<pre>2024-06-25 08:55:46, 1, 20, 0.412
+2024-06-25 08:56:41, 2, 20, 3.107
+2024-06-25 08:57:14, 5, 20, 7.845
+2024-06-25 08:57:33, 7, 20, 9.230
+2024-06-25 08:59:54, 15, 20, 21.604
+...</pre>
+
+<h4 id="generation_budget"><samp>generation_budget.csv</samp></h4>
+
+<p>Only written with <samp>--max_generation_seconds</samp>. One line per acquisition optimization: the time, the seconds left of the budget, the number of restarts and raw samples that were chosen to fit in it and how many seconds it took.</p>
+
+<pre>time,remaining_seconds,num_restarts,raw_samples,seconds
+2024-06-25 08:55:46,9.412,10,512,2.731
+2024-06-25 08:56:41,9.105,13,665,3.402
 ...</pre>
 
 <h4 id="worker_usage"><samp>worker_usage.csv</samp></h4>
@@ -113,6 +122,8 @@ nodes that have running jobs on it with ssh.</p>
 
 This will add the column <samp>OO_Info_outputname</samp> to the <samp>job_infos.csv</samp>, and each line will have it's own output values then.
 
+Programs that write their results to <samp>$OO_RESULT_FILE</samp> can put these values under <samp>info</samp> instead, see <a href="tutorials.php?tutorial=run_sh#result-file">Write results to a file instead of stdout</a>.
+
 <h4 id="oo_errors"><samp>oo_errors.txt</samp></h4>
 
 <p>This file, if it exists, contains a list of potential errors OmniOpt2 encountered during the run. If no errors were found, it may be empty or nonexistent.</p>
@@ -132,6 +143,10 @@ This will add the column <samp>OO_Info_outputname</samp> to the <samp>job_infos.
 └──────────────────┴───────┴─────────────┴─────────────┴────────┴────────────┘
 </pre>
 
+<h3 id="result_channel"><samp>result_channel</samp></h3>
+
+<p>Contains the files that are passed to your program in <samp>OO_RESULT_FILE</samp>. Each file is deleted once its results were read, so normally this folder is empty.</p>
+
 <h3 id="state_files"><samp>state_files</samp></h3>
 
 These files store some states used mainly to continue jobs. Not all of these files may be present.
@@ -142,7 +157,7 @@ These files store some states used mainly to continue jobs. Not all of these fil
 	<li><i>checkpoint.json.parameters.json</i>: A list of parameters for this run</li>
 	<li><i>env</i>: A dump of the environment, OmniOpt2 works in (useful for debugging)</li>
 	<li><i>experiment_name</i>: The name of this experiment</li>
-	<li><i>failed_jobs</i>: The number of failed jobs</li>
+	<li><i>failed_jobs</i>: The number of failed jobs (exported from <i>state.sqlite3</i> at the end of the run)</li>
 	<li><i>global_vars.json</i>: A variable that contains several global states that continued runs need to continue</li>
 	<li><i>gpus</i>: The number of GPUs this run has allocated per worker</li>
 	<li><i>joined_run_program</i>: The program string including parameters</li>
@@ -154,7 +169,9 @@ These files store some states used mainly to continue jobs. Not all of these fil
 	<li><i>phase_random_steps</i>: How many random steps have been generated</li>
 	<li><i>phase_systematic_steps</i>: How many non-random steps have been generated</li>
 	<li><i>run.sh</i>: A bash-file that allows you to re-run this program</li>
-	<li><i>submitted_jobs</i>: The number of submitted jobs</li>
+	<li><i>submitted_jobs</i>: The number of submitted jobs (exported from <i>state.sqlite3</i> at the end of the run)</li>
+	<li><i>state.sqlite3</i>: An SQLite database holding the job counters, phase counters, defective nodes and the mapping of job IDs to trial indices while the run is active</li>
+	<li><i>trial_events.csv</i>: One row per trial state change (running, completed, failed, abandoned), appended while the run is active. <samp>results.csv</samp> keeps one row per trial</li>
 	<li><i>result_names_overview.txt</i>: The rich overview-table of all result names</li>
 	<li><i>time</i>: The time this job-sbatch has allocated</li>
 	<li><i>defective_nodes</i>: A list of nodes that were detected as defective, i.e. a GPU was allocated but none was given. Requires <samp>--auto_exclude_defective_hosts</samp> to be set.</li>
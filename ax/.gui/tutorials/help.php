@@ -33,6 +33,16 @@
 				<td>A program that should be run. Use, for example, <samp>%(x)</samp> for the parameter named <i>x</i>.</td>
 				<td>-</td>
 			</tr>
+			<tr>
+				<td><samp>--run_function RUN_FUNCTION</samp></td>
+				<td>Instead of <samp>--run_program</samp>, a python function (<samp>package.module:function</samp> or <samp>path/to/file.py:function</samp>) that is imported once per worker process and called with the dict of parameters. It returns a float or a dict of result names. Every SLURM or local job is a new worker process, so the import is only reused across trials with <samp>--worker_pool_size</samp> (or in the main process with <samp>--batch_objective</samp>).</td>
+				<td>-</td>
+			</tr>
+			<tr>
+				<td><samp>--batch_objective</samp></td>
+				<td>With <samp>--run_function</samp>, call the function once per round with a 2D numpy array (one row per trial, one column per parameter in the order of <samp>--parameter</samp>) in the main process. It returns an array with one row per trial and one column per result name.</td>
+				<td><samp>False</samp></td>
+			</tr>
 			<tr>
 				<td><samp>--experiment_name EXPERIMENT_NAME</samp></td>
 				<td>Name of the experiment.</td>
@@ -51,7 +61,8 @@
 				<td>Experiment parameters in the formats: <br>
 					- <samp>&lt;NAME&gt; range &lt;NAME&gt; &lt;LOWER BOUND&gt; &lt;UPPER BOUND&gt; (&lt;INT, FLOAT&gt;) (&lt;log_scale: true or false, default false&gt;)</samp><br>
 					- <samp>&lt;NAME&gt; fixed &lt;NAME&gt; &lt;VALUE&gt;</samp><br>
-					- <samp>&lt;NAME&gt; choice &lt;NAME&gt; &lt;Comma-separated list of values&gt;</samp>
+					- <samp>&lt;NAME&gt; choice &lt;NAME&gt; &lt;Comma-separated list of values&gt;</samp><br>
+					- <samp>&lt;NAME&gt; fidelity &lt;NAME&gt; &lt;LOW&gt; &lt;HIGH&gt; (&lt;INT, FLOAT&gt;)</samp>: a fidelity like epochs or the dataset fraction. Lower values are cheaper hints, the optimization is about the highest one. The cost of a fidelity is learned from <samp>job_infos.csv</samp>.
 				</td>
 				<td>-</td>
 			</tr>
@@ -160,7 +171,7 @@
 			</tr>
 			<tr>
 				<td><samp>--model MODEL</samp></td>
-				<td>Use special models for nonrandom steps. Valid models are: SOBOL, GPEI, FACTORIAL, SAASBO, FULLYBAYESIAN, LEGACY_BOTORCH, BOTORCH_MODULAR, UNIFORM, BO_MIXED.</td>
+				<td>Use special models for nonrandom steps. Valid models are: SOBOL, GPEI, FACTORIAL, SAASBO, FULLYBAYESIAN, LEGACY_BOTORCH, BOTORCH_MODULAR, UNIFORM, BO_MIXED, LOCAL_GP, TPE.</td>
 				<td><samp>BOTORCH_MODULAR</samp></td>
 			</tr>
 			<tr>
@@ -240,6 +251,136 @@
 				<td>An orchestrator file.</td>
 				<td><samp>None</samp></td>
 			</tr>
+			<tr>
+				<td><samp>--generation_batch_mode GENERATION_BATCH_MODE</samp></td>
+				<td>How the candidates for all free slots are generated after the random phase: <samp>sequential</samp> fits the model once per candidate, each one conditioned on the previous ones; <samp>joint</samp> fits the model once and optimizes a joint q-batch acquisition for all of them.</td>
+				<td><samp>sequential</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--bulk_initial_design</samp></td>
+				<td>Generate all Sobol points of the random phase in one call before the search starts and hand them out without going through the generation strategy.</td>
+				<td><samp>False</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--local_gp_max_observations LOCAL_GP_MAX_OBSERVATIONS</samp></td>
+				<td>With <samp>--model=LOCAL_GP</samp>, fit the GP only on this many observations closest to the best point so far.</td>
+				<td><samp>300</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--tpe_gamma TPE_GAMMA</samp></td>
+				<td>With <samp>--model=TPE</samp>, the fraction of the best results that forms the good density (at most 25 results). Only the first of the <samp>--result_names</samp> is used to rank the results.</td>
+				<td><samp>0.1</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--tpe_nr_candidates TPE_NR_CANDIDATES</samp></td>
+				<td>With <samp>--model=TPE</samp>, the number of points sampled from the good density per new trial, the best ones by l(x)/g(x) are used.</td>
+				<td><samp>64</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--refit_every_n_results REFIT_EVERY_N_RESULTS</samp></td>
+				<td>Fully refit the surrogate model only after this many new results. In between, the model keeps the hyperparameters of the last fit and only its posterior is updated with the new results.</td>
+				<td><samp>1</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--refit_surprise_threshold REFIT_SURPRISE_THRESHOLD</samp></td>
+				<td>Refit the surrogate model early when the new results have a mean squared standardized error under the last fit above this value. <samp>0</samp> disables this check.</td>
+				<td><samp>4</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--early_stopping EARLY_STOPPING</samp></td>
+				<td>Cancel running trials whose <samp>OO_PROGRESS</samp> lines are worse than the other trials at the same step: <samp>median</samp> (best value so far worse than the median of the running averages) or <samp>percentile</samp> (current value among the worst <samp>--early_stopping_percentile</samp> percent).</td>
+				<td><samp>none</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--early_stopping_percentile EARLY_STOPPING_PERCENTILE</samp></td>
+				<td>With <samp>--early_stopping=percentile</samp>, stop trials among the worst this many percent at the same step.</td>
+				<td><samp>25</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--early_stopping_min_trials EARLY_STOPPING_MIN_TRIALS</samp></td>
+				<td>With <samp>--early_stopping</samp>, only compare a trial once at least this many other trials have reached its step.</td>
+				<td><samp>5</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--early_stopping_min_step EARLY_STOPPING_MIN_STEP</samp></td>
+				<td>With <samp>--early_stopping</samp>, never stop a trial before it reported this step.</td>
+				<td><samp>0</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--early_stopping_metric EARLY_STOPPING_METRIC</samp></td>
+				<td>With <samp>--early_stopping</samp>, the key of the <samp>OO_PROGRESS</samp> lines to compare, in the direction of the first result name. By default the first result name, or the only key besides <samp>step</samp>.</td>
+				<td><samp>None</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--cost_aware</samp></td>
+				<td>Choose new points by expected improvement per second of predicted runtime instead of expected improvement alone. The runtime is predicted from the <samp>run_time</samp> column of <samp>job_infos.csv</samp> by a nearest-neighbour kernel regression, not by a second model output. Nothing optimizes the ratio directly: the points of the model and <samp>--cost_aware_candidates</samp> quasi-random points are only re-ranked by it.</td>
+				<td><samp>False</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--cost_aware_candidates COST_AWARE_CANDIDATES</samp></td>
+				<td>With <samp>--cost_aware</samp>, the number of quasi-random candidates per free slot that compete with the points of the model.</td>
+				<td><samp>32</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--max_output_tail_lines MAX_OUTPUT_TAIL_LINES</samp></td>
+				<td>Number of lines at the end of stdout and stderr of each job that are kept in memory for the error report. The rest of the output is only written to the job's log files.</td>
+				<td><samp>200</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--result_cache_dir RESULT_CACHE_DIR</samp></td>
+				<td>Folder of a result cache that can be shared between runs. Parameter sets that were already evaluated with the same program string are not run again, their results are taken from the cache. Hits are marked in the <samp>OO_Info_result_cache</samp> column of <samp>job_infos.csv</samp> and keep the run time of the original evaluation. If several nodes share the folder, its file system needs working file locks, e.g. NFS with <samp>lockd</samp>, or writes from different nodes can corrupt the cache.</td>
+				<td><samp>None</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--result_cache_code_version RESULT_CACHE_CODE_VERSION</samp></td>
+				<td>With <samp>--result_cache_dir</samp>, a version of your code, e.g. a git hash. Results of other versions are not taken from the cache.</td>
+				<td><samp>None</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--result_cache_max_age_days RESULT_CACHE_MAX_AGE_DAYS</samp></td>
+				<td>With <samp>--result_cache_dir</samp>, results older than this many days are removed from the cache. <samp>0</samp> keeps them forever.</td>
+				<td><samp>90</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--result_cache_max_entries RESULT_CACHE_MAX_ENTRIES</samp></td>
+				<td>With <samp>--result_cache_dir</samp>, only keep this many of the most recently used results in the cache. <samp>0</samp> means no limit.</td>
+				<td><samp>100000</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--max_generation_seconds MAX_GENERATION_SECONDS</samp></td>
+				<td>Time budget in seconds for generating the new points of one call. The acquisition optimization uses fewer restarts and raw samples to fit in it, points that do not fit anymore are filled with quasi-random ones. <samp>0</samp> means no budget.</td>
+				<td><samp>0</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--max_generation_runtime_fraction MAX_GENERATION_RUNTIME_FRACTION</samp></td>
+				<td>With <samp>--max_generation_seconds</samp>, also limit the budget to this fraction of the mean runtime of the finished trials in <samp>job_infos.csv</samp>. <samp>0</samp> disables this.</td>
+				<td><samp>0.25</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--pregenerate_candidates PREGENERATE_CANDIDATES</samp></td>
+				<td>Keep this many candidates generated in a background thread, so a free slot gets a new parameter set without waiting for the model. 0 disables it.</td>
+				<td><samp>0</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--pregenerate_max_age PREGENERATE_MAX_AGE</samp></td>
+				<td>Discard a pre-generated candidate that is older than this many seconds.</td>
+				<td><samp>600</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--pregenerate_max_new_results PREGENERATE_MAX_NEW_RESULTS</samp></td>
+				<td>Discard a pre-generated candidate when more than this many new results arrived after it was generated.</td>
+				<td><samp>2</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--pregenerate_ignore_pending</samp></td>
+				<td>Generate pre-generated candidates without treating running and buffered trials as pending points (faster fits, but candidates may cluster).</td>
+				<td><samp>False</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--state_save_interval STATE_SAVE_INTERVAL</samp></td>
+				<td>Minimum number of seconds between two background saves of the checkpoint and state files. <samp>0</samp> saves synchronously after every finished job.</td>
+				<td><samp>10</samp></td>
+			</tr>
 			<tr class="section-header invert_in_dark_mode">
 				<td colspan="3">SLURM</td>
 			</tr>
@@ -308,6 +449,31 @@
 				<td>Number of GPUs.</td>
 				<td><samp>0</samp></td>
 			</tr>
+			<tr>
+				<td><samp>--local_process_pool</samp></td>
+				<td>Without SLURM (or with <samp>--force_local_execution</samp>), run up to <samp>--num_parallel_jobs</samp> trials at once as local processes. Each one is killed after <samp>--worker_timeout</samp> minutes.</td>
+				<td><samp>False</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--pin_cpus</samp></td>
+				<td>With <samp>--local_process_pool</samp>, pin each trial to its own set of <samp>--cpus_per_task</samp> CPUs.</td>
+				<td><samp>False</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--worker_pool_size WORKER_POOL_SIZE</samp></td>
+				<td>Start this many long-lived workers that pull parameter sets from a queue in the run folder instead of starting one job per trial. With this, <samp>--worker_timeout</samp> is the lifetime of each pool worker. 0 disables the pool.</td>
+				<td><samp>0</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--slurm_job_arrays</samp></td>
+				<td>Submit all trials of one generation round as a single job array (one <samp>sbatch</samp> call) instead of one job per trial.</td>
+				<td><samp>False</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--job_state_cache_seconds JOB_STATE_CACHE_SECONDS</samp></td>
+				<td>Minimum number of seconds between two bulk <samp>squeue</samp>/<samp>sacct</samp> queries for the states of all running jobs.</td>
+				<td><samp>10</samp></td>
+			</tr>
 			<tr class="section-header invert_in_dark_mode">
 				<td colspan="3">Installing</td>
 			</tr>
@@ -339,6 +505,16 @@
 				<td>Run simple internal tests.</td>
 				<td><samp>False</samp></td>
 			</tr>
+			<tr>
+				<td><samp>--log_level LOG_LEVEL</samp></td>
+				<td>Minimum level of messages written to the log file. One of <samp>debug</samp>, <samp>info</samp>, <samp>warning</samp> or <samp>error</samp>.</td>
+				<td><samp>debug</samp></td>
+			</tr>
+			<tr>
+				<td><samp>--debug_stack_traces</samp></td>
+				<td>Write the function stack of every log message to the log file. This is slow and also enabled by <samp>--debug</samp>.</td>
+				<td><samp>False</samp></td>
+			</tr>
 			<tr>
 				<td><samp>--raise_in_eval</samp></td>
 				<td>Raise a signal in eval (only useful for debugging and testing)</td>
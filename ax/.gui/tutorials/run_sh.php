@@ -126,3 +126,35 @@ print(f"RESULT: {loss}")
 	<li>Generates helpful usage messages if the arguments are incorrect or missing.</li>
 	<li>Supports optional arguments and more complex argument parsing needs.</li>
 </ul>
+
+<h2 id="intermediate-results">Report intermediate results for early stopping</h2>
+
+<p>With <samp>--early_stopping=median</samp> or <samp>--early_stopping=percentile</samp>, OmniOpt2 reads progress lines while your program is still running and cancels trials that are clearly worse than the other trials at the same step. Print one line per step, with the step and the value of the first result name:</p>
+
+<pre class="invert_in_dark_mode"><code class="language-python">for epoch in range(args.epochs):
+	loss = train_one_epoch()
+	print(f"OO_PROGRESS step={epoch} RESULT={loss}", flush=True)
+
+print(f"RESULT: {loss}")
+</code></pre>
+
+<p>Use <samp>--early_stopping_metric</samp> when the key is not the name of the first result. Trials that were stopped early are marked as <samp>EARLY_STOPPED</samp>, not as failed.</p>
+
+<h2 id="result-file">Write results to a file instead of stdout</h2>
+
+<p>OmniOpt2 passes the path of a new, empty file to every run of your program in the environment variable <samp>OO_RESULT_FILE</samp>. When your program writes its results there as JSON, they are taken from this file and the <samp>RESULT: ...</samp> lines in the stdout are not looked at. This also works with numbers like <samp>1.5e-3</samp>, and stray prints of your program cannot be mistaken for results. When the file is not written, the stdout is searched for results as before.</p>
+
+<p>Write one JSON object per line. Objects without a <samp>step</samp> contain the final results, one key per result name. Objects with a <samp>step</samp> are intermediate values, which are used by <samp>--early_stopping</samp>. Everything under <samp>info</samp> is written to <samp>job_infos.csv</samp>, like <samp>OO-Info</samp> lines:</p>
+
+<pre class="invert_in_dark_mode"><code class="language-python">import json
+import os
+
+with open(os.environ["OO_RESULT_FILE"], mode="a", encoding="utf-8") as f:
+	for epoch in range(args.epochs):
+		loss = train_one_epoch()
+		print(json.dumps({"step": epoch, "RESULT": loss}), file=f, flush=True)
+
+	print(json.dumps({"RESULT": loss, "info": {"epochs": args.epochs}}), file=f)
+</code></pre>
+
+<p>A single JSON object, or a list of objects, is also accepted. With multiple result names, use these names as keys, for example <samp>{"loss": 0.3, "runtime": 12.5}</samp>.</p>
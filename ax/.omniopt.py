@@ -49,6 +49,11 @@ try:
         import stat
         import pwd
         import signal
+        import atexit
+        import select
+        import struct
+        import ctypes
+        import ctypes.util
         import base64
 
         from pprint import pformat
@@ -57,6 +62,7 @@ try:
         import yaml
         import toml
         import csv
+        import sqlite3
 
         import rich
         from rich_argparse import RichHelpFormatter
@@ -71,6 +77,11 @@ try:
         from submitit import Job
 
         import threading
+        import functools
+        import contextlib
+        import collections
+        import io
+        from types import SimpleNamespace
         from concurrent.futures import ThreadPoolExecutor
 
         import importlib.util
@@ -81,6 +92,7 @@ try:
         from pathlib import Path
 
         import uuid
+        import hashlib
 
         import traceback
 
@@ -88,7 +100,6 @@ try:
         from pyfiglet import Figlet
 
         import psutil
-        import shutil
 
         from itertools import combinations
 
@@ -138,6 +149,7 @@ if not uuid_regex.match(run_uuid): # pragma: no cover
 JOBS_FINISHED: int = 0
 SHOWN_LIVE_SHARE_COUNTER: int = 0
 PD_CSV_FILENAME: str = "results.csv"
+TRIAL_EVENTS_CSV_FILENAME: str = "trial_events.csv"
 WORKER_PERCENTAGE_USAGE: list = []
 END_PROGRAM_RAN: bool = False
 ALREADY_SHOWN_WORKER_USAGE_OVER_TIME: bool = False
@@ -149,6 +161,87 @@ SHOWN_END_TABLE: bool = False
 max_eval: int = 1
 random_steps: int = 1
 progress_bar: Optional[tqdm] = None
+TRIAL_LEDGER: dict = {
+    "status": {},
+    "generation_method": {},
+    "status_counts": {},
+    "completed_generation_method_counts": {}
+}
+TRIAL_LEDGER_LOCK = threading.RLock()
+STATE_PERSISTER: dict = {
+    "dirty": threading.Event(),
+    "stop": threading.Event(),
+    "lock": threading.RLock(),
+    "thread": None,
+    "nr_notifications": 0,
+    "nr_snapshots": 0
+}
+AX_CLIENT_LOCK = threading.RLock()
+GENERATION_LOCK = threading.RLock()
+SURROGATE_REFIT_STATE: dict = {
+    "fitted_trial_indices": set(),
+    "conditioned_trial_indices": set(),
+    "state_dict": None,
+    "nr_full_fits": 0,
+    "nr_posterior_fits": 0,
+    "nr_surprise_refits": 0
+}
+EARLY_STOPPING_STATE: dict = {
+    "progress": {},
+    "read_offsets": {},
+    "partial_lines": {},
+    "nr_stopped": 0
+}
+JOB_INFOS_CACHE: dict = {
+    "size": -1,
+    "df": None
+}
+COST_AWARE_STATE: dict = {
+    "nr_selections": 0,
+    "nr_cheaper_than_model_choice": 0
+}
+GENERATION_BUDGET_STATE: dict = {
+    "deadline": None,
+    "seconds_per_restart": None,
+    "nr_budgeted_gens": 0,
+    "nr_quasi_random_fallbacks": 0
+}
+LOCAL_GP_STATE: dict = {
+    "length": 0.8,
+    "nr_successes": 0,
+    "nr_failures": 0,
+    "best_value": None,
+    "best_parameters": None,
+    "seen_trial_indices": set(),
+    "search_space": None
+}
+TPE_OBSERVATIONS: dict = {
+    "experiment": None,
+    "trial_indices": set(),
+    "parameters": [],
+    "values": []
+}
+INITIAL_DESIGN: dict = {
+    "queue": [],
+    "nr_generated": 0
+}
+CANDIDATE_BUFFER: dict = {
+    "candidates": [],
+    "lock": threading.Lock(),
+    "wakeup": threading.Event(),
+    "stop": threading.Event(),
+    "thread": None,
+    "nr_hits": 0,
+    "nr_misses": 0,
+    "nr_generated": 0,
+    "nr_stale": 0
+}
+TRIAL_EVENTS_WRITER: dict = {
+    "path": None,
+    "columns": [],
+    "nr_appended_rows": 0,
+    "nr_rewrites": 0
+}
 
 @beartype
 def get_current_run_folder() -> str:
@@ -170,7 +263,7 @@ dier: FunctionType = helpers.dier
 is_equal: FunctionType = helpers.is_equal
 is_not_equal: FunctionType = helpers.is_not_equal
 
-SUPPORTED_MODELS: list = ["SOBOL", "GPEI", "FACTORIAL", "SAASBO", "LEGACY_BOTORCH", "BOTORCH_MODULAR", "UNIFORM", "BO_MIXED"]
+SUPPORTED_MODELS: list = ["SOBOL", "GPEI", "FACTORIAL", "SAASBO", "LEGACY_BOTORCH", "BOTORCH_MODULAR", "UNIFORM", "BO_MIXED", "LOCAL_GP", "TPE"]
 
 ORCHESTRATE_TODO: dict = {}
 
@@ -207,11 +300,25 @@ logfile_worker_creation_logs: str = f'{log_uuid_dir}_worker_creation_logs'
 logfile_trial_index_to_param_logs: str = f'{log_uuid_dir}_trial_index_to_param_logs'
 LOGFILE_DEBUG_GET_NEXT_TRIALS: Union[str, None] = None
 
+LOG_LEVELS: dict = {
+    "debug": 10,
+    "info": 20,
+    "warning": 30,
+    "error": 40
+}
+LOG_STATE: dict = {
+    "level": LOG_LEVELS["debug"],
+    "stack_traces": False,
+    "handle": None,
+    "last_flush": 0.0,
+    "flush_interval": 5.0
+}
+
 @beartype
 def print_red(text: str) -> None:
     helpers.print_color("red", text)
 
-    print_debug(text)
+    print_log(text, "error")
 
     if get_current_run_folder():
         try:
@@ -229,16 +336,35 @@ def _debug(msg: str, _lvl: int = 0, eee: Union[None, str, Exception] = None) ->
         sys.exit(193)
 
     try:
-        with open(logfile, mode='a', encoding="utf-8") as f:
-            original_print(msg, file=f)
+        if LOG_STATE["handle"] is None:
+            LOG_STATE["handle"] = open(logfile, mode='a', encoding="utf-8", buffering=65536)
+
+        original_print(msg, file=LOG_STATE["handle"])
+
+        if time.time() - LOG_STATE["last_flush"] >= LOG_STATE["flush_interval"]:
+            flush_log_file()
     except FileNotFoundError: # pragma: no cover
         print_red("It seems like the run's folder was deleted during the run. Cannot continue.")
         sys.exit(99) # generalized code for run folder deleted during run
     except Exception as e: # pragma: no cover
         original_print("_debug: Error trying to write log file: " + str(e))
 
+        LOG_STATE["handle"] = None
+
         _debug(msg, _lvl + 1, e)
 
+@beartype
+def flush_log_file() -> None:
+    LOG_STATE["last_flush"] = time.time()
+
+    if LOG_STATE["handle"] is not None:
+        try:
+            LOG_STATE["handle"].flush()
+        except Exception as e: # pragma: no cover
+            original_print(f"flush_log_file: Error trying to flush log file: {e}")
+
+atexit.register(flush_log_file)
+
 @beartype
 def _get_debug_json(time_str: str, msg: str) -> str:
     stack = inspect.stack()
@@ -255,10 +381,20 @@ def _get_debug_json(time_str: str, msg: str) -> str:
     return json.dumps({"function_stack": function_stack, "time": time_str, "msg": msg}, indent=0).replace('\r', '').replace('\n', '')
 
 @beartype
-def print_debug(msg: str) -> None:
+def is_log_level_enabled(level: str) -> bool:
+    return LOG_LEVELS[level] >= LOG_STATE["level"]
+
+@beartype
+def print_log(msg: str, level: str = "debug") -> None:
+    if LOG_LEVELS[level] < LOG_STATE["level"]:
+        return
+
     time_str: str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    stack_trace_element = _get_debug_json(time_str, msg)
+    if LOG_STATE["stack_traces"]:
+        stack_trace_element = _get_debug_json(time_str, msg)
+    else:
+        stack_trace_element = json.dumps({"function_stack": [], "time": time_str, "level": level, "msg": msg}).replace('\r', '').replace('\n', '')
 
     msg = f"{stack_trace_element}"
 
@@ -267,6 +403,10 @@ def print_debug(msg: str) -> None:
 
     _debug(msg)
 
+@beartype
+def print_debug(msg: str) -> None:
+    print_log(msg, "debug")
+
 @beartype
 def my_exit(_code: int = 0) -> None:
     tb = traceback.format_exc()
@@ -283,19 +423,20 @@ def my_exit(_code: int = 0) -> None:
 
     print("Exit-Code: " + str(_code))
     print_debug("Exit-Code: " + str(_code))
+    flush_log_file()
     sys.exit(_code)
 
 @beartype
 def print_green(text: str) -> None:
     helpers.print_color("green", text)
 
-    print_debug(text)
+    print_log(text, "info")
 
 @beartype
 def print_yellow(text: str) -> None:
     helpers.print_color("yellow", f"⚠ {text}")
 
-    print_debug(text)
+    print_log(text, "warning")
 
 @beartype
 def get_min_max_from_file(continue_path: str, n: int, _default_min_max: str) -> str:
@@ -346,6 +487,8 @@ class ConfigLoader:
     tests: bool
     max_eval: int
     run_program: str
+    run_function: Optional[str]
+    batch_objective: bool
     orchestrator_file: Optional[str]
     run_dir: str
     ui_url: Optional[str]
@@ -356,6 +499,34 @@ class ConfigLoader:
     experiment_constraints: Optional[list[str]]
     stderr_to_stdout: bool
     worker_timeout: int
+    worker_pool_size: int
+    generation_batch_mode: str
+    bulk_initial_design: bool
+    refit_every_n_results: int
+    local_gp_max_observations: int
+    tpe_gamma: float
+    tpe_nr_candidates: int
+    refit_surprise_threshold: float
+    max_generation_seconds: float
+    max_output_tail_lines: int
+    result_cache_dir: Optional[str]
+    result_cache_code_version: Optional[str]
+    result_cache_max_age_days: float
+    result_cache_max_entries: int
+    cost_aware: bool
+    early_stopping: str
+    early_stopping_percentile: float
+    early_stopping_min_trials: int
+    early_stopping_min_step: float
+    early_stopping_metric: Optional[str]
+    cost_aware_candidates: int
+    max_generation_runtime_fraction: float
+    pregenerate_candidates: int
+    pregenerate_max_age: float
+    pregenerate_max_new_results: int
+    pregenerate_ignore_pending: bool
+    local_process_pool: bool
+    pin_cpus: bool
     disable_search_space_exhaustion_detection: bool
     slurm_signal_delay_s: int
     gridsearch: bool
@@ -367,6 +538,11 @@ class ConfigLoader:
     continue_previous_job: Optional[str]
     minkowski_p: float
     signed_weighted_euclidean_weights: str
+    log_level: str
+    debug_stack_traces: bool
+    job_state_cache_seconds: float
+    slurm_job_arrays: bool
+    state_save_interval: float
 
     @beartype
     def __init__(self) -> None:
@@ -397,10 +573,12 @@ class ConfigLoader:
         required.add_argument('--num_random_steps', help='Number of random steps to start with', type=int, default=20)
         required.add_argument('--max_eval', help='Maximum number of evaluations', type=int)
         required.add_argument('--run_program', action='append', nargs='+', help='A program that should be run. Use, for example, $x for the parameter named x.', type=str)
+        required.add_argument('--run_function', help='Instead of --run_program, a python function (package.module:function or path/to/file.py:function) that is imported once per worker process and called with the dict of parameters. It returns a float or a dict of result names. Every SLURM or local job is a new worker process, so the import is only reused across trials with --worker_pool_size (or in the main process with --batch_objective).', type=str, default=None)
+        required.add_argument('--batch_objective', help='With --run_function, call the function once per round with a 2D numpy array (one row per trial, one column per parameter in the order of --parameter) in the main process. It returns an array with one row per trial and one column per result name.', action='store_true', default=False)
         required.add_argument('--experiment_name', help='Name of the experiment.', type=str)
         required.add_argument('--mem_gb', help='Amount of RAM for each worker in GB (default: 1GB)', type=float, default=1)
 
-        required_but_choice.add_argument('--parameter', action='append', nargs='+', help="Experiment parameters in the formats (options in round brackets are optional): <NAME> range <LOWER BOUND> <UPPER BOUND> (<INT, FLOAT>, log_scale: True/False, default: false>) -- OR -- <NAME> fixed <VALUE> -- OR -- <NAME> choice <Comma-separated list of values>", default=None)
+        required_but_choice.add_argument('--parameter', action='append', nargs='+', help="Experiment parameters in the formats (options in round brackets are optional): <NAME> range <LOWER BOUND> <UPPER BOUND> (<INT, FLOAT>, log_scale: True/False, default: false>) -- OR -- <NAME> fixed <VALUE> -- OR -- <NAME> choice <Comma-separated list of values> -- OR -- <NAME> fidelity <LOW> <HIGH> (<INT, FLOAT>)", default=None)
         required_but_choice.add_argument('--continue_previous_job', help="Continue from a previous checkpoint, use run-dir as argument", type=str, default=None)
 
         optional.add_argument('--maximize', help='Maximize instead of minimize (which is default)', action='store_true', default=False)
@@ -437,6 +615,32 @@ class ConfigLoader:
         optional.add_argument('--occ_type', help=f'Optimization-with-combined-criteria-type (valid types are {", ".join(valid_occ_types)})', type=str, default="euclid")
         optional.add_argument("--result_names", nargs='+', default=[], help="Name of hyperparameters. Example --result_names result1=max result2=min result3. Default: result=min, or result=max when --maximize is set. Default is min.")
         optional.add_argument('--minkowski_p', help='Minkowski order of distance (default: 2), needs to be larger than 0', type=float, default=2)
+        optional.add_argument('--generation_batch_mode', help='How the candidates for all free slots are generated after the random phase: sequential (one model fit per candidate, each one conditioned on the previous ones) or joint (one model fit and a joint q-batch acquisition for all of them) (default: sequential)', type=str, choices=["sequential", "joint"], default="sequential")
+        optional.add_argument('--bulk_initial_design', help='Generate all Sobol points of the random phase in one call before the search starts and hand them out without going through the generation strategy', action='store_true', default=False)
+        optional.add_argument('--local_gp_max_observations', help='With --model=LOCAL_GP, fit the GP only on this many observations closest to the best point so far (default: 300)', type=int, default=300)
+        optional.add_argument('--tpe_gamma', help='With --model=TPE, the fraction of the best results that forms the good density. Only the first of the --result_names is used to rank the results (default: 0.1, at most 25 results)', type=float, default=0.1)
+        optional.add_argument('--tpe_nr_candidates', help='With --model=TPE, the number of points sampled from the good density per new trial, the best ones by l(x)/g(x) are used (default: 64)', type=int, default=64)
+        optional.add_argument('--refit_every_n_results', help='Fully refit the surrogate model only after this many new results. In between, the model keeps the hyperparameters of the last fit and only its posterior is updated with the new results (default: 1, refit every time)', type=int, default=1)
+        optional.add_argument('--refit_surprise_threshold', help='Refit the surrogate model early when the new results have a mean squared standardized error under the last fit above this value. 0 disables this check (default: 4)', type=float, default=4)
+        optional.add_argument('--early_stopping', help='Cancel running trials whose OO_PROGRESS lines are worse than the other trials at the same step: median (best value so far worse than the median of the running averages) or percentile (current value among the worst --early_stopping_percentile percent) (default: none)', type=str, choices=["none", "median", "percentile"], default="none")
+        optional.add_argument('--early_stopping_percentile', help='With --early_stopping=percentile, stop trials among the worst this many percent at the same step (default: 25)', type=float, default=25)
+        optional.add_argument('--early_stopping_min_trials', help='With --early_stopping, only compare a trial once at least this many other trials have reached its step (default: 5)', type=int, default=5)
+        optional.add_argument('--early_stopping_min_step', help='With --early_stopping, never stop a trial before it reported this step (default: 0)', type=float, default=0)
+        optional.add_argument('--early_stopping_metric', help='With --early_stopping, the key of the OO_PROGRESS lines to compare, in the direction of the first result name (default: the first result name, or the only key besides step)', type=str, default=None)
+        optional.add_argument('--cost_aware', help='Choose new points by expected improvement per second of predicted runtime instead of expected improvement alone. The runtime is predicted from the run_time column of job_infos.csv by a nearest-neighbour kernel regression, not by a second model output. Nothing optimizes the ratio directly: the points of the model and --cost_aware_candidates quasi-random points are only re-ranked by it', action='store_true', default=False)
+        optional.add_argument('--cost_aware_candidates', help='With --cost_aware, the number of quasi-random candidates per free slot that compete with the points of the model (default: 32)', type=int, default=32)
+        optional.add_argument('--max_output_tail_lines', help='The output of the evaluated program is streamed to the stdout and stderr files of the job, only this many of the last lines of each are kept in memory for the error report (default: 200)', type=int, default=200)
+        optional.add_argument('--result_cache_dir', help='Folder of a result cache that can be shared between runs. Parameter sets that were already evaluated with the same program string are not run again, their results are taken from the cache. If several nodes share the folder, its file system needs working file locks (default: none, no cache)', type=str, default=None)
+        optional.add_argument('--result_cache_code_version', help='With --result_cache_dir, a version of your code, e.g. a git hash. Results of other versions are not taken from the cache (default: none)', type=str, default=None)
+        optional.add_argument('--result_cache_max_age_days', help='With --result_cache_dir, results older than this many days are removed from the cache. 0 keeps them forever (default: 90)', type=float, default=90)
+        optional.add_argument('--result_cache_max_entries', help='With --result_cache_dir, only keep this many of the most recently used results in the cache. 0 means no limit (default: 100000)', type=int, default=100000)
+        optional.add_argument('--max_generation_seconds', help='Time budget in seconds for generating the new points of one call. The acquisition optimization uses fewer restarts and raw samples to fit in it, points that do not fit anymore are filled with quasi-random ones (default: 0, no budget)', type=float, default=0)
+        optional.add_argument('--max_generation_runtime_fraction', help='With --max_generation_seconds, also limit the budget to this fraction of the mean runtime of the finished trials in job_infos.csv. 0 disables this (default: 0.25)', type=float, default=0.25)
+        optional.add_argument('--pregenerate_candidates', help='Keep this many candidates generated in a background thread, so a free slot gets a new parameter set without waiting for the model (default: 0, disabled)', type=int, default=0)
+        optional.add_argument('--pregenerate_max_age', help='Discard a pre-generated candidate that is older than this many seconds (default: 600)', type=float, default=600)
+        optional.add_argument('--pregenerate_max_new_results', help='Discard a pre-generated candidate when more than this many new results arrived after it was generated (default: 2)', type=int, default=2)
+        optional.add_argument('--pregenerate_ignore_pending', help='Generate pre-generated candidates without treating running and buffered trials as pending points (faster fits, but candidates may cluster)', action='store_true', default=False)
+        optional.add_argument('--state_save_interval', help='Minimum number of seconds between two background saves of the checkpoint and state files. 0 saves synchronously after every finished job (default: 10)', type=float, default=10)
         optional.add_argument('--signed_weighted_euclidean_weights', help='A comma-seperated list of values for the signed weighted euclidean distance. Needs to be equal to the number of results. Else, default will be 1.', default="", type=str)
 
         slurm.add_argument('--num_parallel_jobs', help='Number of parallel slurm jobs (default: 20)', type=int, default=20)
@@ -451,6 +655,11 @@ class ConfigLoader:
         slurm.add_argument('--cpus_per_task', help='CPUs per task', type=int, default=1)
         slurm.add_argument('--account', help='Account to be used', type=str, default=None)
         slurm.add_argument('--gpus', help='Number of GPUs', type=int, default=0)
+        slurm.add_argument('--local_process_pool', help='Without SLURM (or with --force_local_execution), run up to --num_parallel_jobs trials at once as local processes. Each one is killed after --worker_timeout minutes', action='store_true', default=False)
+        slurm.add_argument('--pin_cpus', help='With --local_process_pool, pin each trial to its own set of --cpus_per_task CPUs', action='store_true', default=False)
+        slurm.add_argument('--worker_pool_size', help='Start this many long-lived workers that pull parameter sets from a queue in the run folder instead of starting one job per trial. With this, --worker_timeout is the lifetime of each pool worker (default: 0, disabled)', type=int, default=0)
+        slurm.add_argument('--slurm_job_arrays', help='Submit all trials of one generation round as a single job array instead of one job per trial', action='store_true', default=False)
+        slurm.add_argument('--job_state_cache_seconds', help='Minimum number of seconds between two bulk squeue/sacct queries for the states of all running jobs (default: 10)', type=float, default=10)
         #slurm.add_ argument('--tasks_per_node', help='ntasks', type=int, default=1)
 
         installing.add_argument('--run_mode', help='Either local or docker', default="local", type=str)
@@ -462,6 +671,8 @@ class ConfigLoader:
         debug.add_argument('--show_worker_percentage_table_at_end', help='Show a table of percentage of usage of max worker over time', action='store_true', default=False)
         debug.add_argument('--auto_exclude_defective_hosts', help='Run a Test if you can allocate a GPU on each node and if not, exclude it since the GPU driver seems to be broken somehow.', action='store_true', default=False)
         debug.add_argument('--run_tests_that_fail_on_taurus', help='Run tests on Taurus that usually fail.', action='store_true', default=False)
+        debug.add_argument('--log_level', help='Minimum level of messages written to the log file (debug, info, warning or error, default: debug)', type=str, choices=list(LOG_LEVELS.keys()), default="debug")
+        debug.add_argument('--debug_stack_traces', help='Write the function stack of every log message to the log file (slow)', action='store_true', default=False)
         debug.add_argument('--raise_in_eval', help='Raise a signal in eval (only useful for debugging and testing).', action='store_true', default=False)
 
     @beartype
@@ -560,6 +771,9 @@ class ConfigLoader:
 loader = ConfigLoader()
 args = loader.parse_arguments()
 
+LOG_STATE["level"] = LOG_LEVELS[args.log_level]
+LOG_STATE["stack_traces"] = args.debug_stack_traces or args.debug
+
 if not 0 <= args.pareto_front_confidence <= 1:
     print_yellow("--pareto_front_confidence must be between 0 and 1, will be set to 1")
     args.pareto_front_confidence = 1
@@ -664,6 +878,13 @@ try:
     with console.status("[bold green]Loading ax...") as status:
         import ax
         from ax.core import Metric
+        from ax.core.generator_run import GeneratorRun
+        from ax.core.observation import ObservationFeatures
+        from ax.core.arm import Arm
+        from ax.core.base_trial import TrialStatus
+        from ax.core.data import Data
+        from ax.core.parameter import ChoiceParameter, ParameterType, RangeParameter
+        from ax.core.utils import get_pending_observation_features_based_on_trial_status
         import ax.exceptions.core
         import ax.exceptions.generation_strategy
         import ax.modelbridge.generation_node
@@ -705,32 +926,134 @@ disable_logs = disable_loggers(names=["ax.modelbridge.base"], level=logging.CRIT
 
 NVIDIA_SMI_LOGS_BASE = None
 
+STATE_STORE_FILENAME: str = "state.sqlite3"
+STATE_STORES: dict = {}
+STATE_STORE_LOCK = threading.RLock()
+STATE_STORE_FLAT_FILE_STATS: dict = {}
+
+@beartype
+def is_flat_counter_file(filename: str) -> bool:
+    return filename in ["submitted_jobs", "failed_jobs", "succeeded_jobs"] or re.fullmatch(r"phase_.+_steps", filename) is not None
+
+@beartype
+def count_lines_of_flat_file(file_path: str) -> int:
+    with open(file_path, mode='r', encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+@beartype
+def import_flat_state_files(con: sqlite3.Connection, state_files_folder: str) -> None:
+    for filename in os.listdir(state_files_folder):
+        file_path = f"{state_files_folder}/{filename}"
+
+        if is_flat_counter_file(filename) and os.path.isfile(file_path):
+            con.execute("INSERT OR REPLACE INTO counters (name, value) VALUES (?, ?)", (filename, count_lines_of_flat_file(file_path)))
+
+    merge_defective_nodes_from_flat_file(con, state_files_folder)
+
+@beartype
+def merge_defective_nodes_from_flat_file(con: sqlite3.Connection, state_files_folder: str) -> None:
+    file_path = f"{state_files_folder}/defective_nodes"
+
+    if not os.path.isfile(file_path):
+        return
+
+    file_stat = os.stat(file_path)
+    stat_key = (file_stat.st_size, file_stat.st_mtime)
+
+    if STATE_STORE_FLAT_FILE_STATS.get(file_path) == stat_key:
+        return
+
+    with open(file_path, mode='r', encoding="utf-8") as f:
+        hostnames = [line.strip() for line in f if line.strip()]
+
+    con.executemany("INSERT OR IGNORE INTO defective_nodes (hostname) VALUES (?)", [(hostname, ) for hostname in hostnames])
+
+    STATE_STORE_FLAT_FILE_STATS[file_path] = stat_key
+
+@beartype
+def get_state_store(run_folder: str = "") -> sqlite3.Connection:
+    if run_folder == "":
+        run_folder = get_current_run_folder()
+
+    with STATE_STORE_LOCK:
+        if run_folder in STATE_STORES:
+            return STATE_STORES[run_folder]
+
+        state_files_folder = f"{run_folder}/state_files"
+        makedirs(state_files_folder)
+
+        db_path = f"{state_files_folder}/{STATE_STORE_FILENAME}"
+        is_new = not os.path.exists(db_path)
+
+        # No WAL here, the run folder is often on a network file system, where its shared memory does not work between nodes
+        con = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        con.execute("CREATE TABLE IF NOT EXISTS defective_nodes (hostname TEXT PRIMARY KEY)")
+        con.execute("CREATE TABLE IF NOT EXISTS job_trials (job_id TEXT PRIMARY KEY, trial_index INTEGER NOT NULL)")
+
+        if is_new:
+            import_flat_state_files(con, state_files_folder)
+
+        STATE_STORES[run_folder] = con
+
+        return con
+
 @beartype
-def append_and_read(file: str, nr: int = 0, recursion: int = 0) -> int:
+def state_store_counter(name: str, nr: int = 0, run_folder: str = "") -> int:
     try:
-        with open(file, mode='a+', encoding="utf-8") as f:
-            f.seek(0)  # Setze den Dateizeiger auf den Anfang der Datei
-            nr_lines = len(f.readlines())
+        with STATE_STORE_LOCK:
+            con = get_state_store(run_folder)
 
-            if nr == 1:
-                f.write('1\n')
+            row = con.execute("SELECT value FROM counters WHERE name = ?", (name, )).fetchone()
 
-        return nr_lines
+            if nr > 0:
+                con.execute("INSERT INTO counters (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + ?", (name, nr, nr))
 
-    except FileNotFoundError as e: # pragma: no cover
-        original_print(f"File not found: {e}")
-    except (SignalUSR, SignalINT, SignalCONT): # pragma: no cover
-        if recursion:
-            print_red("Recursion error in append_and_read.")
-            sys.exit(199)
-        append_and_read(file, nr, recursion + 1)
-    except OSError as e: # pragma: no cover
-        print_red(f"OSError: {e}. This may happen on unstable file systems.")
+            return int(row[0]) if row else 0
+    except sqlite3.Error as e: # pragma: no cover
+        print_red(f"sqlite3.Error: {e}. This may happen on unstable file systems.")
         sys.exit(199)
-    except Exception as e: # pragma: no cover
-        print(f"Error editing the file: {e}")
 
-    return 0 # pragma: no cover
+@beartype
+def set_state_store_counter(name: str, value: int, run_folder: str = "") -> None:
+    with STATE_STORE_LOCK:
+        get_state_store(run_folder).execute("INSERT OR REPLACE INTO counters (name, value) VALUES (?, ?)", (name, value))
+
+@beartype
+def state_store_add_job(job_id: str, trial_index: int) -> None:
+    with STATE_STORE_LOCK:
+        get_state_store().execute("INSERT OR REPLACE INTO job_trials (job_id, trial_index) VALUES (?, ?)", (job_id, trial_index))
+
+@beartype
+def state_store_defective_nodes(entry: Optional[str] = None) -> list:
+    with STATE_STORE_LOCK:
+        con = get_state_store()
+
+        merge_defective_nodes_from_flat_file(con, f"{get_current_run_folder()}/state_files")
+
+        if entry is not None: # pragma: no cover
+            con.execute("INSERT OR IGNORE INTO defective_nodes (hostname) VALUES (?)", (entry, ))
+
+        return sorted(row[0] for row in con.execute("SELECT hostname FROM defective_nodes"))
+
+@beartype
+def export_state_store_to_flat_files(run_folder: str = "") -> None:
+    if run_folder == "":
+        run_folder = get_current_run_folder()
+
+    state_files_folder = f"{run_folder}/state_files"
+
+    with STATE_STORE_LOCK:
+        con = get_state_store(run_folder)
+
+        for name, value in con.execute("SELECT name, value FROM counters").fetchall():
+            write_file_atomically(f"{state_files_folder}/{name}", lambda tmp_filepath, value=value: Path(tmp_filepath).write_text("1\n" * value, encoding="utf-8"))
+
+        hostnames = state_store_defective_nodes()
+
+        if len(hostnames):
+            write_file_atomically(f"{state_files_folder}/defective_nodes", lambda tmp_filepath: Path(tmp_filepath).write_text("".join(f"{hostname}\n" for hostname in hostnames), encoding="utf-8"))
 
 @wrapper_print_debug
 def run_live_share_command() -> Tuple[str, str]:
@@ -779,10 +1102,51 @@ def live_share() -> bool:
 
     return True
 
+@beartype
+def write_file_atomically(filepath: str, write_function: Any) -> None:
+    tmp_filepath = f"{filepath}.{os.getpid()}.tmp"
+
+    write_function(tmp_filepath)
+
+    os.replace(tmp_filepath, filepath)
+
+@beartype
+def write_json_file_atomically(filepath: str, data: Any) -> None:
+    def _write(tmp_filepath: str) -> None:
+        with open(tmp_filepath, mode='w', encoding="utf-8") as json_file:
+            json.dump(data, json_file, indent=4)
+
+    write_file_atomically(filepath, _write)
+
 @wrapper_print_debug
 def save_pd_csv() -> str:
     #print_debug("save_pd_csv()")
     pd_csv: str = f'{get_current_run_folder()}/{PD_CSV_FILENAME}'
+
+    if ax_client is None:
+        return pd_csv
+
+    try:
+        with STATE_PERSISTER["lock"]:
+            pd_frame = ax_client.get_trials_data_frame()
+
+            write_file_atomically(pd_csv, lambda tmp_filepath: pd_frame.to_csv(tmp_filepath, index=False, float_format="%.30f"))
+            #pd_frame.to_json(pd_json)
+    except SignalUSR as e: # pragma: no cover
+        raise SignalUSR(str(e)) from e
+    except SignalCONT as e: # pragma: no cover
+        raise SignalCONT(str(e)) from e
+    except SignalINT as e: # pragma: no cover
+        raise SignalINT(str(e)) from e
+    except Exception as e: # pragma: no cover
+        print_red(f"While saving all trials as a pandas-dataframe-csv, an error occurred: {e}")
+
+    save_ax_state_json()
+
+    return pd_csv
+
+@wrapper_print_debug
+def save_ax_state_json() -> None:
     pd_json: str = f'{get_current_run_folder()}/state_files/pd.json'
 
     state_files_folder: str = f"{get_current_run_folder()}/state_files/"
@@ -790,20 +1154,15 @@ def save_pd_csv() -> str:
     makedirs(state_files_folder)
 
     if ax_client is None:
-        return pd_csv
+        return
 
     try:
-        pd_frame = ax_client.get_trials_data_frame()
-
-        pd_frame.to_csv(pd_csv, index=False, float_format="%.30f")
-        #pd_frame.to_json(pd_json)
+        with STATE_PERSISTER["lock"]:
+            json_snapshot = ax_client.to_json_snapshot()
 
-        json_snapshot = ax_client.to_json_snapshot()
+            write_json_file_atomically(pd_json, json_snapshot)
 
-        with open(pd_json, mode='w', encoding="utf-8") as json_file:
-            json.dump(json_snapshot, json_file, indent=4)
-
-        save_experiment(ax_client.experiment, f"{get_current_run_folder()}/state_files/ax_client.experiment.json")
+            write_file_atomically(f"{get_current_run_folder()}/state_files/ax_client.experiment.json", lambda tmp_filepath: save_experiment(ax_client.experiment, tmp_filepath))
     except SignalUSR as e: # pragma: no cover
         raise SignalUSR(str(e)) from e
     except SignalCONT as e: # pragma: no cover
@@ -811,15 +1170,13 @@ def save_pd_csv() -> str:
     except SignalINT as e: # pragma: no cover
         raise SignalINT(str(e)) from e
     except Exception as e: # pragma: no cover
-        print_red(f"While saving all trials as a pandas-dataframe-csv, an error occurred: {e}")
-
-    return pd_csv
+        print_red(f"While saving the ax state files, an error occurred: {e}")
 
 @beartype
 def add_to_phase_counter(phase: str, nr: int = 0, run_folder: str = "") -> int:
     if run_folder == "":
         run_folder = get_current_run_folder()
-    return append_and_read(f'{run_folder}/state_files/phase_{phase}_steps', nr)
+    return state_store_counter(f'phase_{phase}_steps', nr, run_folder)
 
 if args.model and str(args.model).upper() not in SUPPORTED_MODELS:
     print(f"Unsupported model {args.model}. Cannot continue. Valid models are {', '.join(SUPPORTED_MODELS)}")
@@ -832,7 +1189,7 @@ class SearchSpaceExhausted (Exception):
     pass
 
 NR_INSERTED_JOBS: int = 0
-executor: Union[LocalExecutor, AutoExecutor, None] = None
+executor: Union[LocalExecutor, AutoExecutor, "LocalProcessPoolExecutor", "WorkerPoolExecutor", None] = None
 
 NR_OF_0_RESULTS: int = 0
 
@@ -943,6 +1300,7 @@ global_vars["_time"] = None
 global_vars["mem_gb"] = None
 global_vars["num_parallel_jobs"] = None
 global_vars["parameter_names"] = []
+global_vars["fidelity_parameter_names"] = []
 
 # max_eval usw. in unterordner
 # grid ausblenden
@@ -1167,7 +1525,23 @@ else:
         print_red(f"The previous job file {prev_job_file} could not be found. You may forgot to add the run number at the end.")
         my_exit(44)
 
-if not args.tests and len(global_vars["joined_run_program"]) == 0:
+global_vars["run_function"] = None
+
+if not args.continue_previous_job:
+    if args.run_function:
+        module_name, _, function_name = args.run_function.rpartition(":")
+
+        # Files are loaded by path in the workers, which may run in another directory
+        if module_name.endswith(".py"):
+            module_name = os.path.abspath(module_name)
+
+        global_vars["run_function"] = f"{module_name}:{function_name}"
+else:
+    prev_run_function_file = args.continue_previous_job + "/state_files/run_function"
+    if os.path.exists(prev_run_function_file):
+        global_vars["run_function"] = get_file_as_string(prev_run_function_file).strip()
+
+if not args.tests and len(global_vars["joined_run_program"]) == 0 and not global_vars["run_function"]:
     print_red("--run_program was empty")
     my_exit(19)
 
@@ -1229,8 +1603,8 @@ def check_required_parameters(_args: Any) -> None:
         19
     )
     check_param_or_exit(
-        _args.run_program or _args.continue_previous_job,
-        "--run_program needs to be defined when --continue_previous_job is not set",
+        _args.run_program or _args.run_function or _args.continue_previous_job,
+        "--run_program or --run_function needs to be defined when --continue_previous_job is not set",
         19
     )
     check_param_or_exit(
@@ -1330,9 +1704,9 @@ if not args.tests:
     load_max_eval_or_exit(args)
 
 @wrapper_print_debug
-def print_debug_get_next_trials(got: int, requested: int, _line: int) -> None:
+def print_debug_get_next_trials(got: int, requested: int, _line: int, seconds: float) -> None:
     time_str: str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    msg: str = f"{time_str}, {got}, {requested}"
+    msg: str = f"{time_str}, {got}, {requested}, {seconds:.3f}"
 
     _debug_get_next_trials(msg)
 
@@ -1377,9 +1751,12 @@ if is_executable_in_path("sbatch"): # pragma: no cover
 if is_executable_in_path("nvidia-smi"): # pragma: no cover
     IS_NVIDIA_SMI_SYSTEM = True
 
-if not SYSTEM_HAS_SBATCH:
+if not SYSTEM_HAS_SBATCH and not args.local_process_pool and not args.batch_objective:
     num_parallel_jobs = 1
 
+if args.worker_pool_size > 0:
+    num_parallel_jobs = args.worker_pool_size
+
 @beartype
 def save_global_vars() -> None:
     state_files_folder = f"{get_current_run_folder()}/state_files"
@@ -1670,6 +2047,39 @@ def parse_range_param(params: list, j: int, this_args: Union[str, list], name: U
     j += skip
     return j, params, search_space_reduction_warning
 
+@beartype
+def parse_fidelity_param(params: list, j: int, this_args: Union[str, list], name: Union[list, str], search_space_reduction_warning: bool) -> Tuple[int, list, bool]:
+    if len(this_args) != 4 and len(this_args) != 5:
+        print_red("\n⚠ --parameter for type fidelity must have 4 (or 5, the last one being optional and float by default) parameters: <NAME> fidelity <LOW> <HIGH> (<TYPE (int or float)>)")
+        my_exit(181)
+
+    lower_bound, upper_bound = get_bounds(this_args, j)
+
+    lower_bound, upper_bound = switch_lower_and_upper_if_needed(name, lower_bound, upper_bound)
+
+    value_type = this_args[j + 4] if len(this_args) == 5 else "float"
+
+    validate_value_type(value_type)
+
+    lower_bound, upper_bound = adjust_bounds_for_value_type(value_type, lower_bound, upper_bound)
+
+    if lower_bound == upper_bound:
+        print_red(f"\n⚠ Lower and upper bound of the fidelity parameter {name} are equal: {lower_bound}")
+        my_exit(181)
+
+    param = create_param(name, lower_bound, upper_bound, value_type, False)
+
+    # The highest fidelity is the one the optimization is about, all others only serve as cheaper hints
+    param["is_fidelity"] = True
+    param["target_value"] = upper_bound
+
+    global_vars["parameter_names"].append(name)
+    global_vars["fidelity_parameter_names"].append(name)
+    params.append(param)
+
+    j += len(this_args)
+    return j, params, search_space_reduction_warning
+
 @beartype
 def validate_value_type(value_type: str) -> None:
     valid_value_types = ["int", "float"]
@@ -1737,7 +2147,7 @@ def parse_experiment_parameters() -> list:
 
     search_space_reduction_warning = False
 
-    valid_types = ["range", "fixed", "choice"]
+    valid_types = ["range", "fixed", "choice", "fidelity"]
     invalid_names = ["start_time", "end_time", "run_time", "program_string", *arg_result_names, "exit_code", "signal"]
 
     while args.parameter and i < len(args.parameter):
@@ -1777,6 +2187,8 @@ def parse_experiment_parameters() -> list:
                 j, params, search_space_reduction_warning = parse_fixed_param(params, j, this_args, name, search_space_reduction_warning)
             elif param_type == "choice":
                 j, params, search_space_reduction_warning = parse_choice_param(params, j, this_args, name, search_space_reduction_warning)
+            elif param_type == "fidelity":
+                j, params, search_space_reduction_warning = parse_fidelity_param(params, j, this_args, name, search_space_reduction_warning)
             else: # pragma: no cover
                 print_red(f"⚠ Parameter type '{param_type}' not yet implemented.")
                 my_exit(181)
@@ -1836,6 +2248,229 @@ def replace_parameters_in_string(parameters: dict, input_string: str) -> str:
         print_red(f"\n⚠ Error: {e}")
         return ""
 
+OUTPUT_MAX_LINE_LENGTH: int = 65536
+
+@beartype
+def get_result_line_patterns() -> list:
+    """The lines get_results and extract_info look at, so they can be picked out while the output streams by, with whether only the first match is used."""
+    patterns = [(re.compile(r'\s*OO-Info:\s*([a-zA-Z0-9_]+):\s*(.+)\s*$', re.IGNORECASE), False)]
+
+    if len(arg_result_names) == 1:
+        patterns.append((re.compile(r'\s*RESULT\d*:\s*(-?\d+(?:\.\d+)?)'), False))
+    else:
+        # get_results_new only uses the first match of each result name
+        for column_name in arg_result_names:
+            patterns.append((re.compile(rf'\s*{re.escape(column_name)}\d*:\s*(-?\d+(?:\.\d+)?)'), True))
+
+    return patterns
+
+@beartype
+def spool_output_lines(pipe: Any, spool: Any, patterns: list, kept_lines: list, tail: collections.deque) -> None:
+    matched_patterns: set = set()
+
+    while True:
+        # Lines longer than this are split, so a single huge line cannot fill the memory either
+        line = pipe.readline(OUTPUT_MAX_LINE_LENGTH)
+
+        if line == "":
+            break
+
+        spool.write(line)
+
+        if line.startswith("OO_PROGRESS"):
+            # --early_stopping reads these from the job's stdout file while the program runs
+            spool.flush()
+
+        is_kept = False
+
+        for i, (pattern, only_first) in enumerate(patterns):
+            if (not only_first or i not in matched_patterns) and pattern.search(line):
+                matched_patterns.add(i)
+                is_kept = True
+
+        if is_kept:
+            kept_lines.append(line)
+        else:
+            tail.append(line)
+
+    spool.flush()
+
+RESULT_CHANNEL_ENV_VAR: str = "OO_RESULT_FILE"
+
+@beartype
+def get_result_channel_path() -> str:
+    """A new file for the program of one trial to write its results to, its path is passed in OO_RESULT_FILE."""
+    result_channel_folder = f"{get_current_run_folder()}/result_channel"
+
+    makedirs(result_channel_folder)
+
+    return f"{result_channel_folder}/{uuid.uuid4()}.jsonl"
+
+@beartype
+def parse_result_channel_records(text: str) -> list:
+    """The records of a result file: either one JSON document (an object or a list of objects) or one JSON object per line."""
+    try:
+        document = json.loads(text)
+
+        if isinstance(document, dict):
+            return [document]
+
+        if isinstance(document, list):
+            return [record for record in document if isinstance(record, dict)]
+    except ValueError:
+        pass
+
+    records: list = []
+
+    for line in text.splitlines():
+        if line.strip() == "":
+            continue
+
+        try:
+            record = json.loads(line)
+        except ValueError:
+            print_debug(f"parse_result_channel_records: ignoring line that is not JSON: {line[:200]}")
+            continue
+
+        if isinstance(record, dict):
+            records.append(record)
+
+    return records
+
+@beartype
+def read_result_channel(path: str) -> Optional[list]:
+    """The records in the result file, or None when the program did not write one."""
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, mode="r", encoding="utf-8", errors="replace") as f:
+            records = parse_result_channel_records(f.read())
+    except OSError as e: # pragma: no cover
+        print_red(f"Cannot read the result file {path}: {e}")
+        return None
+
+    with contextlib.suppress(OSError):
+        os.unlink(path)
+
+    return records
+
+@beartype
+def get_final_result_channel_values(records: list) -> Tuple[dict, dict]:
+    """Merges the records without a step into (results, info), later records overwrite earlier ones."""
+    results: dict = {}
+    info: dict = {}
+
+    for record in records:
+        if "step" in record:
+            continue
+
+        for key, value in record.items():
+            if key == "info" and isinstance(value, dict):
+                info.update(value)
+            else:
+                results[key] = value
+
+    return results, info
+
+@beartype
+def echo_result_channel_progress(path: str, offset: int) -> int:
+    """Writes the step records that were appended to the result file since offset as OO_PROGRESS lines to stdout, so --early_stopping sees them in the job's stdout file."""
+    if not os.path.exists(path):
+        return offset
+
+    with open(path, mode="r", encoding="utf-8", errors="replace") as f:
+        f.seek(offset)
+        new_text = f.read()
+
+    # Only complete lines, the last one may still be written to
+    complete_text = new_text[:new_text.rfind("\n") + 1]
+
+    for line in complete_text.splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+
+        if isinstance(record, dict) and "step" in record:
+            pairs = [f"{key}={value}" for key, value in record.items() if key != "info" and isinstance(value, (int, float)) and not isinstance(value, bool)]
+            sys.stdout.write(f"OO_PROGRESS {' '.join(pairs)}\n")
+            sys.stdout.flush()
+
+    return offset + len(complete_text.encode("utf-8"))
+
+@beartype
+def watch_result_channel(path: str, stop_event: threading.Event) -> None:
+    offset = 0
+
+    while True:
+        stopped = stop_event.wait(1)
+
+        try:
+            offset = echo_result_channel_progress(path, offset)
+        except OSError as e: # pragma: no cover
+            print_debug(f"watch_result_channel: cannot read {path}: {e}")
+
+        if stopped:
+            break
+
+@beartype
+def execute_program_streaming(code: str, result_channel_path: Optional[str] = None) -> list:
+    """Like execute_bash_code, but the output is copied line by line to the job's stdout and stderr files instead of being held in memory. Only the RESULT and OO-Info lines and the last --max_output_tail_lines lines are kept."""
+    stdout_lines: list = []
+    stdout_tail: collections.deque = collections.deque(maxlen=args.max_output_tail_lines)
+    stderr_tail: collections.deque = collections.deque(maxlen=args.max_output_tail_lines)
+
+    env = dict(os.environ)
+
+    watcher_thread = None
+    stop_watching = threading.Event()
+
+    if result_channel_path is not None:
+        env[RESULT_CHANNEL_ENV_VAR] = result_channel_path
+
+        if args.early_stopping != "none":
+            watcher_thread = threading.Thread(target=watch_result_channel, args=(result_channel_path, stop_watching), daemon=True)
+
+    with subprocess.Popen(code, shell=True, text=True, errors="replace", stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env) as process:
+        stderr_thread = threading.Thread(target=spool_output_lines, args=(process.stderr, sys.stderr, [], [], stderr_tail), daemon=True)
+        stderr_thread.start()
+
+        if watcher_thread is not None:
+            watcher_thread.start()
+
+        spool_output_lines(process.stdout, sys.stdout, get_result_line_patterns(), stdout_lines, stdout_tail)
+
+        stderr_thread.join()
+        real_exit_code = process.wait()
+
+    if watcher_thread is not None:
+        stop_watching.set()
+        watcher_thread.join()
+
+    signal_code = None
+    if real_exit_code < 0: # pragma: no cover
+        signal_code = abs(real_exit_code)
+        real_exit_code = 1
+
+    stdout = "".join(stdout_lines)
+    stderr = "".join(stderr_tail)
+
+    if real_exit_code != 0 and not args.tests: # pragma: no cover
+        print(f"Error at execution of your program: {code}. Exit-Code: {real_exit_code}, Signal-Code: {signal_code}")
+
+        if len(stdout_tail):
+            print(f"stdout (last {len(stdout_tail)} lines): {''.join(stdout_tail)}")
+        else:
+            print("No stdout")
+
+        if len(stderr):
+            print(f"stderr (last {len(stderr_tail)} lines): {stderr}")
+        else:
+            print("No stderr")
+
+    return [stdout, stderr, real_exit_code, signal_code]
+
 @beartype
 def execute_bash_code(code: str) -> list:
     try:
@@ -2084,7 +2719,10 @@ def write_failed_logs(data_dict: dict, error_description: str = "") -> None: # p
 
 @beartype
 def count_defective_nodes(file_path: Union[str, None] = None, entry: Any = None) -> list:
-    if file_path is None:
+    if file_path is None and os.getpid() == main_pid:
+        return state_store_defective_nodes(entry)
+
+    if file_path is None: # pragma: no cover
         file_path = os.path.join(get_current_run_folder(), "state_files", "defective_nodes")
 
     # Sicherstellen, dass das Verzeichnis existiert
@@ -2258,11 +2896,16 @@ def get_return_in_case_of_errors() -> dict:
     return return_in_case_of_error
 
 @beartype
-def write_job_infos_csv(parameters: dict, stdout: Optional[str], program_string_with_params: str, exit_code: Optional[int], _signal: Optional[int], result: Optional[Union[dict[str, Optional[float]], list[float], int, float]], start_time: Union[int, float], end_time: Union[int, float], run_time: Union[float, int]) -> None:
+def write_job_infos_csv(parameters: dict, stdout: Optional[str], program_string_with_params: str, exit_code: Optional[int], _signal: Optional[int], result: Optional[Union[dict[str, Optional[float]], list[float], int, float]], start_time: Union[int, float], end_time: Union[int, float], run_time: Union[float, int], info: Optional[dict] = None) -> None:
     str_parameters_values: list[str] = [str(v) for v in list(parameters.values())]
 
     extra_vars_names, extra_vars_values = extract_info(stdout)
 
+    if info:
+        for info_name, info_value in info.items():
+            extra_vars_names.append(f"OO_Info_{info_name}")
+            extra_vars_values.append(str(info_value))
+
     _SLURM_JOB_ID = os.getenv('SLURM_JOB_ID')
     if _SLURM_JOB_ID: # pragma: no cover
         extra_vars_names.append("OO_Info_SLURM_JOB_ID")
@@ -2319,8 +2962,10 @@ def print_debug_infos(program_string_with_params: str) -> None:
     original_print("Debug-Infos:", string)
 
 @beartype
-def print_stdout_and_stderr(stdout: Optional[str], stderr: Optional[str]) -> None:
-    if stdout:
+def print_stdout_and_stderr(stdout: Optional[str], stderr: Optional[str], stdout_was_streamed: bool = False) -> None:
+    if stdout_was_streamed:
+        original_print("stdout was streamed above")
+    elif stdout:
         original_print("stdout:", stdout)
     else:
         original_print("stdout was empty")
@@ -2331,27 +2976,25 @@ def print_stdout_and_stderr(stdout: Optional[str], stderr: Optional[str]) -> Non
         original_print("stderr was empty")
 
 @beartype
-def evaluate_print_stuff(parameters: dict, program_string_with_params: str, stdout: Optional[str], stderr: Optional[str], exit_code: Optional[int], _signal: Optional[int], result: Optional[Union[dict[str, Optional[float]], list[float], int, float]], start_time: Union[float, int], end_time: Union[float, int], run_time: Union[float, int]) -> None:
+def evaluate_print_stuff(parameters: dict, program_string_with_params: str, stdout: Optional[str], stderr: Optional[str], exit_code: Optional[int], _signal: Optional[int], result: Optional[Union[dict[str, Optional[float]], list[float], int, float]], start_time: Union[float, int], end_time: Union[float, int], run_time: Union[float, int], stdout_was_streamed: bool = False, info: Optional[dict] = None) -> None:
     original_print(f"Parameters: {json.dumps(parameters)}")
 
     print_debug_infos(program_string_with_params)
 
     original_print(program_string_with_params)
 
-    print_stdout_and_stderr(stdout, stderr)
+    print_stdout_and_stderr(stdout, stderr, stdout_was_streamed)
 
     original_print(f"Result: {result}")
 
-    write_job_infos_csv(parameters, stdout, program_string_with_params, exit_code, _signal, result, start_time, end_time, run_time)
+    write_job_infos_csv(parameters, stdout, program_string_with_params, exit_code, _signal, result, start_time, end_time, run_time, info)
 
     original_print(f"EXIT_CODE: {exit_code}")
 
     print_debug(f"EVALUATE-FUNCTION: type: {type(result)}, content: {result}")
 
 @beartype
-def get_results_with_occ(stdout: str) -> Union[int, float, Optional[Union[dict[str, Optional[float]], list[float]]]]:
-    result = get_results(stdout)
-
+def apply_occ(result: Optional[Union[dict[str, Optional[float]], list[float]]]) -> Union[int, float, Optional[Union[dict[str, Optional[float]], list[float]]]]:
     if result and args.occ: # pragma: no cover
         occed_result = calculate_occ(result)
 
@@ -2360,39 +3003,308 @@ def get_results_with_occ(stdout: str) -> Union[int, float, Optional[Union[dict[s
 
     return result
 
+RESULT_CACHE_FILENAME: str = "result_cache.sqlite3"
+RESULT_CACHE_STATE: dict = {
+    "path": None,
+    "connection": None
+}
+RESULT_CACHE_EVICTION_INTERVAL: int = 100
+RESULT_CACHE_LOCK = threading.RLock()
+
 @beartype
-def evaluate(parameters: dict) -> Optional[Union[dict, int, float]]:
-    start_nvidia_smi_thread()
+def get_result_cache() -> Optional[sqlite3.Connection]:
+    """The connection to the result cache in --result_cache_dir, opened once per process."""
+    if not args.result_cache_dir:
+        return None
 
-    return_in_case_of_error: dict = get_return_in_case_of_errors()
+    db_path = f"{os.path.abspath(args.result_cache_dir)}/{RESULT_CACHE_FILENAME}"
 
-    _test_gpu = test_gpu_before_evaluate(return_in_case_of_error)
+    if RESULT_CACHE_STATE["path"] == db_path:
+        return RESULT_CACHE_STATE["connection"]
 
-    if _test_gpu is not None:
-        return _test_gpu
+    makedirs(os.path.dirname(db_path))
 
-    parameters = {k: (int(v) if isinstance(v, (int, float, str)) and re.fullmatch(r'^\d+(\.0+)?$', str(v)) else v) for k, v in parameters.items()}
+    # No WAL here, it needs shared memory, which does not work between nodes. The rollback journal
+    # is only as safe as the locks of the file system: on a network file system without working
+    # locks (e.g. NFS without lockd), writers on several nodes can still corrupt the cache.
+    con = sqlite3.connect(db_path, timeout=60, check_same_thread=False, isolation_level=None)
+    con.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT NOT NULL, run_time REAL NOT NULL DEFAULT 0, created_at REAL NOT NULL, last_used_at REAL NOT NULL)")
+    con.execute("CREATE INDEX IF NOT EXISTS results_last_used_at ON results (last_used_at)")
 
-    ignore_signals()
+    RESULT_CACHE_STATE["path"] = db_path
+    RESULT_CACHE_STATE["connection"] = con
 
-    try:
-        if args.raise_in_eval: # pragma: no cover
-            raise SignalUSR("Raised in eval")
+    return con
 
-        program_string_with_params: str = replace_parameters_in_string(parameters, global_vars["joined_run_program"])
+@beartype
+def get_result_cache_key(program_string_with_params: str, parameters: dict) -> str:
+    key_data = {
+        "program_string": program_string_with_params,
+        "parameters": parameters,
+        "result_names": arg_result_names,
+        "code_version": args.result_cache_code_version
+    }
 
-        start_time: int = int(time.time())
+    return hashlib.sha256(json.dumps(key_data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
 
-        stdout, stderr, exit_code, _signal = execute_bash_code(program_string_with_params)
+@beartype
+def get_oldest_allowed_result_cache_time() -> float:
+    if args.result_cache_max_age_days <= 0:
+        return 0
 
-        end_time: int = int(time.time())
+    return time.time() - args.result_cache_max_age_days * 86400
 
-        result = get_results_with_occ(stdout)
+@beartype
+def result_cache_lookup(program_string_with_params: str, parameters: dict) -> Optional[Tuple[Union[dict, list], float]]:
+    """The result and run time of an earlier evaluation of the same program string and parameters, or None."""
+    try:
+        with RESULT_CACHE_LOCK:
+            con = get_result_cache()
 
-        evaluate_print_stuff(parameters, program_string_with_params, stdout, stderr, exit_code, _signal, result, start_time, end_time, end_time - start_time)
+            if con is None:
+                return None
 
-        if len(arg_result_names) == 1:
-            if isinstance(result, (int, float)): # pragma: no cover
+            key = get_result_cache_key(program_string_with_params, parameters)
+
+            row = con.execute("SELECT result, run_time FROM results WHERE key = ? AND created_at >= ?", (key, get_oldest_allowed_result_cache_time())).fetchone()
+
+            if row is None:
+                return None
+
+            con.execute("UPDATE results SET last_used_at = ? WHERE key = ?", (time.time(), key))
+
+            return json.loads(row[0]), float(row[1])
+    except (sqlite3.Error, ValueError) as e: # pragma: no cover
+        print_yellow(f"Cannot read from the result cache in {args.result_cache_dir}: {e}")
+
+    return None # pragma: no cover
+
+@beartype
+def evict_from_result_cache(con: sqlite3.Connection) -> None:
+    # Random instead of a counter, because every slurm job is its own process. Between two evictions,
+    # the cache may hold a few more entries than --result_cache_max_entries
+    if random.random() >= 1 / RESULT_CACHE_EVICTION_INTERVAL:
+        return
+
+    con.execute("DELETE FROM results WHERE created_at < ?", (get_oldest_allowed_result_cache_time(), ))
+
+    if args.result_cache_max_entries > 0:
+        nr_of_entries = con.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+        if nr_of_entries > args.result_cache_max_entries:
+            con.execute("DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used_at ASC LIMIT ?)", (nr_of_entries - args.result_cache_max_entries, ))
+
+@beartype
+def result_cache_store(program_string_with_params: str, parameters: dict, result: Optional[Union[dict, list]], run_time: Union[float, int]) -> None:
+    if not result or (isinstance(result, dict) and all(value is None for value in result.values())):
+        return
+
+    try:
+        with RESULT_CACHE_LOCK:
+            con = get_result_cache()
+
+            if con is None:
+                return
+
+            now = time.time()
+
+            con.execute("INSERT OR REPLACE INTO results (key, result, run_time, created_at, last_used_at) VALUES (?, ?, ?, ?, ?)", (get_result_cache_key(program_string_with_params, parameters), json.dumps(result), run_time, now, now))
+
+            evict_from_result_cache(con)
+    except sqlite3.Error as e: # pragma: no cover
+        print_yellow(f"Cannot write to the result cache in {args.result_cache_dir}: {e}")
+
+RUN_FUNCTION_CACHE: dict = {
+    "spec": None,
+    "function": None
+}
+
+@beartype
+def load_run_function(spec: str) -> Any:
+    module_name, _, function_name = spec.rpartition(":")
+
+    if module_name == "" or function_name == "":
+        raise ValueError(f"--run_function must look like package.module:function or path/to/file.py:function, not '{spec}'")
+
+    if module_name.endswith(".py"):
+        module_spec = importlib.util.spec_from_file_location(Path(module_name).stem, module_name)
+
+        if module_spec is None or module_spec.loader is None:
+            raise ImportError(f"Cannot load {module_name}")
+
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(module_name)
+
+    function = getattr(module, function_name)
+
+    if not callable(function):
+        raise TypeError(f"{spec} is not callable")
+
+    return function
+
+@beartype
+def get_run_function() -> Any:
+    """The function of --run_function, imported only once per process."""
+    if RUN_FUNCTION_CACHE["spec"] != global_vars["run_function"]:
+        RUN_FUNCTION_CACHE["function"] = load_run_function(global_vars["run_function"])
+        RUN_FUNCTION_CACHE["spec"] = global_vars["run_function"]
+
+    return RUN_FUNCTION_CACHE["function"]
+
+@beartype
+def check_run_function() -> None:
+    if args.batch_objective and not global_vars["run_function"]:
+        print_red("--batch_objective needs --run_function")
+        my_exit(19)
+
+    if not global_vars["run_function"]:
+        return
+
+    try:
+        get_run_function()
+    except Exception as e:
+        print_red(f"Cannot load --run_function {global_vars['run_function']}: {e}")
+        my_exit(19)
+
+class RunFunctionStdout(io.StringIO):
+    """Collects the stdout of --run_function and, with --early_stopping, passes OO_PROGRESS lines on to the job's stdout right away."""
+    @beartype
+    def __init__(self: Any, echo_to: Any) -> None:
+        super().__init__()
+        self.echo_to = echo_to
+        self.pending = ""
+
+    @beartype
+    def write(self: Any, text: str) -> int:
+        if args.early_stopping != "none":
+            lines = (self.pending + text).split("\n")
+            self.pending = lines.pop()
+
+            for line in lines:
+                if line.startswith("OO_PROGRESS"):
+                    self.echo_to.write(line + "\n")
+                    self.echo_to.flush()
+
+        return super().write(text)
+
+@beartype
+def execute_run_function(parameters: dict) -> Tuple[str, str, int, Optional[int], Any]:
+    stdout_buffer = RunFunctionStdout(sys.stdout)
+    stderr_buffer = io.StringIO()
+
+    return_value = None
+    exit_code = 0
+
+    with contextlib.redirect_stdout(stdout_buffer), contextlib.redirect_stderr(stderr_buffer):
+        try:
+            return_value = get_run_function()(dict(parameters))
+        except (SignalUSR, SignalINT, SignalCONT): # pragma: no cover
+            raise
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+
+    return stdout_buffer.getvalue(), stderr_buffer.getvalue(), exit_code, None, return_value
+
+@beartype
+def get_results_from_run_function(return_value: Any, source: str = "--run_function") -> Optional[Union[dict[str, Optional[float]], list[float]]]:
+    """Converts the return value of --run_function, or the results in the result file, to what get_results returns for a RESULT line."""
+    try:
+        if isinstance(return_value, (int, float)) and not isinstance(return_value, bool):
+            if len(arg_result_names) == 1:
+                return [float(return_value)]
+
+            print_red(f"{source} returned a single number, but there are {len(arg_result_names)} result names. Return a dict instead.")
+            return None
+
+        if isinstance(return_value, dict):
+            if len(arg_result_names) == 1:
+                if arg_result_names[0] in return_value:
+                    return [float(return_value[arg_result_names[0]])]
+
+                if len(return_value) == 1:
+                    return [float(next(iter(return_value.values())))]
+
+                return None
+
+            return {name: (float(return_value[name]) if return_value.get(name) is not None else None) for name in arg_result_names}
+    except (TypeError, ValueError) as e:
+        print_red(f"{source} returned a value that is not a number: {e}")
+
+    return None
+
+@beartype
+def execute_and_get_results(parameters: dict, program_string_with_params: str) -> Tuple[str, str, int, Optional[int], Optional[Union[dict[str, Optional[float]], list[float]]], dict]:
+    """Runs --run_function or the program and returns its output, exit code, signal, results before OCC and the info for job_infos.csv."""
+    if global_vars["run_function"]:
+        stdout, stderr, exit_code, _signal, return_value = execute_run_function(parameters)
+
+        return stdout, stderr, exit_code, _signal, get_results_from_run_function(return_value), {}
+
+    result_channel_path = get_result_channel_path()
+
+    stdout, stderr, exit_code, _signal = execute_program_streaming(program_string_with_params, result_channel_path)
+
+    channel_results, info = get_final_result_channel_values(read_result_channel(result_channel_path) or [])
+
+    if len(channel_results):
+        return stdout, stderr, exit_code, _signal, get_results_from_run_function(channel_results, RESULT_CHANNEL_ENV_VAR), info
+
+    # The program did not write a result file, fall back to the RESULT lines in its stdout
+    return stdout, stderr, exit_code, _signal, get_results(stdout), info
+
+@beartype
+def evaluate(parameters: dict) -> Optional[Union[dict, int, float]]:
+    start_nvidia_smi_thread()
+
+    return_in_case_of_error: dict = get_return_in_case_of_errors()
+
+    _test_gpu = test_gpu_before_evaluate(return_in_case_of_error)
+
+    if _test_gpu is not None:
+        return _test_gpu
+
+    parameters = {k: (int(v) if isinstance(v, (int, float, str)) and re.fullmatch(r'^\d+(\.0+)?$', str(v)) else v) for k, v in parameters.items()}
+
+    ignore_signals()
+
+    try:
+        if args.raise_in_eval: # pragma: no cover
+            raise SignalUSR("Raised in eval")
+
+        if global_vars["run_function"]:
+            program_string_with_params: str = f"{global_vars['run_function']}({json.dumps(parameters)})"
+        else:
+            program_string_with_params = replace_parameters_in_string(parameters, global_vars["joined_run_program"])
+
+        cached_result = result_cache_lookup(program_string_with_params, parameters)
+
+        start_time: int = int(time.time())
+
+        if cached_result is not None:
+            stdout, stderr, exit_code, _signal, raw_result, info = "", "", 0, None, cached_result[0], {}
+        else:
+            stdout, stderr, exit_code, _signal, raw_result, info = execute_and_get_results(parameters, program_string_with_params)
+
+        end_time: int = int(time.time())
+
+        # A hit logs the run time of the original evaluation, so the runtime models do not learn that it is free
+        run_time: Union[float, int] = cached_result[1] if cached_result is not None else end_time - start_time
+
+        if args.result_cache_dir:
+            if cached_result is None and exit_code == 0:
+                result_cache_store(program_string_with_params, parameters, raw_result, run_time)
+
+            info["result_cache"] = "hit" if cached_result is not None else "miss"
+
+        result = apply_occ(raw_result)
+
+        evaluate_print_stuff(parameters, program_string_with_params, stdout, stderr, exit_code, _signal, result, start_time, end_time, run_time, not global_vars["run_function"] and cached_result is None, info)
+
+        if len(arg_result_names) == 1:
+            if isinstance(result, (int, float)): # pragma: no cover
                 return {"result": float(result)}
             if isinstance(result, (list)) and len(result) == 1:
                 return {"result": float(result[0])}
@@ -2672,7 +3584,8 @@ def get_best_params_from_csv(csv_file_path: str, maximize: bool, res_name: str =
 
 @beartype
 def get_best_params(res_name: str = "result") -> dict:
-    csv_file_path: str = save_pd_csv()
+    # Only the COMPLETED rows of the event log have results, so each trial is counted once
+    csv_file_path: str = f'{get_current_run_folder()}/state_files/{TRIAL_EVENTS_CSV_FILENAME}'
 
     return get_best_params_from_csv(csv_file_path, args.maximize, res_name)
 
@@ -2732,10 +3645,167 @@ def _count_done_jobs(csv_file_path: str) -> int:
     return _count_sobol_or_completed(csv_file_path, "COMPLETED")
 
 @beartype
-def count_sobol_steps() -> int:
-    csv_file_path: str = save_pd_csv()
+def get_generation_method_of_trial(_trial: Any) -> str:
+    try:
+        model_keys = [str(gr._model_key) for gr in _trial.generator_runs if gr._model_key is not None]
+    except Exception as e: # pragma: no cover
+        print_debug(f"get_generation_method_of_trial: could not get generator runs: {e}")
+        return "Manual"
+
+    if len(model_keys) == 0:
+        return "Manual"
+
+    return ", ".join(model_keys)
+
+@beartype
+def format_results_csv_value(value: Any) -> Any:
+    if isinstance(value, (tuple, list)) and len(value):
+        value = value[0]
+
+    if isinstance(value, float):
+        return f"{value:.30f}"
+
+    return value
+
+@beartype
+def rewrite_trial_events_csv_with_columns(events_csv: str, columns: list) -> None:
+    rows: list = []
+
+    if os.path.exists(events_csv):
+        with open(events_csv, mode="r", encoding="utf-8", newline='') as file:
+            rows = list(csv.DictReader(file))
+
+    def _write(tmp_filepath: str) -> None:
+        with open(tmp_filepath, mode="w", encoding="utf-8", newline='') as file:
+            csv_writer = csv.DictWriter(file, fieldnames=columns, restval="")
+            csv_writer.writeheader()
+            for row in rows:
+                csv_writer.writerow({key: value for key, value in row.items() if key in columns})
+
+    write_file_atomically(events_csv, _write)
+
+    TRIAL_EVENTS_WRITER["columns"] = columns
+    TRIAL_EVENTS_WRITER["nr_rewrites"] += 1
+
+@beartype
+def append_trial_event(trial_index: int, status: str, generation_method: str, raw_data: Optional[dict] = None) -> None:
+    if not ax_client or not get_current_run_folder():
+        return
+
+    try:
+        arm = ax_client.get_trial(trial_index).arm
+    except Exception as e: # pragma: no cover
+        print_debug(f"append_trial_event: could not get parameters of trial {trial_index}: {e}")
+        return
+
+    row: dict = {
+        "trial_index": trial_index,
+        "arm_name": arm.name,
+        "trial_status": status,
+        "generation_method": generation_method
+    }
+
+    for res_name in arg_result_names:
+        row[res_name] = format_results_csv_value(raw_data.get(res_name, "")) if raw_data else ""
+
+    for key, value in arm.parameters.items():
+        row[key] = format_results_csv_value(value)
+
+    write_trial_event_row(f'{get_current_run_folder()}/state_files/{TRIAL_EVENTS_CSV_FILENAME}', row)
+
+@beartype
+def write_trial_event_row(events_csv: str, row: dict) -> None:
+    with STATE_PERSISTER["lock"]:
+        if TRIAL_EVENTS_WRITER["path"] != events_csv:
+            TRIAL_EVENTS_WRITER["path"] = events_csv
+            TRIAL_EVENTS_WRITER["columns"] = []
+
+        columns: list = TRIAL_EVENTS_WRITER["columns"]
+
+        if len(columns) == 0 and os.path.exists(events_csv) and os.path.getsize(events_csv) > 0:
+            with open(events_csv, mode="r", encoding="utf-8", newline='') as file:
+                columns = next(csv.reader(file), [])
+            TRIAL_EVENTS_WRITER["columns"] = columns
+
+        missing_columns = [key for key in row if key not in columns]
+
+        if len(missing_columns):
+            rewrite_trial_events_csv_with_columns(events_csv, [*columns, *missing_columns])
+            columns = TRIAL_EVENTS_WRITER["columns"]
+
+        with open(events_csv, mode="a", encoding="utf-8", newline='') as file:
+            csv_writer = csv.DictWriter(file, fieldnames=columns, restval="")
+            csv_writer.writerow(row)
+
+        TRIAL_EVENTS_WRITER["nr_appended_rows"] += 1
+
+@beartype
+def _ledger_add(status: str, generation_method: Optional[str], nr: int) -> None:
+    TRIAL_LEDGER["status_counts"][status] = TRIAL_LEDGER["status_counts"].get(status, 0) + nr
+
+    if status == "COMPLETED" and generation_method is not None:
+        TRIAL_LEDGER["completed_generation_method_counts"][generation_method] = TRIAL_LEDGER["completed_generation_method_counts"].get(generation_method, 0) + nr
+
+@beartype
+def ledger_set_trial_status(trial_index: int, status: str, generation_method: Optional[str] = None) -> None:
+    with TRIAL_LEDGER_LOCK:
+        old_status = TRIAL_LEDGER["status"].get(trial_index)
+        old_generation_method = TRIAL_LEDGER["generation_method"].get(trial_index)
+
+        if old_status is not None:
+            _ledger_add(old_status, old_generation_method, -1)
+
+        if generation_method is None:
+            generation_method = old_generation_method
+
+        TRIAL_LEDGER["status"][trial_index] = status
 
-    return _count_sobol_steps(csv_file_path)
+        if generation_method is not None:
+            TRIAL_LEDGER["generation_method"][trial_index] = generation_method
+
+        _ledger_add(status, generation_method, 1)
+
+@beartype
+def ledger_record_trial(trial_index: int, status: str, raw_data: Optional[dict] = None) -> None:
+    generation_method = None
+
+    if ax_client and trial_index not in TRIAL_LEDGER["generation_method"]:
+        try:
+            generation_method = get_generation_method_of_trial(ax_client.get_trial(trial_index))
+        except Exception as e: # pragma: no cover
+            print_debug(f"ledger_record_trial: could not get trial {trial_index}: {e}")
+
+    ledger_set_trial_status(trial_index, status, generation_method)
+
+    append_trial_event(trial_index, status, TRIAL_LEDGER["generation_method"].get(trial_index, "Manual"), raw_data)
+
+@beartype
+def ledger_count_status(status: str) -> int:
+    return TRIAL_LEDGER["status_counts"].get(status, 0)
+
+@beartype
+def ledger_count_completed_generation_method(generation_method: str) -> int:
+    return TRIAL_LEDGER["completed_generation_method_counts"].get(generation_method, 0)
+
+@beartype
+def reset_trial_ledger() -> None:
+    with TRIAL_LEDGER_LOCK:
+        for key in TRIAL_LEDGER:
+            TRIAL_LEDGER[key] = {}
+
+@beartype
+def seed_trial_ledger_from_ax_client() -> None:
+    reset_trial_ledger()
+
+    if not ax_client:
+        return
+
+    for trial_index, _trial in ax_client.experiment.trials.items():
+        ledger_set_trial_status(int(trial_index), str(_trial.status.name), get_generation_method_of_trial(_trial))
+
+@beartype
+def count_sobol_steps() -> int:
+    return ledger_count_completed_generation_method("Sobol")
 
 @beartype
 def get_random_steps_from_prev_job() -> int:
@@ -2747,21 +3817,16 @@ def get_random_steps_from_prev_job() -> int:
     if not os.path.exists(prev_step_file):
         return count_sobol_steps()
 
-    return add_to_phase_counter("random", count_sobol_steps() + _count_sobol_steps(f"{args.continue_previous_job}/results.csv"), args.continue_previous_job) # pragma: no cover
+    # Read only: the counter of the previous run must not change, nr=0 never writes
+    return add_to_phase_counter("random", 0, args.continue_previous_job) # pragma: no cover
 
 @beartype
 def failed_jobs(nr: int = 0) -> int:
-    state_files_folder = f"{get_current_run_folder()}/state_files/"
-
-    makedirs(state_files_folder)
-
-    return append_and_read(f'{get_current_run_folder()}/state_files/failed_jobs', nr)
+    return state_store_counter('failed_jobs', nr)
 
 @beartype
 def count_done_jobs() -> int:
-    csv_file_path: str = save_pd_csv()
-
-    return _count_done_jobs(csv_file_path)
+    return ledger_count_status("COMPLETED")
 
 @beartype
 def get_plot_types(x_y_combinations: list, _force: bool = False) -> list:
@@ -3047,14 +4112,15 @@ def show_end_table_and_save_end_files(csv_file_path: str) -> int:
     return _exit
 
 @beartype
-def abandon_job(job: Job, trial_index: int) -> bool: # pragma: no cover
+def abandon_job(job: Any, trial_index: int) -> bool: # pragma: no cover
     global global_vars
 
     if job:
         try:
             if ax_client:
                 _trial = ax_client.get_trial(trial_index)
-                _trial.mark_abandoned()
+                with AX_CLIENT_LOCK:
+                    _trial.mark_abandoned()
                 global_vars["jobs"].remove((job, trial_index))
             else:
                 print_red("ax_client could not be found")
@@ -3075,6 +4141,35 @@ def abandon_all_jobs() -> None: # pragma: no cover
         if not abandoned:
             print_debug(f"Job {job} could not be abandoned.")
 
+@beartype
+def get_candidate_buffer_summary() -> str:
+    nr_requested = CANDIDATE_BUFFER["nr_hits"] + CANDIDATE_BUFFER["nr_misses"]
+    hit_rate = 100 * CANDIDATE_BUFFER["nr_hits"] / nr_requested if nr_requested else 0
+
+    return f"candidate buffer: {CANDIDATE_BUFFER['nr_hits']} hits, {CANDIDATE_BUFFER['nr_misses']} misses ({hit_rate:.1f}% hit rate), {CANDIDATE_BUFFER['nr_generated']} generated, {CANDIDATE_BUFFER['nr_stale']} discarded as stale"
+
+@beartype
+def get_surrogate_refit_summary() -> str:
+    return f"surrogate: {SURROGATE_REFIT_STATE['nr_full_fits']} full fits ({SURROGATE_REFIT_STATE['nr_surprise_refits']} forced by surprising results), {SURROGATE_REFIT_STATE['nr_posterior_fits']} posterior updates with the last hyperparameters"
+
+@beartype
+def get_generation_budget_summary() -> str:
+    return f"generation budget: {GENERATION_BUDGET_STATE['nr_budgeted_gens']} budgeted acquisition optimizations, {GENERATION_BUDGET_STATE['nr_quasi_random_fallbacks']} quasi-random points after the budget ran out"
+
+@beartype
+def get_cost_aware_summary() -> str:
+    return f"cost aware: {COST_AWARE_STATE['nr_selections']} points chosen by expected improvement per second, {COST_AWARE_STATE['nr_cheaper_than_model_choice']} of them quasi-random points that beat the points of the model"
+
+@beartype
+def get_early_stopping_summary() -> str:
+    return f"early stopping: {EARLY_STOPPING_STATE['nr_stopped']} trials stopped early, progress of {len(EARLY_STOPPING_STATE['progress'])} trials seen"
+
+@beartype
+def get_job_state_cache_summary() -> str:
+    saved_calls = max(0, JOB_STATE_CACHE["nr_lookups"] - JOB_STATE_CACHE["nr_bulk_queries"])
+
+    return f"{JOB_STATE_CACHE['nr_lookups']} job state lookups served from {JOB_STATE_CACHE['nr_bulk_queries']} bulk scheduler queries, {saved_calls} scheduler calls saved"
+
 @beartype
 def end_program(csv_file_path: str, _force: Optional[bool] = False, exit_code: Optional[int] = None) -> None:
     global global_vars, END_PROGRAM_RAN
@@ -3118,7 +4213,28 @@ def end_program(csv_file_path: str, _force: Optional[bool] = False, exit_code: O
 
     abandon_all_jobs()
 
-    save_pd_csv()
+    stop_candidate_pregeneration()
+
+    abandon_initial_design_points()
+
+    print_log(f"[end_program] {get_candidate_buffer_summary()}", "info")
+
+    print_log(f"[end_program] {get_surrogate_refit_summary()}", "info")
+
+    if args.max_generation_seconds > 0:
+        print_log(f"[end_program] {get_generation_budget_summary()}", "info")
+
+    if args.cost_aware:
+        print_log(f"[end_program] {get_cost_aware_summary()}", "info")
+
+    if args.early_stopping != "none":
+        print_log(f"[end_program] {get_early_stopping_summary()}", "info")
+
+    stop_worker_pool()
+
+    print_debug(f"[end_program] {get_job_state_cache_summary()}")
+
+    flush_state_persister()
 
     if exit_code:
         _exit = exit_code
@@ -3143,13 +4259,86 @@ def save_checkpoint(trial_nr: int = 0, eee: Union[None, str, Exception] = None)
 
         checkpoint_filepath = f'{state_files_folder}/checkpoint.json'
         if ax_client:
-            ax_client.save_to_json_file(filepath=checkpoint_filepath)
+            with STATE_PERSISTER["lock"]:
+                write_file_atomically(checkpoint_filepath, lambda tmp_filepath: ax_client.save_to_json_file(filepath=tmp_filepath))
         else: # pragma: no cover
             print_red("Something went wrong using the ax_client")
             my_exit(9)
     except Exception as e: # pragma: no cover
         save_checkpoint(trial_nr + 1, e)
 
+@beartype
+def save_state_snapshot() -> None:
+    if not ax_client: # pragma: no cover
+        return
+
+    with AX_CLIENT_LOCK, STATE_PERSISTER["lock"]:
+        save_checkpoint()
+        # results.csv keeps one row per trial for omniopt_share and the .gui pages, the per-transition rows go to the trial event log
+        save_pd_csv()
+
+    STATE_PERSISTER["nr_snapshots"] += 1
+
+@beartype
+def mark_state_dirty() -> None:
+    STATE_PERSISTER["nr_notifications"] += 1
+
+    if STATE_PERSISTER["thread"] is None:
+        save_state_snapshot()
+        return
+
+    STATE_PERSISTER["dirty"].set()
+
+@beartype
+def state_persister_background(interval: float) -> None:
+    while not STATE_PERSISTER["stop"].is_set():
+        STATE_PERSISTER["dirty"].wait()
+
+        if STATE_PERSISTER["stop"].is_set():
+            break
+
+        STATE_PERSISTER["dirty"].clear()
+
+        try:
+            save_state_snapshot()
+        except Exception as e: # pragma: no cover
+            print_debug(f"state_persister_background: saving the state failed: {e}")
+
+        STATE_PERSISTER["stop"].wait(interval)
+
+@beartype
+def start_state_persister_background_job() -> None:
+    if args.state_save_interval <= 0 or STATE_PERSISTER["thread"] is not None: # pragma: no cover
+        return
+
+    STATE_PERSISTER["stop"].clear()
+
+    thread = threading.Thread(target=state_persister_background, args=(args.state_save_interval,), daemon=True)
+    thread.start()
+
+    STATE_PERSISTER["thread"] = thread
+
+@beartype
+def flush_state_persister() -> None:
+    thread = STATE_PERSISTER["thread"]
+
+    if thread is not None:
+        STATE_PERSISTER["stop"].set()
+        STATE_PERSISTER["dirty"].set()
+        thread.join(timeout=60)
+        STATE_PERSISTER["thread"] = None
+
+    STATE_PERSISTER["dirty"].clear()
+
+    save_state_snapshot()
+
+    try:
+        export_state_store_to_flat_files()
+    except Exception as e: # pragma: no cover
+        print_red(f"Exporting the state store to flat files failed: {e}")
+
+    print_debug(f"flush_state_persister: {STATE_PERSISTER['nr_snapshots']} snapshots for {STATE_PERSISTER['nr_notifications']} state changes")
+
 @wrapper_print_debug
 def get_tmp_file_from_json(experiment_args: dict) -> str:
     _tmp_dir = "/tmp"
@@ -3205,8 +4394,8 @@ def get_ax_param_representation(data: dict) -> dict:
             "log_scale": False,
             "logit_scale": False,
             "digits": None,
-            "is_fidelity": False,
-            "target_value": None
+            "is_fidelity": data.get("is_fidelity", False),
+            "target_value": data.get("target_value")
         }
     if data["type"] == "choice": # pragma: no cover
         return {
@@ -3267,12 +4456,11 @@ def die_with_47_if_file_doesnt_exists(_file: str) -> None:
 @wrapper_print_debug
 def copy_state_files_from_previous_job(continue_previous_job: str) -> None:
     for state_file in ["submitted_jobs"]:
-        old_state_file = f"{continue_previous_job}/state_files/{state_file}"
-        new_state_file = f'{get_current_run_folder()}/state_files/{state_file}'
-        die_with_47_if_file_doesnt_exists(old_state_file)
+        if not os.path.exists(f"{continue_previous_job}/state_files/{STATE_STORE_FILENAME}"):
+            die_with_47_if_file_doesnt_exists(f"{continue_previous_job}/state_files/{state_file}")
 
-        if not os.path.exists(new_state_file):
-            shutil.copy(old_state_file, new_state_file)
+        if state_store_counter(state_file) == 0:
+            set_state_store_counter(state_file, state_store_counter(state_file, 0, continue_previous_job))
 
 @beartype
 def die_something_went_wrong_with_parameters() -> None: # pragma: no cover
@@ -3513,6 +4701,10 @@ def get_experiment_parameters(_params: list) -> Any:
 
             ax_client = cast(AxClient, ax_client)
 
+            reinstall_model_extensions()
+
+            seed_trial_ledger_from_ax_client()
+
             os.unlink(tmp_file_path)
 
             state_files_folder = f"{get_current_run_folder()}/state_files"
@@ -3621,7 +4813,7 @@ def parse_single_experiment_parameter_table(experiment_parameters: dict) -> list
             else:
                 _upper = param["bounds"][1]
 
-            rows.append([str(param["name"]), get_type_short(_type), str(helpers.to_int_when_possible(_lower)), str(helpers.to_int_when_possible(_upper)), "", value_type, log_scale])
+            rows.append([str(param["name"]), "fidelity" if param.get("is_fidelity") else get_type_short(_type), str(helpers.to_int_when_possible(_lower)), str(helpers.to_int_when_possible(_upper)), "", value_type, log_scale])
         elif "fixed" in _type.lower():
             rows.append([str(param["name"]), get_type_short(_type), "", "", str(helpers.to_int_when_possible(param["value"])), "", ""])
         elif "choice" in _type.lower():
@@ -3778,7 +4970,7 @@ def get_best_params_str(res_name: str = "result") -> str:
     return ""
 
 @beartype
-def state_from_job(job: Union[str, Job]) -> str:
+def state_from_job(job: Any) -> str:
     job_string = f'{job}'
     match = re.search(r'state="([^"]+)"', job_string)
 
@@ -3791,17 +4983,126 @@ def state_from_job(job: Union[str, Job]) -> str:
 
     return state
 
-@beartype
-def get_workers_string() -> str:
-    string = ""
+JOB_STATE_CACHE: dict = {
+    "states": {},
+    "last_refresh": 0.0,
+    "nr_bulk_queries": 0,
+    "nr_lookups": 0
+}
 
-    string_keys: list = []
-    string_values: list = []
+SLURM_ACTIVE_JOB_STATES: list = ["pending", "running", "configuring", "completing", "requeued", "resizing", "suspended", "signaling", "stage_out"]
 
-    stats: dict = {}
+@beartype
+def parse_slurm_job_states(output: str) -> dict:
+    states: dict = {}
+
+    for line in output.splitlines():
+        parts = line.strip().split("|")
+
+        if len(parts) < 2 or not parts[0] or "." in parts[0]:
+            continue
+
+        state = parts[1].strip().split(" ")[0].lower()
+
+        if state:
+            states[parts[0].strip()] = state
+
+    return states
+
+@beartype
+def query_slurm_job_states(command: list) -> dict:
+    JOB_STATE_CACHE["nr_bulk_queries"] += 1
+
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, check=False, timeout=60)
+    except (OSError, subprocess.TimeoutExpired) as e: # pragma: no cover
+        print_debug(f"query_slurm_job_states: {' '.join(command)} failed: {e}")
+        return {}
+
+    return parse_slurm_job_states(result.stdout)
+
+@beartype
+def uses_slurm_job_state_cache(job: Any) -> bool:
+    return job is not None and SYSTEM_HAS_SBATCH and not args.force_local_execution and isinstance(job, submitit.SlurmJob)
+
+@beartype
+def refresh_job_state_cache(force: bool = False) -> None:
+    if not force and time.time() - JOB_STATE_CACHE["last_refresh"] < args.job_state_cache_seconds:
+        return
+
+    JOB_STATE_CACHE["last_refresh"] = time.time()
+
+    job_ids = [str(job.job_id) for job, _ in global_vars["jobs"][:] if uses_slurm_job_state_cache(job)]
+
+    if len(job_ids) == 0:
+        JOB_STATE_CACHE["states"] = {}
+        return
+
+    # --array lists pending job array tasks one by one (123_4 instead of 123_[4-9])
+    states = query_slurm_job_states(["squeue", "--noheader", "--array", "--format=%i|%T", f"--jobs={','.join(job_ids)}"])
+
+    missing_job_ids = [job_id for job_id in job_ids if job_id not in states]
+
+    if len(missing_job_ids): # pragma: no cover
+        states.update(query_slurm_job_states(["sacct", "--noheader", "--parsable2", "--format=JobID,State", f"--jobs={','.join(missing_job_ids)}"]))
+
+    JOB_STATE_CACHE["states"] = states
+
+@beartype
+def get_cached_job_state(job: Any) -> Optional[str]:
+    if not uses_slurm_job_state_cache(job):
+        return None
+
+    refresh_job_state_cache()
+
+    state = JOB_STATE_CACHE["states"].get(str(job.job_id))
+
+    if state is not None:
+        JOB_STATE_CACHE["nr_lookups"] += 1
+
+    return state
+
+@beartype
+def get_job_state(job: Any) -> str:
+    state = get_cached_job_state(job)
+
+    if state is None:
+        return state_from_job(job)
+
+    return state
+
+@beartype
+def invalidate_job_state_cache() -> None:
+    JOB_STATE_CACHE["last_refresh"] = 0.0
+
+@beartype
+def has_result_pickle(job: Any) -> bool:
+    result_pickle = getattr(getattr(job, "paths", None), "result_pickle", None)
+
+    return result_pickle is not None and os.path.exists(result_pickle)
+
+@beartype
+def is_job_done(job: Any) -> bool:
+    if type(job) in [LocalJob, DebugJob]:
+        return True
+
+    # A written result is newer than any cached scheduler state
+    if not has_result_pickle(job) and get_cached_job_state(job) in SLURM_ACTIVE_JOB_STATES:
+        return False
+
+    return job.done()
+
+@beartype
+def get_workers_string() -> str:
+    string = ""
+
+    string_keys: list = []
+    string_values: list = []
+
+    stats: dict = {}
 
     for job, _ in global_vars["jobs"][:]: # pragma: no cover
-        state = state_from_job(job)
+        state = get_job_state(job)
 
         if state not in stats.keys():
             stats[state] = 0
@@ -3827,11 +5128,7 @@ def get_workers_string() -> str:
 
 @wrapper_print_debug
 def submitted_jobs(nr: int = 0) -> int:
-    state_files_folder = f"{get_current_run_folder()}/state_files/"
-
-    makedirs(state_files_folder)
-
-    return append_and_read(f'{get_current_run_folder()}/state_files/submitted_jobs', nr)
+    return state_store_counter('submitted_jobs', nr)
 
 @beartype
 def get_slurm_in_brackets(in_brackets: list) -> list:
@@ -3924,7 +5221,7 @@ def progressbar_description(new_msgs: list[str] = []) -> None:
 @wrapper_print_debug
 def clean_completed_jobs() -> None:
     for job, trial_index in global_vars["jobs"][:]: # pragma: no cover
-        _state = state_from_job(job)
+        _state = get_job_state(job)
         #print_debug(f'clean_completed_jobs: Job {job} (trial_index: {trial_index}) has state {_state}')
         if _state in ["completed", "early_stopped", "abandoned", "cancelled"]:
             global_vars["jobs"].remove((job, trial_index))
@@ -4174,14 +5471,16 @@ def insert_job_into_ax_client(old_arm_parameter: dict, old_result: dict, hashed_
     while not done_converting:
         try:
             if ax_client:
-                new_old_trial = ax_client.attach_trial(old_arm_parameter)
+                with AX_CLIENT_LOCK:
+                    new_old_trial = ax_client.attach_trial(old_arm_parameter)
 
-                ax_client.complete_trial(trial_index=new_old_trial[1], raw_data=old_result)
+                    ax_client.complete_trial(trial_index=new_old_trial[1], raw_data=old_result)
+                ledger_record_trial(new_old_trial[1], "COMPLETED", old_result)
 
                 already_inserted_param_hashes[hashed_params_result] = 1
 
                 done_converting = True
-                save_pd_csv()
+                mark_state_dirty()
             else:
                 print_red("Error getting ax_client")
                 my_exit(9)
@@ -4607,14 +5906,151 @@ def get_hostname_from_outfile(stdout_path: Optional[str]) -> Optional[str]:
 def mark_trial_as_failed(_trial: Any) -> None:
     print_debug(f"Marking trial {_trial} as failed")
     try:
-        _trial.mark_failed()
+        with AX_CLIENT_LOCK:
+            _trial.mark_failed()
     except ValueError as e:
         print_debug(f"mark_trial_as_failed error: {e}")
 
 @beartype
 def mark_trial_as_completed(_trial: Any) -> None:
     print_debug(f"Marking trial {_trial} as completed")
-    _trial.mark_completed(unsafe=True)
+    with AX_CLIENT_LOCK:
+        _trial.mark_completed(unsafe=True)
+
+@beartype
+def parse_progress_line(line: str) -> Optional[Tuple[float, float]]:
+    """Parses 'OO_PROGRESS step=10 loss=0.3' into (step, value), the value is negated when the first result is maximized."""
+    if not line.startswith("OO_PROGRESS"):
+        return None
+
+    pairs: dict = {}
+
+    for part in line.split()[1:]:
+        if "=" in part:
+            key, value = part.split("=", 1)
+            pairs[key] = value
+
+    if "step" not in pairs:
+        return None
+
+    metric_name = args.early_stopping_metric or arg_result_names[0]
+
+    if metric_name not in pairs:
+        other_keys = [key for key in pairs if key != "step"]
+
+        if args.early_stopping_metric is not None or len(other_keys) != 1:
+            return None
+
+        metric_name = other_keys[0]
+
+    try:
+        step = float(pairs["step"])
+        value = float(pairs[metric_name])
+    except ValueError:
+        return None
+
+    if math.isnan(value):
+        return None
+
+    return step, value if arg_result_min_or_max[0] == "min" else -value
+
+@beartype
+def read_new_progress_lines(job: Any, trial_index: int) -> None:
+    try:
+        stdout_path = str(job.paths.stdout.resolve())
+    except Exception as e: # pragma: no cover
+        print_debug(f"read_new_progress_lines: no stdout path for trial {trial_index}: {e}")
+        return
+
+    if not os.path.exists(stdout_path):
+        return
+
+    with open(stdout_path, mode="r", encoding="utf-8", errors="replace") as f:
+        f.seek(EARLY_STOPPING_STATE["read_offsets"].get(trial_index, 0))
+        new_text = EARLY_STOPPING_STATE["partial_lines"].get(trial_index, "") + f.read()
+        EARLY_STOPPING_STATE["read_offsets"][trial_index] = f.tell()
+
+    lines = new_text.split("\n")
+
+    # The last line may still be written to, keep it for the next call
+    EARLY_STOPPING_STATE["partial_lines"][trial_index] = lines.pop()
+
+    for line in lines:
+        progress = parse_progress_line(line.strip())
+
+        if progress is not None:
+            EARLY_STOPPING_STATE["progress"].setdefault(trial_index, {})[progress[0]] = progress[1]
+
+@beartype
+def get_progress_up_to_step(progress: dict, step: float) -> list:
+    return [value for progress_step, value in sorted(progress.items()) if progress_step <= step]
+
+@beartype
+def should_stop_trial_early(trial_index: int) -> bool:
+    progress = EARLY_STOPPING_STATE["progress"].get(trial_index)
+
+    if not progress:
+        return False
+
+    step = max(progress.keys())
+
+    if step < args.early_stopping_min_step:
+        return False
+
+    values_of_others: list = []
+
+    for other_trial_index, other_progress in EARLY_STOPPING_STATE["progress"].items():
+        if other_trial_index == trial_index or max(other_progress.keys()) < step:
+            continue
+
+        other_values = get_progress_up_to_step(other_progress, step)
+
+        if len(other_values):
+            values_of_others.append(sum(other_values) / len(other_values) if args.early_stopping == "median" else other_values[-1])
+
+    if len(values_of_others) < args.early_stopping_min_trials:
+        return False
+
+    if args.early_stopping == "median":
+        return min(progress.values()) > float(np.median(values_of_others))
+
+    return progress[step] > float(np.percentile(values_of_others, 100 - args.early_stopping_percentile))
+
+@beartype
+def stop_trial_early(job: Any, trial_index: int) -> None:
+    print_debug(f"stop_trial_early: trial {trial_index} is worse than the other trials at step {max(EARLY_STOPPING_STATE['progress'][trial_index].keys())}, cancelling {job}")
+
+    try:
+        job.cancel()
+    except Exception as e: # pragma: no cover
+        print_debug(f"stop_trial_early: could not cancel job of trial {trial_index}: {e}")
+
+    if ax_client:
+        with AX_CLIENT_LOCK:
+            ax_client.stop_trial_early(trial_index=trial_index)
+
+    ledger_record_trial(trial_index, "EARLY_STOPPED")
+
+    EARLY_STOPPING_STATE["nr_stopped"] += 1
+
+    global_vars["jobs"].remove((job, trial_index))
+
+    notify_candidate_pregeneration()
+
+@beartype
+def check_early_stopping(job: Any, trial_index: int) -> bool:
+    try:
+        read_new_progress_lines(job, trial_index)
+    except Exception as e: # pragma: no cover
+        print_debug(f"check_early_stopping: could not read the progress of trial {trial_index}: {e}")
+        return False
+
+    if not should_stop_trial_early(trial_index):
+        return False
+
+    stop_trial_early(job, trial_index)
+
+    return True
 
 @beartype
 def finish_job_core(job: Any, trial_index: int, this_jobs_finished: int) -> int:
@@ -4628,9 +6064,10 @@ def finish_job_core(job: Any, trial_index: int, this_jobs_finished: int) -> int:
         _trial = ax_client.get_trial(trial_index)
 
         if result != VAL_IF_NOTHING_FOUND:
-            ax_client.complete_trial(trial_index=trial_index, raw_data=raw_result)
-
-            #count_done_jobs(1)
+            with AX_CLIENT_LOCK:
+                ax_client.complete_trial(trial_index=trial_index, raw_data=raw_result)
+            ledger_record_trial(trial_index, "COMPLETED", raw_result)
+            notify_candidate_pregeneration()
             try:
                 progressbar_description([f"new result: {result}"])
                 mark_trial_as_completed(_trial)
@@ -4642,12 +6079,14 @@ def finish_job_core(job: Any, trial_index: int, this_jobs_finished: int) -> int:
             if job:
                 try:
                     progressbar_description(["job_failed"])
-                    ax_client.log_trial_failure(trial_index=trial_index)
+                    with AX_CLIENT_LOCK:
+                        ax_client.log_trial_failure(trial_index=trial_index)
                 except Exception as e: # pragma: no cover
                     print(f"ERROR in line {get_line_info()}: {e}")
                 job.cancel()
                 mark_trial_as_failed(_trial)
                 orchestrate_job(job, trial_index)
+            ledger_record_trial(trial_index, "FAILED")
             failed_jobs(1)
     else: # pragma: no cover
         print_red("ax_client could not be found or used")
@@ -4664,7 +6103,8 @@ def finish_previous_jobs(new_msgs: list[str]) -> None:
 
     this_jobs_finished = 0
 
-    print_debug(f"jobs in finish_previous_jobs: {global_vars['jobs']}")
+    if is_log_level_enabled("debug"):
+        print_debug(f"jobs in finish_previous_jobs: {global_vars['jobs']}")
 
     for job, trial_index in global_vars["jobs"][:]:
         # Poll if any jobs completed
@@ -4673,9 +6113,17 @@ def finish_previous_jobs(new_msgs: list[str]) -> None:
             print_debug(f"finish_previous_jobs: job {job} is None")
             continue
 
-        print_debug(f"finish_previous_jobs: single job {job}")
+        if is_log_level_enabled("debug"):
+            print_debug(f"finish_previous_jobs: single job {job}")
+
+        if is_job_done(job):
+            if args.early_stopping != "none":
+                # Keep the whole curve of finished trials, running trials are compared against it
+                try:
+                    read_new_progress_lines(job, trial_index)
+                except Exception as e: # pragma: no cover
+                    print_debug(f"finish_previous_jobs: could not read the progress of trial {trial_index}: {e}")
 
-        if job.done() or type(job) in [LocalJob, DebugJob]:
             try:
                 this_jobs_finished = finish_job_core(job, trial_index, this_jobs_finished)
             except (FileNotFoundError, submitit.core.utils.UncompletedJobError, ax.exceptions.core.UserInputError) as error: # pragma: no cover
@@ -4688,7 +6136,8 @@ def finish_previous_jobs(new_msgs: list[str]) -> None:
                         progressbar_description(["job_failed"])
                         if ax_client:
                             _trial = ax_client.get_trial(trial_index)
-                            ax_client.log_trial_failure(trial_index=trial_index)
+                            with AX_CLIENT_LOCK:
+                                ax_client.log_trial_failure(trial_index=trial_index)
                             mark_trial_as_failed(_trial)
                         else:
                             print_red("ax_client failed")
@@ -4697,11 +6146,14 @@ def finish_previous_jobs(new_msgs: list[str]) -> None:
                         print(f"ERROR in line {get_line_info()}: {e}")
                     job.cancel()
                     orchestrate_job(job, trial_index)
+                ledger_record_trial(trial_index, "FAILED")
                 failed_jobs(1)
                 this_jobs_finished += 1
                 global_vars["jobs"].remove((job, trial_index))
-            save_checkpoint()
-            save_pd_csv()
+            mark_state_dirty()
+        elif args.early_stopping != "none" and check_early_stopping(job, trial_index):
+            progressbar_description([f"stopped trial {trial_index} early"])
+            mark_state_dirty()
         else: # pragma: no cover
             if f"{job}" != "SlurmJob":
                 print_debug(f"finish_previous_jobs: job was neither done, nor LocalJob nor DebugJob, but {job}")
@@ -4745,7 +6197,7 @@ def check_orchestrator(stdout_path: str, trial_index: int) -> list: # pragma: no
     return behavs
 
 @beartype
-def orchestrate_job(job: Job, trial_index: int) -> None:
+def orchestrate_job(job: Any, trial_index: int) -> None:
     stdout_path = str(job.paths.stdout.resolve())
     stderr_path = str(job.paths.stderr.resolve())
 
@@ -4775,21 +6227,11 @@ def orchestrate_job(job: Job, trial_index: int) -> None:
 
 @beartype
 def is_already_in_defective_nodes(hostname: str) -> bool: # pragma: no cover
-    file_path = os.path.join(get_current_run_folder(), "state_files", "defective_nodes")
-
-    makedirs(os.path.dirname(file_path))
-
-    if not os.path.isfile(file_path):
-        print_red(f"is_already_in_defective_nodes: Error: The file {file_path} does not exist.")
-        return False
-
     try:
-        with open(file_path, mode="r", encoding="utf-8") as file:
-            for line in file:
-                if line.strip() == hostname:
-                    return True
-    except Exception as e: # pragma: no cover
-        print_red(f"is_already_in_defective_nodes: Error reading the file {file_path}: {e}")
+        if hostname in state_store_defective_nodes():
+            return True
+    except sqlite3.Error as e: # pragma: no cover
+        print_red(f"is_already_in_defective_nodes: Error reading the defective nodes: {e}")
         return False
 
     return False
@@ -4804,11 +6246,12 @@ def orchestrator_start_trial(params_from_out_file: str, trial_index: int) -> Non
 
         _trial = ax_client.get_trial(trial_index)
 
-        try:
-            _trial.mark_staged(unsafe=True)
-        except Exception as e:
-            print_debug(f"orchestrator_start_trial: error {e}")
-        _trial.mark_running(unsafe=True, no_runner_required=True)
+        with AX_CLIENT_LOCK:
+            try:
+                _trial.mark_staged(unsafe=True)
+            except Exception as e:
+                print_debug(f"orchestrator_start_trial: error {e}")
+            _trial.mark_running(unsafe=True, no_runner_required=True)
 
         global_vars["jobs"].append((new_job, trial_index))
     else:
@@ -4931,6 +6374,10 @@ def save_state_files() -> None:
     with open(f'{state_files_folder}/joined_run_program', mode='w', encoding="utf-8") as f:
         original_print(global_vars["joined_run_program"], file=f)
 
+    if global_vars["run_function"]:
+        with open(f'{state_files_folder}/run_function', mode='w', encoding="utf-8") as f:
+            original_print(global_vars["run_function"], file=f)
+
     with open(f'{state_files_folder}/experiment_name', mode='w', encoding="utf-8") as f:
         original_print(global_vars["experiment_name"], file=f)
 
@@ -4955,7 +6402,7 @@ def save_state_files() -> None:
         original_print("omniopt '" + " ".join(sys.argv[1:]), file=f)
 
 @beartype
-def submit_job(parameters: dict) -> Union[None, Job[dict[Any, Any]]]:
+def submit_job(parameters: dict) -> Any:
     try:
         if executor:
             new_job = executor.submit(evaluate, parameters)
@@ -4970,23 +6417,25 @@ def submit_job(parameters: dict) -> Union[None, Job[dict[Any, Any]]]:
 
     return None # pragma: no cover
 
+@beartype
+def mark_trial_stage(_trial: Any, stage: str, error_msg: str) -> None:
+    try:
+        with AX_CLIENT_LOCK:
+            getattr(_trial, stage)()
+    except Exception as e: # pragma: no cover
+        print_debug(f"mark_trial_stage({_trial}, {stage}): {error_msg} with error: {e}")
+
 @beartype
 def execute_evaluation(_params: list) -> Optional[int]:
     global global_vars
 
-    print_debug(f"execute_evaluation({_params})")
+    if is_log_level_enabled("debug"):
+        print_debug(f"execute_evaluation({_params})")
     trial_index, parameters, trial_counter, next_nr_steps, phase = _params
     if ax_client:
         _trial = ax_client.get_trial(trial_index)
 
-        # Helper function for trial stage marking with exception handling
-        def mark_trial_stage(stage: str, error_msg: str) -> None:
-            try:
-                getattr(_trial, stage)()
-            except Exception as e: # pragma: no cover
-                print_debug(f"execute_evaluation({_params}): {error_msg} with error: {e}")
-
-        mark_trial_stage("mark_staged", "Marking the trial as staged failed")
+        mark_trial_stage(_trial, "mark_staged", "Marking the trial as staged failed")
 
         new_job = None
 
@@ -4995,10 +6444,13 @@ def execute_evaluation(_params: list) -> Optional[int]:
             new_job = submit_job(parameters)
 
             global_vars["jobs"].append((new_job, trial_index))
+            if new_job:
+                state_store_add_job(str(new_job.job_id), trial_index)
             if is_slurm_job() and not args.force_local_execution: # pragma: no cover
                 _sleep(1)
 
-            mark_trial_stage("mark_running", "Marking the trial as running failed")
+            mark_trial_stage(_trial, "mark_running", "Marking the trial as running failed")
+            ledger_record_trial(trial_index, "RUNNING")
             trial_counter += 1
 
             update_progress()
@@ -5018,6 +6470,197 @@ def execute_evaluation(_params: list) -> Optional[int]:
 
     return None # pragma: no cover
 
+@beartype
+def execute_evaluations_as_job_array(trial_index_to_param: dict, phase: Optional[str]) -> int:
+    if not ax_client or not executor: # pragma: no cover
+        print_red("ax_client or executor could not be found")
+        my_exit(9)
+        return 0
+
+    print_debug(f"execute_evaluations_as_job_array: submitting {len(trial_index_to_param)} trials as one job array")
+
+    for trial_index in trial_index_to_param.keys():
+        mark_trial_stage(ax_client.get_trial(trial_index), "mark_staged", "Marking the trial as staged failed")
+
+    submitted: list = []
+
+    try:
+        initialize_job_environment()
+
+        with executor.batch():
+            for trial_index, parameters in trial_index_to_param.items():
+                submitted.append((executor.submit(evaluate, parameters), trial_index))
+    except submitit.core.utils.FailedJobError as error: # pragma: no cover
+        print_red(f"\n⚠ FAILED: {error}")
+
+        for trial_index in trial_index_to_param.keys():
+            try:
+                with AX_CLIENT_LOCK:
+                    ax_client.log_trial_failure(trial_index=trial_index)
+            except Exception as e:
+                print(f"ERROR in line {get_line_info()}: {e}")
+            ledger_record_trial(trial_index, "FAILED")
+            failed_jobs(1)
+
+        return 0
+    except (SignalUSR, SignalINT, SignalCONT): # pragma: no cover
+        handle_exit_signal()
+    except Exception as e: # pragma: no cover
+        handle_generic_error(e)
+        return 0
+
+    for new_job, trial_index in submitted:
+        submitted_jobs(1)
+
+        global_vars["jobs"].append((new_job, trial_index))
+        state_store_add_job(str(new_job.job_id), trial_index)
+
+        mark_trial_stage(ax_client.get_trial(trial_index), "mark_running", "Marking the trial as running failed")
+        ledger_record_trial(trial_index, "RUNNING")
+
+        add_to_phase_counter(phase, 1)
+
+    update_progress()
+
+    return len(submitted)
+
+@beartype
+def get_batch_objective_input(trial_index_to_param: dict) -> Tuple[list, Any]:
+    parameter_names = global_vars["parameter_names"] or list(next(iter(trial_index_to_param.values())).keys())
+
+    rows = [[parameters[name] for name in parameter_names] for parameters in trial_index_to_param.values()]
+
+    try:
+        return parameter_names, np.array(rows, dtype=float)
+    except ValueError:
+        # Choice parameters with strings
+        return parameter_names, np.array(rows, dtype=object)
+
+@beartype
+def get_batch_objective_output(return_value: Any, nr_of_trials: int) -> Optional[Any]:
+    try:
+        results = np.asarray(return_value, dtype=float)
+    except (TypeError, ValueError) as e:
+        print_red(f"--batch_objective: the function did not return an array of numbers: {e}")
+        return None
+
+    if results.ndim == 1:
+        results = results[:, None]
+
+    if results.shape != (nr_of_trials, len(arg_result_names)):
+        print_red(f"--batch_objective: expected a result array of shape ({nr_of_trials}, {len(arg_result_names)}), got {results.shape}")
+        return None
+
+    return results
+
+@beartype
+def complete_batch_of_trials(trial_results: dict) -> None:
+    """Attaches the results of all successful trials of a batch to the experiment at once."""
+    if not ax_client or len(trial_results) == 0:
+        return
+
+    experiment = ax_client.experiment
+
+    rows = []
+
+    for trial_index, raw_result in trial_results.items():
+        arm_name = experiment.trials[trial_index].arm.name
+
+        for metric_name, value in raw_result.items():
+            rows.append({
+                "arm_name": arm_name,
+                "metric_name": metric_name,
+                "mean": value,
+                "sem": float("nan"),
+                "trial_index": trial_index
+            })
+
+    with AX_CLIENT_LOCK:
+        experiment.attach_data(Data(df=pd.DataFrame(rows)))
+
+        for trial_index in trial_results.keys():
+            mark_trial_as_completed(experiment.trials[trial_index])
+
+@beartype
+def execute_trials_as_batch(trial_index_to_param: dict, phase: Optional[str]) -> int:
+    """Evaluates all trials of this round with one call of the --run_function in the main process."""
+    if not ax_client: # pragma: no cover
+        print_red("ax_client could not be found")
+        my_exit(9)
+        return 0
+
+    # Like execute_trials, do not evaluate more than --max_eval trials
+    nr_of_remaining_evaluations = max_eval + get_nr_of_imported_jobs() - submitted_jobs()
+    trial_index_to_param = dict(list(trial_index_to_param.items())[:max(0, nr_of_remaining_evaluations)])
+
+    nr_of_trials = len(trial_index_to_param)
+
+    if nr_of_trials == 0:
+        return 0
+
+    parameter_names, inputs = get_batch_objective_input(trial_index_to_param)
+
+    print_debug(f"execute_trials_as_batch: evaluating {nr_of_trials} trials in one call")
+
+    for trial_index in trial_index_to_param.keys():
+        mark_trial_stage(ax_client.get_trial(trial_index), "mark_running", "Marking the trial as running failed")
+        ledger_record_trial(trial_index, "RUNNING")
+
+    submitted_jobs(nr_of_trials)
+    add_to_phase_counter(phase, nr_of_trials)
+
+    progressbar_description([f"evaluating {nr_of_trials} trials in one batch"])
+
+    start_time = time.time()
+
+    stdout_buffer = io.StringIO()
+
+    with contextlib.redirect_stdout(stdout_buffer):
+        try:
+            results = get_batch_objective_output(get_run_function()(inputs), nr_of_trials)
+            exit_code = 0 if results is not None else 1
+        except (SignalUSR, SignalINT, SignalCONT): # pragma: no cover
+            raise
+        except Exception as e:
+            print_red(f"--batch_objective: {global_vars['run_function']} failed: {e}")
+            results = None
+            exit_code = 1
+
+    end_time = time.time()
+
+    program_string = f"{global_vars['run_function']}(<{nr_of_trials} x {len(parameter_names)} array>)"
+
+    trial_results: dict = {}
+
+    for row, (trial_index, parameters) in enumerate(trial_index_to_param.items()):
+        raw_result = None
+
+        if results is not None and not np.isnan(results[row]).any():
+            raw_result = {name: float(value) for name, value in zip(arg_result_names, results[row])}
+            trial_results[trial_index] = raw_result
+
+        write_job_infos_csv(parameters, stdout_buffer.getvalue() if row == 0 else None, program_string, exit_code, None, raw_result, int(start_time), int(end_time), (end_time - start_time) / nr_of_trials)
+
+        if raw_result is None:
+            with AX_CLIENT_LOCK:
+                ax_client.log_trial_failure(trial_index=trial_index)
+            write_failed_logs(parameters, "No Result")
+            ledger_record_trial(trial_index, "FAILED")
+            failed_jobs(1)
+
+    complete_batch_of_trials(trial_results)
+
+    for trial_index, raw_result in trial_results.items():
+        ledger_record_trial(trial_index, "COMPLETED", raw_result)
+
+    succeeded_jobs(len(trial_results))
+    update_progress_bar(progress_bar, len(trial_results))
+
+    notify_candidate_pregeneration()
+    mark_state_dirty()
+
+    return nr_of_trials
+
 @beartype
 def initialize_job_environment() -> None:
     progressbar_description(["starting new job"])
@@ -5059,19 +6702,20 @@ def cancel_failed_job(trial_index: int, new_job: Job) -> None: # pragma: no cove
     if new_job:
         try:
             if ax_client:
-                ax_client.log_trial_failure(trial_index=trial_index)
+                with AX_CLIENT_LOCK:
+                    ax_client.log_trial_failure(trial_index=trial_index)
             else:
                 print_red("ax_client not defined")
                 my_exit(9)
         except Exception as e: # pragma: no cover
             print(f"ERROR in line {get_line_info()}: {e}")
         new_job.cancel()
+        ledger_record_trial(trial_index, "FAILED")
         print_debug("Cancelled failed job")
 
         global_vars["jobs"].remove((new_job, trial_index))
         print_debug("Removed failed job")
-        save_checkpoint()
-        save_pd_csv()
+        mark_state_dirty()
     else:
         print_debug("cancel_failed_job: new_job was undefined")
 
@@ -5092,11 +6736,7 @@ def handle_generic_error(e: Union[Exception, str]) -> None: # pragma: no cover
 
 @beartype
 def succeeded_jobs(nr: int = 0) -> int:
-    state_files_folder = f"{get_current_run_folder()}/state_files/"
-
-    makedirs(state_files_folder)
-
-    return append_and_read(f'{get_current_run_folder()}/state_files/succeeded_jobs', nr)
+    return state_store_counter('succeeded_jobs', nr)
 
 @beartype
 def show_debug_table_for_break_run_search(_name: str, _max_eval: Optional[int], _progress_bar: Any, _ret: Any) -> None: # pragma: no cover
@@ -5211,22 +6851,801 @@ def get_parallelism_schedule_description() -> str:
     except Exception as e: # pragma: no cover
         return f"An error occurred while processing parallelism schedule: {str(e)}"
 
-@disable_logs
-def _fetch_next_trials(nr_of_jobs_to_get: int) -> Optional[Tuple[dict[int, Any], bool]]:
-    """Attempts to fetch the next trials using the ax_client."""
-    try:
+@beartype
+def has_random_generation_step() -> bool:
+    return random_steps is not None and random_steps >= 1 and get_nr_of_imported_jobs() < random_steps
+
+@beartype
+def get_nr_of_sobol_trials() -> int:
+    with TRIAL_LEDGER_LOCK:
+        return len([generation_method for generation_method in TRIAL_LEDGER["generation_method"].values() if generation_method == "Sobol"])
+
+@beartype
+def random_generation_step_is_done() -> bool:
+    if not has_random_generation_step():
+        return True
+
+    return get_nr_of_sobol_trials() + len(INITIAL_DESIGN["queue"]) >= max(num_parallel_jobs, random_steps)
+
+@beartype
+def split_generator_run(generator_run: Any, arm: Any, generation_step_index: Optional[int] = None, generation_node_name: Optional[str] = None) -> Any:
+    return GeneratorRun(
+        arms=[arm],
+        optimization_config=generator_run.optimization_config,
+        search_space=generator_run.search_space,
+        model_key=generator_run._model_key,
+        model_kwargs=generator_run._model_kwargs,
+        bridge_kwargs=generator_run._bridge_kwargs,
+        gen_metadata=generator_run.gen_metadata,
+        generation_step_index=generator_run._generation_step_index if generation_step_index is None else generation_step_index,
+        generation_node_name=generator_run._generation_node_name if generation_node_name is None else generation_node_name
+    )
+
+@beartype
+def get_nr_of_initial_design_points() -> int:
+    if not has_random_generation_step():
+        return 0
+
+    return max(0, min(max(num_parallel_jobs, random_steps), max_eval) - get_nr_of_sobol_trials())
+
+@disable_logs
+def create_initial_design() -> None:
+    nr_of_points = get_nr_of_initial_design_points()
+
+    if not args.bulk_initial_design or nr_of_points == 0 or not ax_client:
+        return
+
+    start_time = time.time()
+
+    experiment = ax_client.experiment
+
+    generator_run = Models.SOBOL(search_space=experiment.search_space, seed=args.seed).gen(n=nr_of_points)
+
+    # Tag the trials as coming from the random step, so the generation strategy counts them and moves on to the model afterwards
+    random_step = ax_client.generation_strategy._steps[0]
+    random_step_name = getattr(random_step, "node_name", None)
+
+    with AX_CLIENT_LOCK:
+        for arm in generator_run.arms:
+            trial = experiment.new_trial(generator_run=split_generator_run(generator_run, arm, 0, random_step_name))
+            trial.mark_running(no_runner_required=True)
+
+            INITIAL_DESIGN["queue"].append((trial.index, arm.parameters))
+
+    INITIAL_DESIGN["nr_generated"] += len(generator_run.arms)
+
+    mark_state_dirty()
+
+    print_debug(f"create_initial_design: created {len(generator_run.arms)} Sobol trials in {time.time() - start_time:.3f}s")
+
+@beartype
+def pop_initial_design_points(nr_of_jobs_to_get: int) -> dict:
+    trials_dict: dict = {}
+
+    while len(trials_dict) < nr_of_jobs_to_get and len(INITIAL_DESIGN["queue"]):
+        trial_index, params = INITIAL_DESIGN["queue"].pop(0)
+        trials_dict[trial_index] = params
+
+    return trials_dict
+
+@beartype
+def abandon_initial_design_points() -> None:
+    for trial_index, _ in INITIAL_DESIGN["queue"]:
+        try:
+            if ax_client:
+                with AX_CLIENT_LOCK:
+                    ax_client.get_trial(trial_index).mark_abandoned()
+        except Exception as e: # pragma: no cover
+            print_debug(f"abandon_initial_design_points: could not abandon trial {trial_index}: {e}")
+
+    INITIAL_DESIGN["queue"] = []
+
+@beartype
+def _fetch_next_trials_jointly(nr_of_jobs_to_get: int, with_pending_observations: bool = True) -> dict:
+    """Generates all candidates with one model fit and turns each arm into its own trial."""
+    if not ax_client: # pragma: no cover
+        print_red("ax_client was not defined")
+        my_exit(9)
+        return {}
+
+    experiment = ax_client.experiment
+
+    with AX_CLIENT_LOCK:
+        pending_observations = get_pending_observation_features_based_on_trial_status(experiment) if with_pending_observations else None
+
+    generator_run = ax_client.generation_strategy.gen(
+        experiment=experiment,
+        n=nr_of_jobs_to_get,
+        pending_observations=pending_observations
+    )
+
+    trials_dict: dict = {}
+
+    with AX_CLIENT_LOCK:
+        for arm in generator_run.arms:
+            trial = experiment.new_trial(generator_run=split_generator_run(generator_run, arm))
+            trial.mark_running(no_runner_required=True)
+
+            trials_dict[trial.index] = arm.parameters
+
+    return trials_dict
+
+@beartype
+def get_job_infos_df() -> Optional[pd.DataFrame]:
+    job_infos_csv = f"{get_current_run_folder()}/job_infos.csv"
+
+    if not os.path.exists(job_infos_csv):
+        return None
+
+    size = os.path.getsize(job_infos_csv)
+
+    # Only reread the file when it has grown since the last call
+    if size != JOB_INFOS_CACHE["size"]:
+        try:
+            JOB_INFOS_CACHE["df"] = read_job_infos_csv(job_infos_csv)
+        except Exception as e: # pragma: no cover
+            print_debug(f"get_job_infos_df: could not read {job_infos_csv}: {e}")
+
+        JOB_INFOS_CACHE["size"] = size
+
+    return JOB_INFOS_CACHE["df"]
+
+@beartype
+def read_job_infos_csv(job_infos_csv: str) -> pd.DataFrame:
+    df = pd.read_csv(job_infos_csv, on_bad_lines="skip")
+    df["run_time"] = pd.to_numeric(df["run_time"], errors="coerce")
+
+    return df[df["run_time"].notna()]
+
+@beartype
+def get_mean_trial_runtime() -> Optional[float]:
+    df = get_job_infos_df()
+
+    if df is None or len(df) == 0:
+        return None
+
+    return float(df["run_time"].mean())
+
+@beartype
+def get_generation_budget() -> Optional[float]:
+    if args.max_generation_seconds <= 0:
+        return None
+
+    budget = args.max_generation_seconds
+
+    if args.max_generation_runtime_fraction > 0:
+        mean_trial_runtime = get_mean_trial_runtime()
+
+        if mean_trial_runtime is not None and mean_trial_runtime > 0:
+            budget = min(budget, args.max_generation_runtime_fraction * mean_trial_runtime)
+
+    return budget
+
+@beartype
+def start_generation_budget() -> None:
+    budget = get_generation_budget()
+
+    GENERATION_BUDGET_STATE["deadline"] = None if budget is None else time.time() + budget
+
+@beartype
+def stop_generation_budget() -> None:
+    GENERATION_BUDGET_STATE["deadline"] = None
+
+@beartype
+def get_remaining_generation_seconds() -> Optional[float]:
+    if GENERATION_BUDGET_STATE["deadline"] is None:
+        return None
+
+    return GENERATION_BUDGET_STATE["deadline"] - time.time()
+
+@beartype
+def generation_budget_is_exhausted() -> bool:
+    remaining = get_remaining_generation_seconds()
+
+    return remaining is not None and remaining <= 0 and random_generation_step_is_done()
+
+@beartype
+def _fetch_next_trials_quasi_random(nr_of_jobs_to_get: int) -> dict:
+    """Fills the slots that did not fit into the generation budget with Sobol points, which need no model."""
+    if not ax_client: # pragma: no cover
+        print_red("ax_client was not defined")
+        my_exit(9)
+        return {}
+
+    experiment = ax_client.experiment
+    generator_run = Models.SOBOL(search_space=experiment.search_space).gen(n=nr_of_jobs_to_get)
+
+    trials_dict: dict = {}
+
+    with AX_CLIENT_LOCK:
+        for arm in generator_run.arms:
+            trial = experiment.new_trial(generator_run=split_generator_run(generator_run, arm))
+            trial.mark_running(no_runner_required=True)
+
+            trials_dict[trial.index] = arm.parameters
+
+    GENERATION_BUDGET_STATE["nr_quasi_random_fallbacks"] += len(trials_dict)
+
+    print_debug(f"_fetch_next_trials_quasi_random: the generation budget ran out, {len(trials_dict)} quasi-random points")
+
+    return trials_dict
+
+@beartype
+def get_next_trial_outside_of_lock() -> Tuple[dict, int]:
+    """Like ax_client.get_next_trial(force=True), but only the creation of the trial holds AX_CLIENT_LOCK, not the model fit."""
+    if not ax_client: # pragma: no cover
+        print_red("ax_client was not defined")
+        my_exit(9)
+        return {}, -1
+
+    generator_run = ax_client._gen_new_generator_run()
+
+    with AX_CLIENT_LOCK:
+        trial = ax_client.experiment.new_trial(generator_run=generator_run)
+        trial.mark_running(no_runner_required=True)
+
+    return trial.arm.parameters, trial.index
+
+@beartype
+def _fetch_next_trials_sequentially(nr_of_jobs_to_get: int) -> dict:
+    """Generates the candidates one after another, each one sees the previous ones as pending."""
+    trials_dict: dict = {}
+
+    for i in range(nr_of_jobs_to_get):
+        if generation_budget_is_exhausted():
+            trials_dict.update(_fetch_next_trials_quasi_random(nr_of_jobs_to_get - i))
+            break
+
+        if ax_client:
+            try:
+                params, trial_index = get_next_trial_outside_of_lock()
+            except (ax.exceptions.core.SearchSpaceExhausted, ax.exceptions.generation_strategy.GenerationStrategyRepeatedPoints, ax.exceptions.generation_strategy.MaxParallelismReachedException) as e: # pragma: no cover
+                if len(trials_dict) == 0:
+                    raise
+
+                # The trials created so far are running in the experiment already, they must not get lost
+                print_debug(f"_fetch_next_trials_sequentially: stopping after {len(trials_dict)} of {nr_of_jobs_to_get} trials: {e}")
+                break
+
+            trials_dict[trial_index] = params
+        else: # pragma: no cover
+            print_red("ax_client was not defined")
+            my_exit(9)
+
+    return trials_dict
+
+@beartype
+def get_normalized_parameter_value(parameter: Any, value: Any) -> float:
+    lower, upper, value = float(parameter.lower), float(parameter.upper), float(value)
+
+    if parameter.log_scale:
+        lower, upper, value = math.log(lower), math.log(upper), math.log(value)
+
+    if upper == lower: # pragma: no cover
+        return 0
+
+    return (value - lower) / (upper - lower)
+
+@beartype
+def get_denormalized_parameter_value(parameter: Any, unit_value: float) -> Any:
+    lower, upper = float(parameter.lower), float(parameter.upper)
+
+    if parameter.log_scale:
+        value = math.exp(math.log(lower) + unit_value * (math.log(upper) - math.log(lower)))
+    else:
+        value = lower + unit_value * (upper - lower)
+
+    value = min(max(value, lower), upper)
+
+    if parameter.parameter_type == ParameterType.INT:
+        return int(round(value))
+
+    return value
+
+@beartype
+def uses_tpe() -> bool:
+    return args.model is not None and str(args.model).upper() == "TPE"
+
+@beartype
+def get_tpe_observations(experiment: Any) -> Tuple[list, list]:
+    """The results of the first objective. Only the trials that finished since the last call are looked up in the experiment."""
+    if TPE_OBSERVATIONS["experiment"] is not experiment:
+        TPE_OBSERVATIONS["experiment"] = experiment
+        TPE_OBSERVATIONS["trial_indices"] = set()
+        TPE_OBSERVATIONS["parameters"] = []
+        TPE_OBSERVATIONS["values"] = []
+
+    with AX_CLIENT_LOCK:
+        trial_indices_by_status = experiment.trial_indices_by_status
+        finished_trial_indices = set(trial_indices_by_status[TrialStatus.COMPLETED]) | set(trial_indices_by_status[TrialStatus.EARLY_STOPPED])
+
+    new_trial_indices = sorted(finished_trial_indices - TPE_OBSERVATIONS["trial_indices"])
+
+    if len(new_trial_indices) == 0:
+        return TPE_OBSERVATIONS["parameters"], TPE_OBSERVATIONS["values"]
+
+    df = experiment.lookup_data(trial_indices=new_trial_indices).df
+    df = df[df["metric_name"] == arg_result_names[0]]
+
+    for trial_index, value in zip(df["trial_index"], df["mean"]):
+        arm = experiment.trials[int(trial_index)].arm
+
+        if arm is not None and not math.isnan(float(value)):
+            TPE_OBSERVATIONS["parameters"].append(arm.parameters)
+            TPE_OBSERVATIONS["values"].append(float(value) if arg_result_min_or_max[0] == "min" else -float(value))
+
+    TPE_OBSERVATIONS["trial_indices"].update(new_trial_indices)
+
+    return TPE_OBSERVATIONS["parameters"], TPE_OBSERVATIONS["values"]
+
+@beartype
+def get_tpe_range_log_density(samples: Any, centers: Any) -> Any:
+    """Log density of a Parzen estimator with Gaussian kernels plus a uniform prior on [0, 1]."""
+    bandwidth = max(float(np.std(centers)) * len(centers) ** (-1 / 5), 0.01) if len(centers) > 1 else 0.5
+
+    squared_distances = ((samples[:, None] - centers[None, :]) / bandwidth) ** 2
+    kernel_density = np.exp(-0.5 * squared_distances).sum(axis=1) / (bandwidth * math.sqrt(2 * math.pi))
+
+    return np.log((kernel_density + 1) / (len(centers) + 1))
+
+@beartype
+def get_tpe_choice_log_density(samples: list, observed: list, choices: list) -> Any:
+    counts = {choice: 1 for choice in choices}
+
+    for value in observed:
+        if value in counts:
+            counts[value] += 1
+
+    total = sum(counts.values())
+
+    return np.log(np.array([counts.get(value, 1) / total for value in samples]))
+
+@beartype
+def sample_tpe_candidates(search_space: Any, good: list, bad: list, nr_of_candidates: int) -> list:
+    """Samples candidates from the density of the good points and ranks them by l(x)/g(x), best first."""
+    rng = np.random.default_rng()
+
+    candidates: list = [{} for _ in range(nr_of_candidates)]
+    scores = np.zeros(nr_of_candidates)
+
+    for name, parameter in search_space.parameters.items():
+        if isinstance(parameter, RangeParameter):
+            good_values = np.array([get_normalized_parameter_value(parameter, p[name]) for p in good])
+            bad_values = np.array([get_normalized_parameter_value(parameter, p[name]) for p in bad])
+
+            bandwidth = max(float(np.std(good_values)) * len(good_values) ** (-1 / 5), 0.01) if len(good_values) > 1 else 0.5
+            samples = np.clip(rng.choice(good_values, nr_of_candidates) + rng.normal(0, bandwidth, nr_of_candidates), 0, 1)
+
+            scores += get_tpe_range_log_density(samples, good_values) - get_tpe_range_log_density(samples, bad_values)
+
+            for i, sample in enumerate(samples):
+                candidates[i][name] = get_denormalized_parameter_value(parameter, float(sample))
+        elif isinstance(parameter, ChoiceParameter):
+            choices = list(parameter.values)
+            good_values = [p[name] for p in good]
+            good_log_density = get_tpe_choice_log_density(choices, good_values, choices)
+
+            sample_indices = rng.choice(len(choices), nr_of_candidates, p=np.exp(good_log_density))
+            samples = [choices[i] for i in sample_indices]
+
+            scores += get_tpe_choice_log_density(samples, good_values, choices) - get_tpe_choice_log_density(samples, [p[name] for p in bad], choices)
+
+            for i, sample in enumerate(samples):
+                candidates[i][name] = sample
+        else:
+            for candidate in candidates:
+                candidate[name] = parameter.value
+
+    return [candidates[i] for i in np.argsort(-scores)]
+
+@beartype
+def _fetch_next_trials_with_tpe(nr_of_jobs_to_get: int) -> dict:
+    """Generates trials from a tree-structured Parzen estimator, without fitting a model in torch."""
+    if not ax_client: # pragma: no cover
+        print_red("ax_client was not defined")
+        my_exit(9)
+        return {}
+
+    experiment = ax_client.experiment
+    parameters, values = get_tpe_observations(experiment)
+
+    if len(parameters) < 2:
+        # Without two observations, there are no good and bad densities yet, only the uniform prior
+        candidates = [arm.parameters for arm in Models.SOBOL(search_space=experiment.search_space).gen(n=nr_of_jobs_to_get).arms]
+    else:
+        order = np.argsort(values)
+        nr_good = min(max(1, math.ceil(args.tpe_gamma * len(values))), 25)
+
+        good = [parameters[i] for i in order[:nr_good]]
+        bad = [parameters[i] for i in order[nr_good:]]
+
+        if len(bad) > 1000:
+            bad = [bad[i] for i in np.random.default_rng().choice(len(bad), 1000, replace=False)]
+
+        candidates = sample_tpe_candidates(experiment.search_space, good, bad, max(args.tpe_nr_candidates * nr_of_jobs_to_get, nr_of_jobs_to_get))
+
+    known_signatures = {arm.signature for arm in experiment.arms_by_signature.values()}
+
+    trials_dict: dict = {}
+
+    for candidate in candidates:
+        if len(trials_dict) >= nr_of_jobs_to_get:
+            break
+
+        arm = Arm(parameters=candidate)
+
+        if arm.signature in known_signatures or not experiment.search_space.check_membership(candidate, raise_error=False):
+            continue
+
+        known_signatures.add(arm.signature)
+
+        with AX_CLIENT_LOCK:
+            trial = experiment.new_trial(generator_run=GeneratorRun(arms=[arm], model_key="TPE"))
+            trial.mark_running(no_runner_required=True)
+
+        trials_dict[trial.index] = candidate
+
+    return trials_dict
+
+@beartype
+def get_cost_model_features(search_space: Any, parameters: dict) -> list:
+    """Range parameters normalized to [0, 1], choice parameters one-hot, scaled so that two different choices are 1 apart."""
+    features: list = []
+
+    for name, parameter in search_space.parameters.items():
+        if isinstance(parameter, RangeParameter):
+            features.append(get_normalized_parameter_value(parameter, parameters[name]))
+        elif isinstance(parameter, ChoiceParameter):
+            features.extend([math.sqrt(0.5) if str(value) == str(parameters[name]) else 0 for value in parameter.values])
+
+    return features
+
+@beartype
+def predict_log_runtimes(search_space: Any, candidates: list, df: Optional[pd.DataFrame] = None) -> Optional[Any]:
+    """Kernel regression of log(run_time) over the finished trials, shrunk to the mean where there are no close observations."""
+    if df is None:
+        df = get_job_infos_df()
+
+    if df is None or len(df) < 2:
+        return None
+
+    df = df.tail(2000)
+
+    observed_features = []
+    observed_log_runtimes = []
+
+    for _, row in df.iterrows():
+        try:
+            observed_features.append(get_cost_model_features(search_space, row.to_dict()))
+            observed_log_runtimes.append(math.log(max(float(row["run_time"]), 1e-3)))
+        except (KeyError, TypeError, ValueError):
+            continue
+
+    if len(observed_features) < 2:
+        return None
+
+    observed = np.array(observed_features)
+    log_runtimes = np.array(observed_log_runtimes)
+    prior = float(log_runtimes.mean())
+
+    candidate_features = np.array([get_cost_model_features(search_space, c) for c in candidates])
+    bandwidth = 0.2 * math.sqrt(max(1, observed.shape[1]))
+
+    squared_distances = ((candidate_features[:, None, :] - observed[None, :, :]) ** 2).sum(axis=2)
+    weights = np.exp(-0.5 * squared_distances / bandwidth ** 2)
+
+    return (weights @ log_runtimes + prior) / (weights.sum(axis=1) + 1)
+
+@beartype
+def get_expected_improvements(model_bridge: Any, experiment: Any, candidates: list) -> Any:
+    """Sum over all result names of the expected improvement over the best result so far, each divided by the spread of that result."""
+    means, covariances = model_bridge.predict([ObservationFeatures(parameters=c) for c in candidates])
+
+    df = experiment.lookup_data().df
+    erf = np.vectorize(math.erf)
+
+    expected_improvements = np.zeros(len(candidates))
+
+    for metric_name, min_or_max in zip(arg_result_names, arg_result_min_or_max):
+        observed = df[df["metric_name"] == metric_name]["mean"].dropna()
+
+        if metric_name not in means or len(observed) == 0:
+            continue
+
+        sign = 1 if min_or_max == "min" else -1
+
+        mu = sign * np.array(means[metric_name])
+        sigma = np.sqrt(np.maximum(np.array(covariances[metric_name][metric_name]), 1e-12))
+        best = float((sign * observed).min())
+
+        z = (best - mu) / sigma
+        expected_improvement = sigma * (z * 0.5 * (1 + erf(z / math.sqrt(2))) + np.exp(-0.5 * z ** 2) / math.sqrt(2 * math.pi))
+
+        expected_improvements += expected_improvement / max(float(observed.std()), 1e-12)
+
+    return expected_improvements
+
+@beartype
+def get_cost_aware_order(expected_improvements: Any, log_runtimes: Any) -> list:
+    """Indices of the candidates, highest expected improvement per predicted second first."""
+    scores = expected_improvements / np.exp(log_runtimes)
+
+    return [int(i) for i in np.argsort(-scores, kind="stable")]
+
+@beartype
+def _fetch_next_trials_cost_aware(nr_of_jobs_to_get: int) -> dict:
+    """Picks the points with the highest expected improvement per second among the model's points and quasi-random ones."""
+    if not ax_client: # pragma: no cover
+        print_red("ax_client was not defined")
+        my_exit(9)
+        return {}
+
+    experiment = ax_client.experiment
+
+    with AX_CLIENT_LOCK:
+        pending_observations = get_pending_observation_features_based_on_trial_status(experiment)
+
+    model_run = ax_client.generation_strategy.gen(
+        experiment=experiment,
+        n=nr_of_jobs_to_get,
+        pending_observations=pending_observations
+    )
+
+    model_bridge = getattr(ax_client.generation_strategy, "model", None)
+
+    pool = [(model_run, arm) for arm in model_run.arms]
+
+    if args.cost_aware_candidates > 0:
+        sobol_run = Models.SOBOL(search_space=experiment.search_space).gen(n=nr_of_jobs_to_get * args.cost_aware_candidates)
+        pool.extend((sobol_run, arm) for arm in sobol_run.arms)
+
+    candidates = [arm.parameters for _, arm in pool]
+    log_runtimes = predict_log_runtimes(experiment.search_space, candidates)
+
+    if model_bridge is None or log_runtimes is None:
+        # Not enough finished trials to predict runtimes, use the points of the model as they are
+        pool = pool[:len(model_run.arms)]
+        order = list(range(len(pool)))
+    else:
+        try:
+            order = get_cost_aware_order(get_expected_improvements(model_bridge, experiment, candidates), log_runtimes)
+        except Exception as e: # pragma: no cover
+            print_debug(f"_fetch_next_trials_cost_aware: could not score the candidates, using the points of the model: {e}")
+            pool = pool[:len(model_run.arms)]
+            order = list(range(len(pool)))
+
+    known_signatures = {arm.signature for arm in experiment.arms_by_signature.values()}
+    trials_dict: dict = {}
+
+    for i in order:
+        generator_run, arm = pool[i]
+
+        if len(trials_dict) >= nr_of_jobs_to_get:
+            break
+
+        if arm.signature in known_signatures:
+            continue
+
+        known_signatures.add(arm.signature)
+
+        with AX_CLIENT_LOCK:
+            trial = experiment.new_trial(generator_run=split_generator_run(generator_run, arm))
+            trial.mark_running(no_runner_required=True)
+
+        trials_dict[trial.index] = arm.parameters
+
+        COST_AWARE_STATE["nr_selections"] += 1
+
+        if generator_run is not model_run:
+            COST_AWARE_STATE["nr_cheaper_than_model_choice"] += 1
+
+    return trials_dict
+
+@beartype
+def is_candidate_stale(candidate: dict) -> bool:
+    if time.time() - candidate["generated_at"] > args.pregenerate_max_age:
+        return True
+
+    return ledger_count_status("COMPLETED") - candidate["nr_results_seen"] > args.pregenerate_max_new_results
+
+@beartype
+def abandon_candidates(candidates: list, caller: str) -> None:
+    for candidate in candidates:
+        try:
+            if ax_client:
+                with AX_CLIENT_LOCK:
+                    ax_client.get_trial(candidate["trial_index"]).mark_abandoned()
+        except Exception as e: # pragma: no cover
+            print_debug(f"{caller}: could not abandon trial {candidate['trial_index']}: {e}")
+
+@beartype
+def drop_stale_candidates() -> None:
+    with CANDIDATE_BUFFER["lock"]:
+        stale_candidates = [candidate for candidate in CANDIDATE_BUFFER["candidates"] if is_candidate_stale(candidate)]
+
+        for candidate in stale_candidates:
+            CANDIDATE_BUFFER["candidates"].remove(candidate)
+
+        CANDIDATE_BUFFER["nr_stale"] += len(stale_candidates)
+
+    abandon_candidates(stale_candidates, "drop_stale_candidates")
+
+@beartype
+def pop_buffered_candidates(nr_of_jobs_to_get: int) -> dict:
+    drop_stale_candidates()
+
+    trials_dict: dict = {}
+
+    # Only the buffer's own lock, a free slot must not wait for a model fit in the background thread
+    with CANDIDATE_BUFFER["lock"]:
+        while len(trials_dict) < nr_of_jobs_to_get and len(CANDIDATE_BUFFER["candidates"]):
+            candidate = CANDIDATE_BUFFER["candidates"].pop(0)
+            trials_dict[candidate["trial_index"]] = candidate["params"]
+
+    CANDIDATE_BUFFER["nr_hits"] += len(trials_dict)
+    CANDIDATE_BUFFER["nr_misses"] += nr_of_jobs_to_get - len(trials_dict)
+
+    print_debug(f"pop_buffered_candidates({nr_of_jobs_to_get}): {len(trials_dict)} from the buffer, {len(CANDIDATE_BUFFER['candidates'])} left")
+
+    CANDIDATE_BUFFER["wakeup"].set()
+
+    return trials_dict
+
+@beartype
+def get_nr_of_candidates_to_pregenerate() -> int:
+    nr_of_remaining_evaluations = max_eval + get_nr_of_imported_jobs() - submitted_jobs()
+
+    return max(0, min(args.pregenerate_candidates, nr_of_remaining_evaluations) - len(CANDIDATE_BUFFER["candidates"]))
+
+@disable_logs
+def refill_candidate_buffer() -> None:
+    drop_stale_candidates()
+
+    while not CANDIDATE_BUFFER["stop"].is_set() and random_generation_step_is_done() and get_nr_of_candidates_to_pregenerate() > 0:
+        with GENERATION_LOCK:
+            nr_of_results_seen = ledger_count_status("COMPLETED")
+
+            start_generation_budget()
+
+            try:
+                if uses_tpe():
+                    trials_dict = _fetch_next_trials_with_tpe(1)
+                elif args.cost_aware:
+                    trials_dict = _fetch_next_trials_cost_aware(1)
+                elif args.pregenerate_ignore_pending:
+                    trials_dict = _fetch_next_trials_jointly(1, False)
+                else:
+                    trials_dict = _fetch_next_trials_sequentially(1)
+            finally:
+                stop_generation_budget()
+
+        with CANDIDATE_BUFFER["lock"]:
+            for trial_index, params in trials_dict.items():
+                CANDIDATE_BUFFER["candidates"].append({
+                    "trial_index": trial_index,
+                    "params": params,
+                    "generated_at": time.time(),
+                    "nr_results_seen": nr_of_results_seen
+                })
+
+                CANDIDATE_BUFFER["nr_generated"] += 1
+
+@beartype
+def candidate_pregeneration_background() -> None:
+    while not CANDIDATE_BUFFER["stop"].is_set():
+        CANDIDATE_BUFFER["wakeup"].wait(5)
+        CANDIDATE_BUFFER["wakeup"].clear()
+
+        if CANDIDATE_BUFFER["stop"].is_set():
+            break
+
+        try:
+            refill_candidate_buffer()
+        except (ax.exceptions.core.SearchSpaceExhausted, ax.exceptions.generation_strategy.GenerationStrategyRepeatedPoints, ax.exceptions.generation_strategy.MaxParallelismReachedException) as e: # pragma: no cover
+            print_debug(f"candidate_pregeneration_background: {e}")
+            CANDIDATE_BUFFER["stop"].wait(5)
+        except Exception as e: # pragma: no cover
+            print_debug(f"candidate_pregeneration_background: error while generating candidates: {e}")
+            CANDIDATE_BUFFER["stop"].wait(5)
+
+@beartype
+def start_candidate_pregeneration() -> None:
+    if args.pregenerate_candidates <= 0 or CANDIDATE_BUFFER["thread"] is not None:
+        return
+
+    CANDIDATE_BUFFER["stop"].clear()
+
+    thread = threading.Thread(target=candidate_pregeneration_background, daemon=True)
+    thread.start()
+
+    CANDIDATE_BUFFER["thread"] = thread
+
+@beartype
+def notify_candidate_pregeneration() -> None:
+    if CANDIDATE_BUFFER["thread"] is not None:
+        CANDIDATE_BUFFER["wakeup"].set()
+
+@beartype
+def stop_candidate_pregeneration() -> None:
+    thread = CANDIDATE_BUFFER["thread"]
+
+    if thread is None:
+        return
+
+    CANDIDATE_BUFFER["stop"].set()
+    CANDIDATE_BUFFER["wakeup"].set()
+    thread.join(timeout=120)
+    CANDIDATE_BUFFER["thread"] = None
+
+    with CANDIDATE_BUFFER["lock"]:
+        candidates = CANDIDATE_BUFFER["candidates"]
+        CANDIDATE_BUFFER["candidates"] = []
+
+    abandon_candidates(candidates, "stop_candidate_pregeneration")
+
+@beartype
+def _fetch_next_trials_from_model(nr_of_jobs_to_get: int) -> dict:
+    if uses_tpe() and random_generation_step_is_done():
+        return _fetch_next_trials_with_tpe(nr_of_jobs_to_get)
+
+    if args.cost_aware and random_generation_step_is_done():
+        return _fetch_next_trials_cost_aware(nr_of_jobs_to_get)
+
+    if args.generation_batch_mode == "joint" and nr_of_jobs_to_get > 1 and random_generation_step_is_done():
+        return _fetch_next_trials_jointly(nr_of_jobs_to_get)
+
+    return _fetch_next_trials_sequentially(nr_of_jobs_to_get)
+
+@beartype
+def _fetch_next_trials_within_generation_budget(nr_of_jobs_to_get: int) -> dict:
+    """Asks the model until all slots are filled. Once the generation budget is used up, the open slots get quasi-random points."""
+    trials_dict: dict = {}
+
+    while len(trials_dict) < nr_of_jobs_to_get:
+        nr_of_open_slots = nr_of_jobs_to_get - len(trials_dict)
+
+        if generation_budget_is_exhausted():
+            trials_dict.update(_fetch_next_trials_quasi_random(nr_of_open_slots))
+            break
+
+        try:
+            new_trials_dict = _fetch_next_trials_from_model(nr_of_open_slots)
+        except (ax.exceptions.core.SearchSpaceExhausted, ax.exceptions.generation_strategy.GenerationStrategyRepeatedPoints, ax.exceptions.generation_strategy.MaxParallelismReachedException) as e: # pragma: no cover
+            if len(trials_dict) == 0:
+                raise
+
+            print_debug(f"_fetch_next_trials_within_generation_budget: stopping after {len(trials_dict)} of {nr_of_jobs_to_get} trials: {e}")
+            break
+
+        if len(new_trials_dict) == 0:
+            break
+
+        trials_dict.update(new_trials_dict)
+
+    return trials_dict
+
+@disable_logs
+def _fetch_next_trials(nr_of_jobs_to_get: int) -> Optional[Tuple[dict[int, Any], bool]]:
+    """Attempts to fetch the next trials using the ax_client."""
+    try:
         print_debug(f"_fetch_next_trials({nr_of_jobs_to_get}), get_parallelism_schedule_description: {get_parallelism_schedule_description()}")
 
-        trials_dict: dict = {}
+        trials_dict: dict = pop_initial_design_points(nr_of_jobs_to_get)
+
+        if CANDIDATE_BUFFER["thread"] is not None and len(trials_dict) < nr_of_jobs_to_get:
+            trials_dict.update(pop_buffered_candidates(nr_of_jobs_to_get - len(trials_dict)))
+
+        nr_of_missing_trials = nr_of_jobs_to_get - len(trials_dict)
 
         try:
-            if ax_client:
-                params, trial_index = ax_client.get_next_trial(force=True)
+            if nr_of_missing_trials > 0:
+                with GENERATION_LOCK:
+                    start_generation_budget()
 
-                trials_dict[trial_index] = params
-            else: # pragma: no cover
-                print_red("ax_client was not defined")
-                my_exit(9)
+                    try:
+                        trials_dict.update(_fetch_next_trials_within_generation_budget(nr_of_missing_trials))
+                    finally:
+                        stop_generation_budget()
         except (ax.exceptions.core.SearchSpaceExhausted, ax.exceptions.generation_strategy.GenerationStrategyRepeatedPoints, ax.exceptions.generation_strategy.MaxParallelismReachedException) as e: # pragma: no cover
             print_red("\n⚠Error 8: " + str(e))
 
@@ -5281,7 +7700,8 @@ def _get_next_trials(nr_of_jobs_to_get: int) -> Tuple[Union[None | dict], bool]:
                 print_debug_get_next_trials(
                     len(trial_index_to_param.items()),
                     nr_of_jobs_to_get,
-                    lineno
+                    lineno,
+                    end_time - start_time
                 )
 
         _log_trial_index_to_param(trial_index_to_param)
@@ -5294,7 +7714,7 @@ def _get_next_trials(nr_of_jobs_to_get: int) -> Tuple[Union[None | dict], bool]:
 
 @beartype
 def get_next_nr_steps(_num_parallel_jobs: int, _max_eval: int) -> int: # pragma: no cover
-    if not SYSTEM_HAS_SBATCH:
+    if not SYSTEM_HAS_SBATCH and not args.local_process_pool and args.worker_pool_size == 0 and not args.batch_objective:
         return 1
 
     simulated_nr_inserted_jobs = get_nr_of_imported_jobs()
@@ -5333,17 +7753,449 @@ def _get_max_parallelism() -> int: # pragma: no cover
 
     return ret
 
+@beartype
+def get_observed_trial_indices(data: Any) -> list:
+    try:
+        return sorted({int(trial_index) for trial_index in data.df["trial_index"].unique()})
+    except Exception as e: # pragma: no cover
+        print_debug(f"get_observed_trial_indices: {e}")
+        return []
+
+@beartype
+def get_observation_features_of_trials(experiment: Any, trial_indices: list) -> list:
+    return [ObservationFeatures.from_arm(experiment.trials[trial_index].arm, trial_index=trial_index) for trial_index in trial_indices]
+
+@beartype
+def get_surprise_of_new_results(fitted_model: Any, experiment: Any, data: Any, trial_indices: list) -> float:
+    """Mean squared standardized error of the new results under the last fitted model."""
+    means, covariances = fitted_model.predict(get_observation_features_of_trials(experiment, trial_indices))
+
+    df = data.df
+    squared_errors: list = []
+
+    for metric_name, predicted_means in means.items():
+        for i, trial_index in enumerate(trial_indices):
+            rows = df[(df["trial_index"] == trial_index) & (df["metric_name"] == metric_name)]
+            variance = covariances[metric_name][metric_name][i]
+
+            if len(rows) and variance > 0:
+                squared_errors.append((float(rows["mean"].iloc[0]) - predicted_means[i]) ** 2 / variance)
+
+    if len(squared_errors) == 0:
+        return 0
+
+    return sum(squared_errors) / len(squared_errors)
+
+@beartype
+def get_surrogate_state_dict(fitted_model: Any) -> Optional[dict]:
+    """The hyperparameters of the last fit, if the model class can be fitted again with them and without optimizing them (BoTorchModel)."""
+    model = getattr(fitted_model, "model", None)
+
+    try:
+        fit_parameters = inspect.signature(type(model).fit).parameters
+
+        if "state_dict" not in fit_parameters or "refit" not in fit_parameters:
+            return None
+
+        return dict(model.surrogate.model.state_dict())
+    except Exception as e: # pragma: no cover
+        print_debug(f"get_surrogate_state_dict: the hyperparameters of {type(model).__name__} cannot be reused: {e}")
+        return None
+
+@beartype
+def fit_posterior_only(original_fit: Any, model_class: Any, state_dict: dict, experiment: Any, data: Any, **kwargs: Any) -> bool:
+    """Fits the model on all data, but loads the hyperparameters of the last fit instead of optimizing them again. False if model_class cannot do that, e.g. the legacy BotorchModel."""
+    fit_parameters = inspect.signature(model_class.fit).parameters
+
+    if "state_dict" not in fit_parameters or "refit" not in fit_parameters:
+        return False
+
+    # The model is created inside of ModelSpec.fit, so the class is the only place to pass the state_dict in.
+    # Every fit, also the one of the candidate buffer thread, runs under GENERATION_LOCK, so no other fit sees the patched class.
+    with GENERATION_LOCK:
+        had_own_fit = "fit" in model_class.__dict__
+        original_model_fit = model_class.fit
+
+        def _fit(self: Any, *fit_args: Any, **fit_kwargs: Any) -> Any:
+            fit_kwargs["state_dict"] = state_dict
+            fit_kwargs["refit"] = False
+
+            return original_model_fit(self, *fit_args, **fit_kwargs)
+
+        model_class.fit = _fit
+
+        try:
+            original_fit(experiment=experiment, data=data, **kwargs)
+        finally:
+            if had_own_fit:
+                model_class.fit = original_model_fit
+            else:
+                del model_class.fit
+
+    return True
+
+@beartype
+def throttled_surrogate_fit(model_spec: Any, original_fit: Any, experiment: Any, data: Any, **kwargs: Any) -> None:
+    observed_trial_indices = get_observed_trial_indices(data)
+    new_trial_indices = [i for i in observed_trial_indices if i not in SURROGATE_REFIT_STATE["fitted_trial_indices"]]
+    unconditioned_trial_indices = [i for i in observed_trial_indices if i not in SURROGATE_REFIT_STATE["conditioned_trial_indices"]]
+    fitted_model = getattr(model_spec, "_fitted_model", None)
+    state_dict = SURROGATE_REFIT_STATE["state_dict"]
+
+    needs_full_fit = fitted_model is None or state_dict is None or len(new_trial_indices) >= args.refit_every_n_results
+
+    if not needs_full_fit and len(unconditioned_trial_indices) and args.refit_surprise_threshold > 0:
+        try:
+            surprise = get_surprise_of_new_results(fitted_model, experiment, data, unconditioned_trial_indices)
+        except Exception as e: # pragma: no cover
+            print_debug(f"throttled_surrogate_fit: could not check the new results against the last fit: {e}")
+            surprise = float("inf")
+
+        if surprise > args.refit_surprise_threshold:
+            print_debug(f"throttled_surrogate_fit: surprise {surprise:.2f} > {args.refit_surprise_threshold}, refitting")
+            needs_full_fit = True
+            SURROGATE_REFIT_STATE["nr_surprise_refits"] += 1
+
+    # Same hyperparameters, but the posterior is conditioned on the new results
+    if not needs_full_fit and fit_posterior_only(original_fit, type(fitted_model.model), state_dict, experiment, data, **kwargs):
+        SURROGATE_REFIT_STATE["nr_posterior_fits"] += 1
+    else:
+        original_fit(experiment=experiment, data=data, **kwargs)
+
+        SURROGATE_REFIT_STATE["fitted_trial_indices"] = set(observed_trial_indices)
+        SURROGATE_REFIT_STATE["state_dict"] = get_surrogate_state_dict(getattr(model_spec, "_fitted_model", None))
+        SURROGATE_REFIT_STATE["nr_full_fits"] += 1
+
+    SURROGATE_REFIT_STATE["conditioned_trial_indices"] = set(observed_trial_indices)
+
+@beartype
+def install_surrogate_refit_throttle(step: Any) -> None:
+    if args.refit_every_n_results <= 1:
+        return
+
+    model_specs = getattr(step, "model_specs", [])
+
+    if len(model_specs) == 0: # pragma: no cover
+        print_yellow("--refit_every_n_results is not supported by this version of ax, the model will be refitted every time")
+        return
+
+    for model_spec in model_specs:
+        model_spec.fit = functools.partial(throttled_surrogate_fit, model_spec, model_spec.fit)
+
+# The knowledge gradient uses cost = intercept + (normalized fidelity), so the lowest fidelity costs intercept / (intercept + 1) of the highest one.
+# At 100 that is 99%: low fidelities are practically as expensive as full ones and are not preferred for being cheap. Larger intercepts would not
+# change the choice of the knowledge gradient anymore, so the fitted value is capped there. 0.01 keeps the cost of the lowest fidelity above zero.
+FIDELITY_COST_INTERCEPT_MIN: float = 0.01
+FIDELITY_COST_INTERCEPT_MAX: float = 100.0
+
+@beartype
+def get_fidelity_cost_intercept(search_space: Any, df: Optional[pd.DataFrame] = None) -> Optional[float]:
+    """Fits run_time = a + b * (normalized fidelity) on job_infos.csv and returns a / b, the fixed cost in the units of the cost model of the knowledge gradient."""
+    if df is None:
+        df = get_job_infos_df()
+
+    fidelity_parameters = [p for p in search_space.parameters.values() if getattr(p, "is_fidelity", False) and isinstance(p, RangeParameter)]
+
+    if df is None or len(fidelity_parameters) == 0 or len(df) < len(fidelity_parameters) + 2:
+        return None
+
+    try:
+        features = np.array([[get_normalized_parameter_value(p, row[p.name]) for p in fidelity_parameters] for _, row in df.iterrows()])
+    except (KeyError, TypeError, ValueError) as e:
+        print_debug(f"get_fidelity_cost_intercept: {e}")
+        return None
+
+    design = np.hstack([np.ones((len(features), 1)), features])
+    coefficients, _, _, _ = np.linalg.lstsq(design, df["run_time"].to_numpy(dtype=float), rcond=None)
+
+    intercept = float(coefficients[0])
+    mean_slope = float(np.mean(coefficients[1:]))
+
+    if mean_slope <= 0:
+        # The fidelity does not make trials slower, so there is nothing to save with low fidelities: use the largest fixed cost
+        return FIDELITY_COST_INTERCEPT_MAX
+
+    return min(max(intercept / mean_slope, FIDELITY_COST_INTERCEPT_MIN), FIDELITY_COST_INTERCEPT_MAX)
+
+@beartype
+def fidelity_cost_gen(original_gen: Any, **kwargs: Any) -> Any:
+    search_space = kwargs.get("search_space") or (ax_client.experiment.search_space if ax_client else None)
+
+    cost_intercept = get_fidelity_cost_intercept(search_space) if search_space is not None else None
+
+    if cost_intercept is not None:
+        model_gen_options = dict(kwargs.get("model_gen_options") or {})
+        acquisition_function_kwargs = dict(model_gen_options.get("acquisition_function_kwargs") or {})
+
+        acquisition_function_kwargs["cost_intercept"] = cost_intercept
+        model_gen_options["acquisition_function_kwargs"] = acquisition_function_kwargs
+        kwargs["model_gen_options"] = model_gen_options
+
+        print_debug(f"fidelity_cost_gen: cost_intercept={cost_intercept:.3f}")
+
+    return original_gen(**kwargs)
+
+@beartype
+def install_fidelity_cost_model(step: Any) -> None:
+    model_specs = getattr(step, "model_specs", [])
+
+    if len(model_specs) == 0: # pragma: no cover
+        print_yellow("The cost of the fidelities cannot be learned with this version of ax, a fixed cost model is used")
+        return
+
+    for model_spec in model_specs:
+        model_spec.gen = functools.partial(fidelity_cost_gen, model_spec.gen)
+
+ACQF_MAX_NUM_RESTARTS: int = 20
+ACQF_MAX_RAW_SAMPLES: int = 1024
+
+@beartype
+def get_budgeted_acquisition_settings(remaining_seconds: float) -> Tuple[int, int]:
+    seconds_per_restart = GENERATION_BUDGET_STATE["seconds_per_restart"]
+
+    if seconds_per_restart is None:
+        # Nothing measured yet, start with half of the default effort
+        num_restarts = ACQF_MAX_NUM_RESTARTS // 2
+    else:
+        # Keep a fifth of the remaining time as a margin for the model bridge around the optimization
+        num_restarts = int(0.8 * remaining_seconds / max(seconds_per_restart, 1e-6))
+
+    num_restarts = min(max(num_restarts, 1), ACQF_MAX_NUM_RESTARTS)
+    raw_samples = max(64, ACQF_MAX_RAW_SAMPLES * num_restarts // ACQF_MAX_NUM_RESTARTS)
+
+    return num_restarts, raw_samples
+
+@beartype
+def budgeted_surrogate_gen(original_gen: Any, **kwargs: Any) -> Any:
+    remaining_seconds = get_remaining_generation_seconds()
+
+    if remaining_seconds is None:
+        return original_gen(**kwargs)
+
+    num_restarts, raw_samples = get_budgeted_acquisition_settings(remaining_seconds)
+
+    model_gen_options = dict(kwargs.get("model_gen_options") or {})
+    optimizer_kwargs = dict(model_gen_options.get("optimizer_kwargs") or {})
+
+    optimizer_kwargs["num_restarts"] = num_restarts
+    optimizer_kwargs["raw_samples"] = raw_samples
+    model_gen_options["optimizer_kwargs"] = optimizer_kwargs
+    kwargs["model_gen_options"] = model_gen_options
+
+    start_time = time.time()
+
+    generator_run = original_gen(**kwargs)
+
+    seconds = time.time() - start_time
+
+    GENERATION_BUDGET_STATE["seconds_per_restart"] = seconds / num_restarts
+    GENERATION_BUDGET_STATE["nr_budgeted_gens"] += 1
+
+    print_debug(f"budgeted_surrogate_gen: {remaining_seconds:.3f}s left, num_restarts={num_restarts}, raw_samples={raw_samples}, took {seconds:.3f}s")
+
+    if get_current_run_folder() is not None and os.path.exists(get_current_run_folder()):
+        add_to_csv(f"{get_current_run_folder()}/generation_budget.csv", ["time", "remaining_seconds", "num_restarts", "raw_samples", "seconds"], [datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), f"{remaining_seconds:.3f}", num_restarts, raw_samples, f"{seconds:.3f}"])
+
+    return generator_run
+
+@beartype
+def install_generation_budget(step: Any) -> None:
+    if args.max_generation_seconds <= 0:
+        return
+
+    model_specs = getattr(step, "model_specs", [])
+
+    if len(model_specs) == 0: # pragma: no cover
+        print_yellow("--max_generation_seconds cannot adapt the acquisition optimization with this version of ax, only the quasi-random fallback is used")
+        return
+
+    for model_spec in model_specs:
+        model_spec.gen = functools.partial(budgeted_surrogate_gen, model_spec.gen)
+
+LOCAL_GP_LENGTH_INIT: float = 0.8
+LOCAL_GP_LENGTH_MIN: float = 0.5 ** 7
+LOCAL_GP_LENGTH_MAX: float = 1.6
+LOCAL_GP_SUCCESS_TOLERANCE: int = 3
+
+@beartype
+def uses_local_gp() -> bool:
+    return args.model is not None and str(args.model).upper() == "LOCAL_GP"
+
+@beartype
+def get_parameter_distance(search_space: Any, parameters: dict, other_parameters: dict) -> float:
+    distance: float = 0
+
+    for name, parameter in search_space.parameters.items():
+        if name not in parameters or name not in other_parameters: # pragma: no cover
+            continue
+
+        if isinstance(parameter, RangeParameter):
+            distance += (get_normalized_parameter_value(parameter, parameters[name]) - get_normalized_parameter_value(parameter, other_parameters[name])) ** 2
+        elif parameters[name] != other_parameters[name]:
+            distance += 1
+
+    return math.sqrt(distance)
+
+@beartype
+def update_local_gp_trust_region(experiment: Any, objective_df: Any) -> None:
+    """Moves the trust region to the best point and resizes it like TuRBO does after every new result."""
+    minimize = arg_result_min_or_max[0] == "min"
+    nr_range_parameters = len([p for p in experiment.search_space.parameters.values() if isinstance(p, RangeParameter)])
+    failure_tolerance = max(4, nr_range_parameters)
+
+    for _, row in objective_df.sort_values("trial_index").iterrows():
+        trial_index = int(row["trial_index"])
+
+        if trial_index in LOCAL_GP_STATE["seen_trial_indices"]:
+            continue
+
+        LOCAL_GP_STATE["seen_trial_indices"].add(trial_index)
+
+        value = float(row["mean"])
+        best_value = LOCAL_GP_STATE["best_value"]
+
+        if best_value is None or (value < best_value - 1e-3 * abs(best_value) if minimize else value > best_value + 1e-3 * abs(best_value)):
+            LOCAL_GP_STATE["nr_successes"] += 1
+            LOCAL_GP_STATE["nr_failures"] = 0
+        else:
+            LOCAL_GP_STATE["nr_successes"] = 0
+            LOCAL_GP_STATE["nr_failures"] += 1
+
+        if best_value is None or (value < best_value if minimize else value > best_value):
+            LOCAL_GP_STATE["best_value"] = value
+            LOCAL_GP_STATE["best_parameters"] = experiment.trials[trial_index].arm.parameters
+
+        if LOCAL_GP_STATE["nr_successes"] >= LOCAL_GP_SUCCESS_TOLERANCE:
+            LOCAL_GP_STATE["length"] = min(2 * LOCAL_GP_STATE["length"], LOCAL_GP_LENGTH_MAX)
+            LOCAL_GP_STATE["nr_successes"] = 0
+        elif LOCAL_GP_STATE["nr_failures"] >= failure_tolerance:
+            LOCAL_GP_STATE["length"] /= 2
+            LOCAL_GP_STATE["nr_failures"] = 0
+
+        if LOCAL_GP_STATE["length"] < LOCAL_GP_LENGTH_MIN:
+            print_debug("update_local_gp_trust_region: trust region collapsed, restarting it")
+            LOCAL_GP_STATE["length"] = LOCAL_GP_LENGTH_INIT
+
+@beartype
+def get_local_gp_trust_region(search_space: Any) -> Any:
+    best_parameters = LOCAL_GP_STATE["best_parameters"]
+
+    if best_parameters is None:
+        return search_space
+
+    trust_region = search_space.clone()
+    length = LOCAL_GP_STATE["length"]
+
+    for name, parameter in trust_region.parameters.items():
+        if not isinstance(parameter, RangeParameter) or name not in best_parameters:
+            continue
+
+        lower, upper, center = float(parameter.lower), float(parameter.upper), float(best_parameters[name])
+
+        if parameter.log_scale:
+            lower, upper, center = math.log(lower), math.log(upper), math.log(center)
+
+        new_lower = max(lower, center - length * (upper - lower) / 2)
+        new_upper = min(upper, center + length * (upper - lower) / 2)
+
+        if parameter.log_scale:
+            new_lower, new_upper = math.exp(new_lower), math.exp(new_upper)
+
+        if parameter.parameter_type == ParameterType.INT:
+            new_lower, new_upper = math.floor(new_lower), math.ceil(new_upper)
+
+        new_lower = max(new_lower, parameter.lower)
+        new_upper = min(new_upper, parameter.upper)
+
+        if new_lower < new_upper:
+            parameter.update_range(lower=new_lower, upper=new_upper)
+
+    return trust_region
+
+@beartype
+def local_gp_fit(original_fit: Any, experiment: Any, data: Any, **kwargs: Any) -> None:
+    LOCAL_GP_STATE["search_space"] = experiment.search_space
+
+    df = data.df
+    objective_df = df[df["metric_name"] == arg_result_names[0]]
+
+    if len(objective_df) == 0:
+        original_fit(experiment=experiment, data=data, **kwargs)
+        return
+
+    update_local_gp_trust_region(experiment, objective_df)
+
+    observed_trial_indices = [int(trial_index) for trial_index in objective_df["trial_index"].unique()]
+
+    if len(observed_trial_indices) > args.local_gp_max_observations and LOCAL_GP_STATE["best_parameters"] is not None:
+        # Only the observations closest to the best point are used, so the fit cost stays flat as trials accumulate
+        observed_trial_indices.sort(key=lambda trial_index: get_parameter_distance(experiment.search_space, experiment.trials[trial_index].arm.parameters, LOCAL_GP_STATE["best_parameters"]))
+        data = data.__class__(df=df[df["trial_index"].isin(observed_trial_indices[:args.local_gp_max_observations])])
+
+    original_fit(experiment=experiment, data=data, **kwargs)
+
+@beartype
+def local_gp_gen(original_gen: Any, **kwargs: Any) -> Any:
+    if LOCAL_GP_STATE["search_space"] is not None:
+        kwargs["search_space"] = get_local_gp_trust_region(LOCAL_GP_STATE["search_space"])
+
+    return original_gen(**kwargs)
+
+@beartype
+def install_local_gp(step: Any) -> None:
+    model_specs = getattr(step, "model_specs", [])
+
+    if len(model_specs) == 0: # pragma: no cover
+        print_red("LOCAL_GP is not supported by this version of ax")
+        my_exit(203)
+
+    for model_spec in model_specs:
+        model_spec.fit = functools.partial(local_gp_fit, model_spec.fit)
+        model_spec.gen = functools.partial(local_gp_gen, model_spec.gen)
+
 @beartype
 def create_systematic_step(model: Any) -> Any:
     """Creates a generation step for Bayesian optimization."""
-    return GenerationStep(
+    step_kwargs: dict = {}
+
+    if uses_tpe() and "model_name" in inspect.signature(GenerationStep).parameters:
+        # The step runs SOBOL as a placeholder, the trials come from _fetch_next_trials_with_tpe
+        step_kwargs["model_name"] = "TPE"
+
+    step = GenerationStep(
         model=model,
         num_trials=-1,
         max_parallelism=_get_max_parallelism(),
         model_gen_kwargs={'enforce_num_arms': False},
-        should_deduplicate=args.should_deduplicate
+        should_deduplicate=args.should_deduplicate,
+        **step_kwargs
     )
 
+    install_model_extensions(step, model)
+
+    return step
+
+@beartype
+def install_model_extensions(step: Any, model: Any) -> None:
+    """Wraps the fit and gen of the step's models. The wrappers are not saved in the checkpoint, so they are installed again after loading it."""
+    if uses_local_gp():
+        install_local_gp(step)
+
+    if model not in [Models.SOBOL, Models.UNIFORM, Models.FACTORIAL]:
+        install_surrogate_refit_throttle(step)
+        install_generation_budget(step)
+
+    if "GPKG" in Models.__members__ and model == Models.__members__["GPKG"]:
+        install_fidelity_cost_model(step)
+
+@beartype
+def reinstall_model_extensions() -> None:
+    if not ax_client or not ax_client.generation_strategy: # pragma: no cover
+        return
+
+    for step in getattr(ax_client.generation_strategy, "_steps", []):
+        install_model_extensions(step, step.model)
+
 @beartype
 def create_random_generation_step() -> ax.modelbridge.generation_node.GenerationStep:
     """Creates a generation step for random models."""
@@ -5358,6 +8210,19 @@ def create_random_generation_step() -> ax.modelbridge.generation_node.Generation
         should_deduplicate=args.should_deduplicate
     )
 
+@beartype
+def has_fidelity_parameters() -> bool:
+    return len(global_vars.get("fidelity_parameter_names", [])) > 0
+
+@beartype
+def select_multi_fidelity_model() -> Any:
+    if "GPKG" in Models.__members__:
+        return Models.__members__["GPKG"]
+
+    print_yellow("This version of ax has no multi-fidelity knowledge gradient (GPKG), using BOTORCH_MODULAR, which fits a multi-fidelity GP but does not weigh the cost of a fidelity") # pragma: no cover
+
+    return Models.BOTORCH_MODULAR
+
 @beartype
 def select_model(model_arg: Any) -> Any:
     """Selects the model based on user input or defaults to BOTORCH_MODULAR."""
@@ -5366,7 +8231,13 @@ def select_model(model_arg: Any) -> Any:
 
     if model_arg:
         model_upper = str(model_arg).upper()
-        if model_upper in available_models:
+        if model_upper == "LOCAL_GP":
+            # A BOTORCH_MODULAR GP that create_systematic_step restricts to a trust region
+            chosen_model = Models.BOTORCH_MODULAR
+        elif model_upper == "TPE":
+            # Trials are generated by _fetch_next_trials_with_tpe, the step is a placeholder that create_systematic_step names TPE
+            chosen_model = Models.SOBOL
+        elif model_upper in available_models:
             chosen_model = Models.__members__[model_upper]
         else: # pragma: no cover
             print_red(f"⚠ Cannot use {model_arg}. Available models are: {', '.join(available_models)}. Using BOTORCH_MODULAR instead.")
@@ -5374,6 +8245,9 @@ def select_model(model_arg: Any) -> Any:
         if model_arg.lower() != "factorial" and args.gridsearch:
             print_red("Gridsearch only really works when you chose the FACTORIAL model.")
 
+    if has_fidelity_parameters() and chosen_model == Models.BOTORCH_MODULAR and not uses_local_gp():
+        chosen_model = select_multi_fidelity_model()
+
     return chosen_model
 
 @beartype
@@ -5407,6 +8281,146 @@ def get_generation_strategy() -> Any:
     # Create and return the GenerationStrategy
     return GenerationStrategy(steps=steps)
 
+JOB_COMPLETION_NOTIFIER: dict = {
+    "libc": None,
+    "fd": None,
+    "disabled": False,
+    "watches": {},
+    "seen_result_pickles": set(),
+    "poll_interval": 0.5,
+    "nr_wakeups": 0,
+    "nr_timeouts": 0
+}
+
+IN_CREATE: int = 0x00000100
+IN_CLOSE_WRITE: int = 0x00000008
+IN_MOVED_TO: int = 0x00000080
+IN_ISDIR: int = 0x40000000
+
+@beartype
+def init_job_completion_notifier() -> bool:
+    if JOB_COMPLETION_NOTIFIER["fd"] is not None:
+        return True
+
+    if JOB_COMPLETION_NOTIFIER["disabled"]:
+        return False
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+
+        if fd < 0: # pragma: no cover
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        JOB_COMPLETION_NOTIFIER["libc"] = libc
+        JOB_COMPLETION_NOTIFIER["fd"] = fd
+    except (OSError, AttributeError) as e: # pragma: no cover
+        print_debug(f"init_job_completion_notifier: inotify is not available, falling back to polling: {e}")
+        JOB_COMPLETION_NOTIFIER["disabled"] = True
+        return False
+
+    return True
+
+@beartype
+def add_job_completion_watch(path: str) -> None:
+    if path in JOB_COMPLETION_NOTIFIER["watches"].values() or not os.path.isdir(path):
+        return
+
+    wd = JOB_COMPLETION_NOTIFIER["libc"].inotify_add_watch(JOB_COMPLETION_NOTIFIER["fd"], path.encode("utf-8"), IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO)
+
+    if wd < 0: # pragma: no cover
+        print_debug(f"add_job_completion_watch: could not watch {path} (errno {ctypes.get_errno()})")
+        return
+
+    JOB_COMPLETION_NOTIFIER["watches"][wd] = path
+
+@beartype
+def read_job_completion_events() -> None:
+    try:
+        data = os.read(JOB_COMPLETION_NOTIFIER["fd"], 65536)
+    except BlockingIOError: # pragma: no cover
+        return
+
+    offset = 0
+
+    while offset + 16 <= len(data):
+        wd, mask, _, name_len = struct.unpack_from("iIII", data, offset)
+        name = data[offset + 16:offset + 16 + name_len].rstrip(b"\0").decode("utf-8", errors="replace")
+        offset += 16 + name_len
+
+        path = JOB_COMPLETION_NOTIFIER["watches"].get(wd)
+
+        if path is None: # pragma: no cover
+            continue
+
+        if mask & IN_ISDIR and mask & IN_CREATE:
+            add_job_completion_watch(f"{path}/{name}")
+
+@beartype
+def has_new_result_pickle() -> bool:
+    found_new = False
+
+    for job, _ in global_vars["jobs"][:]:
+        result_pickle = getattr(getattr(job, "paths", None), "result_pickle", None)
+
+        if result_pickle is not None and result_pickle not in JOB_COMPLETION_NOTIFIER["seen_result_pickles"] and os.path.exists(result_pickle):
+            JOB_COMPLETION_NOTIFIER["seen_result_pickles"].add(result_pickle)
+            found_new = True
+
+    if found_new:
+        invalidate_job_state_cache()
+
+    return found_new
+
+@beartype
+def uses_local_process_pool() -> bool:
+    return args.local_process_pool and (not SYSTEM_HAS_SBATCH or args.force_local_execution)
+
+@beartype
+def jobs_run_in_background() -> bool:
+    return (is_slurm_job() and not args.force_local_execution) or args.worker_pool_size > 0 or uses_local_process_pool()
+
+@beartype
+def wait_for_job_completion_event(timeout: Union[int, float]) -> bool:
+    if args.no_sleep:
+        return False
+
+    use_inotify = init_job_completion_notifier()
+
+    if use_inotify:
+        single_runs_folder = f"{get_current_run_folder()}/single_runs"
+
+        add_job_completion_watch(single_runs_folder)
+
+        for job, _ in global_vars["jobs"][:]:
+            result_pickle = getattr(getattr(job, "paths", None), "result_pickle", None)
+
+            if result_pickle is not None:
+                add_job_completion_watch(os.path.dirname(str(result_pickle)))
+
+    deadline = time.time() + timeout
+
+    while True:
+        if has_new_result_pickle():
+            JOB_COMPLETION_NOTIFIER["nr_wakeups"] += 1
+            return True
+
+        remaining = deadline - time.time()
+
+        if remaining <= 0:
+            JOB_COMPLETION_NOTIFIER["nr_timeouts"] += 1
+            return False
+
+        wait_time = min(remaining, JOB_COMPLETION_NOTIFIER["poll_interval"])
+
+        if use_inotify:
+            readable, _, _ = select.select([JOB_COMPLETION_NOTIFIER["fd"]], [], [], wait_time)
+
+            if readable:
+                read_job_completion_events()
+        else:
+            time.sleep(wait_time)
+
 @beartype
 def wait_for_jobs_or_break(_max_eval: Optional[int], _progress_bar: Any) -> bool:
     while len(global_vars["jobs"]) > num_parallel_jobs: # pragma: no cover
@@ -5415,8 +8429,8 @@ def wait_for_jobs_or_break(_max_eval: Optional[int], _progress_bar: Any) -> bool
         if break_run_search("create_and_execute_next_runs", _max_eval, _progress_bar):
             return True
 
-        if is_slurm_job() and not args.force_local_execution:
-            _sleep(5)
+        if jobs_run_in_background():
+            wait_for_job_completion_event(5)
 
     if break_run_search("create_and_execute_next_runs", _max_eval, _progress_bar): # pragma: no cover
         return True
@@ -5447,6 +8461,39 @@ def execute_trials(trial_index_to_param: dict, next_nr_steps: int, phase: Option
             i += 1
     return results
 
+@beartype
+def abandon_unsubmitted_trials(trial_indices: list, caller: str) -> None:
+    """Trials that were generated but will never run, so they do not stay orphaned in the experiment."""
+    for trial_index in trial_indices:
+        try:
+            with AX_CLIENT_LOCK:
+                ax_client.experiment.trials[trial_index].mark_abandoned()
+        except Exception as e: # pragma: no cover
+            print_debug(f"{caller}: could not abandon trial {trial_index}: {e}")
+
+        ledger_record_trial(trial_index, "ABANDONED")
+
+@beartype
+def execute_trials_as_job_array(trial_index_to_param: dict, phase: Optional[str], _max_eval: Optional[int], _progress_bar: Any) -> dict:
+    """Submits the trials of this round as one job array and returns the ones that were submitted."""
+    if wait_for_jobs_or_break(_max_eval, _progress_bar): # pragma: no cover
+        abandon_unsubmitted_trials(list(trial_index_to_param.keys()), "execute_trials_as_job_array")
+        return {}
+
+    # Like execute_trials, do not submit more than --max_eval trials
+    nr_of_remaining_evaluations = max_eval + get_nr_of_imported_jobs() - submitted_jobs()
+
+    trial_indices = list(trial_index_to_param.keys())
+
+    abandon_unsubmitted_trials(trial_indices[max(0, nr_of_remaining_evaluations):], "execute_trials_as_job_array")
+
+    trial_index_to_param = {trial_index: trial_index_to_param[trial_index] for trial_index in trial_indices[:max(0, nr_of_remaining_evaluations)]}
+
+    if len(trial_index_to_param):
+        execute_evaluations_as_job_array(trial_index_to_param, phase)
+
+    return trial_index_to_param
+
 @beartype
 def process_results(results: list) -> None:
     for r in results:
@@ -5486,15 +8533,22 @@ def create_and_execute_next_runs(next_nr_steps: int, phase: Optional[str], _max_
     try:
         nr_of_jobs_to_get = _calculate_nr_of_jobs_to_get(get_nr_of_imported_jobs(), len(global_vars["jobs"]))
         results = []
+        trial_index_to_param_for_job_array: dict = {}
 
-        for _ in range(nr_of_jobs_to_get + 1):
-            trial_index_to_param, optimization_complete = _get_next_trials(1)
-            done_optimizing = handle_optimization_completion(optimization_complete)
-            if done_optimizing:
-                continue
-            if trial_index_to_param:
+        trial_index_to_param, optimization_complete = _get_next_trials(nr_of_jobs_to_get + 1)
+        done_optimizing = handle_optimization_completion(optimization_complete)
+
+        if trial_index_to_param and not done_optimizing:
+            if args.batch_objective:
+                execute_trials_as_batch(trial_index_to_param, phase)
+            elif args.slurm_job_arrays:
+                trial_index_to_param_for_job_array.update(trial_index_to_param)
+            else:
                 results.extend(execute_trials(trial_index_to_param, next_nr_steps, phase, _max_eval, _progress_bar))
 
+        if len(trial_index_to_param_for_job_array):
+            trial_index_to_param = execute_trials_as_job_array(trial_index_to_param_for_job_array, phase, _max_eval, _progress_bar)
+
         process_results(results)
         finish_previous_jobs(["finishing jobs after starting them"])
 
@@ -5542,13 +8596,363 @@ def get_number_of_steps(_max_eval: int) -> Tuple[int, int]:
 
     return _random_steps, second_step_steps
 
+@beartype
+def run_on_cpu_set(cpu_set: Optional[list], func: Any, *func_args: Any) -> Any: # pragma: no cover
+    if cpu_set:
+        os.sched_setaffinity(0, set(cpu_set))
+
+    return func(*func_args)
+
+class LocalProcessJob:
+    @beartype
+    def __init__(self, job: Any, cpu_set: Optional[list]) -> None:
+        # Not a submitit LocalJob itself, is_job_done would treat it as finished and block in result()
+        self.job = job
+        self.job_id = str(job.job_id)
+        self.cpu_set = cpu_set
+        self.paths = job.paths
+
+    @beartype
+    def state(self) -> str:
+        return str(self.job.state).lower()
+
+    def __repr__(self) -> str:
+        return f'LocalProcessJob<job_id={self.job_id}, state="{self.state().upper()}">'
+
+    @beartype
+    def done(self) -> bool:
+        return self.job.done()
+
+    @beartype
+    def result(self) -> Any:
+        return self.job.result()
+
+    @beartype
+    def cancel(self) -> None:
+        self.job.cancel(check=False)
+
+class LocalProcessPoolExecutor:
+    @beartype
+    def __init__(self, folder: str) -> None:
+        self.folder = folder
+        self.cpus_per_task = 1
+        self.jobs: list = []
+
+        makedirs(folder)
+
+        # submitit starts every job in a fresh interpreter. Forking this process could copy a lock
+        # that one of its threads (submit threads, state persister, candidate pregeneration) holds.
+        self.local_executor = LocalExecutor(folder=f"{folder}/%j")
+
+    @beartype
+    def update_parameters(self, **kwargs: Any) -> None:
+        if "timeout_min" in kwargs:
+            self.local_executor.update_parameters(timeout_min=int(kwargs["timeout_min"]))
+
+        if "cpus_per_task" in kwargs:
+            self.cpus_per_task = max(1, int(kwargs["cpus_per_task"]))
+
+    @beartype
+    def batch(self) -> Any:
+        return contextlib.nullcontext()
+
+    @beartype
+    def get_free_cpu_set(self) -> Optional[list]:
+        if not args.pin_cpus:
+            return None
+
+        available_cpus = sorted(os.sched_getaffinity(0))
+        cpu_sets = [available_cpus[i:i + self.cpus_per_task] for i in range(0, len(available_cpus) - self.cpus_per_task + 1, self.cpus_per_task)]
+
+        used_cpu_sets = [job.cpu_set for job in self.jobs]
+
+        for cpu_set in cpu_sets:
+            if cpu_set not in used_cpu_sets:
+                return cpu_set
+
+        print_debug(f"LocalProcessPoolExecutor: no free set of {self.cpus_per_task} CPUs left, not pinning this job")
+
+        return None
+
+    @beartype
+    def submit(self, func: Any, *func_args: Any) -> LocalProcessJob:
+        self.jobs = [job for job in self.jobs if not job.done()]
+
+        cpu_set = self.get_free_cpu_set()
+
+        job = LocalProcessJob(self.local_executor.submit(run_on_cpu_set, cpu_set, func, *func_args), cpu_set)
+        self.jobs.append(job)
+
+        print_debug(f"LocalProcessPoolExecutor: started job {job.job_id}" + (f" on CPUs {cpu_set}" if cpu_set else ""))
+
+        return job
+
+WORKER_POOL_HEARTBEAT_SECONDS: int = 10
+WORKER_POOL_HEARTBEAT_TIMEOUT: int = 120
+WORKER_POOL_MAINTENANCE_SECONDS: int = 5
+WORKER_POOL_CANCEL_POLL_SECONDS: float = 1
+
+@beartype
+def claim_worker_pool_task(pool_folder: str, worker_id: int) -> Optional[str]:
+    for filename in sorted(os.listdir(f"{pool_folder}/queue")):
+        if not filename.endswith(".json"):
+            continue
+
+        try:
+            os.rename(f"{pool_folder}/queue/{filename}", f"{pool_folder}/claimed/{worker_id}__{filename}")
+        except FileNotFoundError: # pragma: no cover
+            continue
+
+        return filename[:-len(".json")]
+
+    return None
+
+@beartype
+def watch_worker_pool_task_cancellation(cancel_file: str, stop_watching: threading.Event) -> None: # pragma: no cover
+    while not stop_watching.wait(WORKER_POOL_CANCEL_POLL_SECONDS):
+        if not os.path.exists(cancel_file):
+            continue
+
+        # The evaluated program runs as a child of this worker, killing it makes evaluate() return
+        for child in psutil.Process().children(recursive=True):
+            try:
+                child.kill()
+            except psutil.NoSuchProcess:
+                pass
+
+        return
+
+@beartype
+def run_worker_pool_task(pool_folder: str, worker_id: int, task_id: str) -> None:
+    claimed_file = f"{pool_folder}/claimed/{worker_id}__{task_id}.json"
+    cancel_file = f"{pool_folder}/cancelled/{task_id}"
+
+    with open(claimed_file, mode="r", encoding="utf-8") as f:
+        parameters = json.load(f)
+
+    stop_watching = threading.Event()
+    threading.Thread(target=watch_worker_pool_task_cancellation, args=(cancel_file, stop_watching), daemon=True).start()
+
+    try:
+        with open(f"{pool_folder}/logs/{task_id}.out", mode="a", encoding="utf-8") as out, open(f"{pool_folder}/logs/{task_id}.err", mode="a", encoding="utf-8") as err:
+            with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+                result = evaluate(parameters)
+    finally:
+        stop_watching.set()
+
+    if os.path.exists(cancel_file):
+        os.unlink(cancel_file)
+    else:
+        write_json_file_atomically(f"{pool_folder}/results/{task_id}.json", result)
+
+    if os.path.exists(claimed_file):
+        os.unlink(claimed_file)
+
+@beartype
+def worker_pool_worker(pool_folder: str, worker_id: int) -> int: # pragma: no cover
+    heartbeat_file = f"{pool_folder}/heartbeats/{worker_id}"
+    stop_heartbeat = threading.Event()
+
+    def _heartbeat() -> None:
+        while not stop_heartbeat.is_set():
+            Path(heartbeat_file).touch()
+            stop_heartbeat.wait(WORKER_POOL_HEARTBEAT_SECONDS)
+
+    threading.Thread(target=_heartbeat, daemon=True).start()
+
+    nr_done = 0
+
+    try:
+        while not os.path.exists(f"{pool_folder}/stop"):
+            task_id = claim_worker_pool_task(pool_folder, worker_id)
+
+            if task_id is None:
+                time.sleep(0.2)
+                continue
+
+            run_worker_pool_task(pool_folder, worker_id, task_id)
+            nr_done += 1
+    finally:
+        stop_heartbeat.set()
+
+    return nr_done
+
+class WorkerPoolJob:
+    @beartype
+    def __init__(self, pool: Any, task_id: str) -> None:
+        self.pool = pool
+        self.task_id = task_id
+        self.job_id = f"pool_{task_id}"
+        self.cancelled = False
+        self.paths = SimpleNamespace(
+            stdout=Path(f"{pool.folder}/logs/{task_id}.out"),
+            stderr=Path(f"{pool.folder}/logs/{task_id}.err"),
+            result_pickle=f"{pool.folder}/results/{task_id}.json"
+        )
+
+    @beartype
+    def state(self) -> str:
+        if self.cancelled:
+            return "cancelled"
+
+        if os.path.exists(self.paths.result_pickle):
+            return "completed"
+
+        if os.path.exists(f"{self.pool.folder}/queue/{self.task_id}.json"):
+            return "pending"
+
+        return "running"
+
+    def __repr__(self) -> str:
+        return f'WorkerPoolJob<job_id={self.job_id}, state="{self.state().upper()}">'
+
+    @beartype
+    def done(self) -> bool:
+        self.pool.maintain()
+
+        return self.cancelled or os.path.exists(self.paths.result_pickle)
+
+    @beartype
+    def result(self) -> Any:
+        while not self.done():
+            time.sleep(0.1)
+
+        if self.cancelled: # pragma: no cover
+            return get_return_in_case_of_errors()
+
+        with open(self.paths.result_pickle, mode="r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @beartype
+    def cancel(self) -> None:
+        self.cancelled = True
+
+        queued_file = f"{self.pool.folder}/queue/{self.task_id}.json"
+
+        if os.path.exists(queued_file):
+            try:
+                os.unlink(queued_file)
+                return
+            except FileNotFoundError: # pragma: no cover
+                pass
+
+        # A worker has claimed the task already, it polls for this marker and kills the running program
+        Path(f"{self.pool.folder}/cancelled/{self.task_id}").touch()
+
+class WorkerPoolExecutor:
+    @beartype
+    def __init__(self, base_executor: Any, folder: str, size: int) -> None:
+        self.base_executor = base_executor
+        self.folder = folder
+        self.size = size
+        self.workers: dict = {}
+        self.next_worker_id = 0
+        self.next_task_id = 0
+        self.last_maintenance = 0.0
+        self.nr_requeued_tasks = 0
+
+        for subfolder in ["queue", "claimed", "results", "logs", "heartbeats", "cancelled"]:
+            makedirs(f"{folder}/{subfolder}")
+
+    @beartype
+    def start_worker(self) -> None:
+        worker_id = self.next_worker_id
+        self.next_worker_id += 1
+
+        self.workers[worker_id] = self.base_executor.submit(worker_pool_worker, self.folder, worker_id)
+
+        print_debug(f"WorkerPoolExecutor: started worker {worker_id} as job {self.workers[worker_id].job_id}")
+
+    @beartype
+    def start(self) -> None:
+        for _ in range(self.size):
+            self.start_worker()
+
+    @beartype
+    def submit(self, func: Any, parameters: dict) -> WorkerPoolJob:
+        if func is not evaluate: # pragma: no cover
+            raise ValueError("The worker pool can only run evaluate()")
+
+        task_id = f"{self.next_task_id:08d}"
+        self.next_task_id += 1
+
+        write_json_file_atomically(f"{self.folder}/queue/{task_id}.json", parameters)
+
+        self.maintain()
+
+        return WorkerPoolJob(self, task_id)
+
+    @beartype
+    def update_parameters(self, **kwargs: Any) -> None:
+        self.base_executor.update_parameters(**kwargs)
+
+    @beartype
+    def batch(self) -> Any:
+        return contextlib.nullcontext()
+
+    @beartype
+    def requeue_tasks_of_worker(self, worker_id: int) -> None:
+        prefix = f"{worker_id}__"
+
+        for filename in os.listdir(f"{self.folder}/claimed"):
+            if filename.startswith(prefix):
+                try:
+                    os.rename(f"{self.folder}/claimed/{filename}", f"{self.folder}/queue/{filename[len(prefix):]}")
+                    self.nr_requeued_tasks += 1
+                    print_yellow(f"Worker {worker_id} of the worker pool was lost, requeueing task {filename[len(prefix):]}")
+                except FileNotFoundError: # pragma: no cover
+                    pass
+
+    @beartype
+    def is_worker_lost(self, worker_id: int, worker_job: Any) -> bool:
+        if worker_job.done():
+            return True
+
+        heartbeat_file = f"{self.folder}/heartbeats/{worker_id}"
+
+        return os.path.exists(heartbeat_file) and time.time() - os.path.getmtime(heartbeat_file) > WORKER_POOL_HEARTBEAT_TIMEOUT
+
+    @beartype
+    def maintain(self) -> None:
+        if time.time() - self.last_maintenance < WORKER_POOL_MAINTENANCE_SECONDS or os.path.exists(f"{self.folder}/stop"):
+            return
+
+        self.last_maintenance = time.time()
+
+        for worker_id, worker_job in list(self.workers.items()):
+            if not self.is_worker_lost(worker_id, worker_job):
+                continue
+
+            del self.workers[worker_id]
+
+            try:
+                worker_job.cancel()
+            except Exception as e: # pragma: no cover
+                print_debug(f"WorkerPoolExecutor: cancelling worker {worker_id} failed: {e}")
+
+            self.requeue_tasks_of_worker(worker_id)
+            self.start_worker()
+
+    @beartype
+    def stop(self) -> None:
+        Path(f"{self.folder}/stop").touch()
+
+        print_debug(f"WorkerPoolExecutor: stopped, {self.next_task_id} tasks, {self.nr_requeued_tasks} requeued")
+
+@beartype
+def stop_worker_pool() -> None:
+    if isinstance(executor, WorkerPoolExecutor):
+        executor.stop()
+
 @beartype
 def set_global_executor() -> None:
     global executor
 
     log_folder: str = f'{get_current_run_folder()}/single_runs/%j'
 
-    if args.force_local_execution:
+    if uses_local_process_pool():
+        executor = LocalProcessPoolExecutor(folder=os.path.dirname(log_folder))
+    elif args.force_local_execution:
         executor = LocalExecutor(folder=log_folder)
     else:
         executor = AutoExecutor(folder=log_folder)
@@ -5589,6 +8993,13 @@ def set_global_executor() -> None:
 """
         )
 
+        if args.slurm_job_arrays and not args.force_local_execution: # pragma: no cover
+            executor.update_parameters(slurm_array_parallelism=num_parallel_jobs)
+
+        if args.worker_pool_size > 0:
+            executor = WorkerPoolExecutor(executor, f"{get_current_run_folder()}/worker_pool", args.worker_pool_size)
+            executor.start()
+
         if args.exclude: # pragma: no cover
             print_yellow(f"Excluding the following nodes: {args.exclude}")
     else: # pragma: no cover
@@ -5677,8 +9088,8 @@ def run_search(_progress_bar: Any) -> bool:
 
         finish_previous_jobs(["finishing previous jobs"])
 
-        if is_slurm_job() and not args.force_local_execution: # pragma: no cover
-            _sleep(1)
+        if jobs_run_in_background() and len(global_vars["jobs"]) >= num_parallel_jobs: # pragma: no cover
+            wait_for_job_completion_event(1)
 
         if nr_of_items == 0 and len(global_vars["jobs"]) == 0:
             _wrn = f"found {NR_OF_0_RESULTS} zero-jobs (max: {args.max_nr_of_zero_results})"
@@ -5703,8 +9114,8 @@ def run_search(_progress_bar: Any) -> bool:
         wait_for_jobs_to_complete(1)
         finish_previous_jobs([f"waiting for jobs ({len(global_vars['jobs'])} left)"])
 
-        if is_slurm_job() and not args.force_local_execution:
-            _sleep(1)
+        if jobs_run_in_background():
+            wait_for_job_completion_event(1)
 
     log_what_needs_to_be_logged()
     return False
@@ -5715,8 +9126,8 @@ def wait_for_jobs_to_complete(_num_parallel_jobs: int) -> None: # pragma: no cov
         while len(global_vars["jobs"]) > _num_parallel_jobs:
             print_debug(f"Waiting for jobs to finish since it equals or exceeds the num_random_steps ({_num_parallel_jobs}), currently, len(global_vars['jobs']) = {len(global_vars['jobs'])}")
             progressbar_description([f"waiting for old jobs to finish ({len(global_vars['jobs'])} left)"])
-            if is_slurm_job() and not args.force_local_execution:
-                _sleep(5)
+            if jobs_run_in_background():
+                wait_for_job_completion_event(5)
 
             finish_previous_jobs([f"waiting for jobs ({len(global_vars['jobs'])} left)"])
 
@@ -6013,6 +9424,8 @@ def main() -> None:
 
     save_state_files()
 
+    check_run_function()
+
     helpers.write_loaded_modules_versions_to_json(f"{get_current_run_folder()}/loaded_modules.json")
 
     write_run_uuid_to_file()
@@ -6067,13 +9480,25 @@ def main() -> None:
         sys.exit(244)
 
     load_existing_job_data_into_ax_client()
-    original_print(f"Run-Program: {global_vars['joined_run_program']}")
+
+    if global_vars["run_function"]:
+        original_print(f"Run-Function: {global_vars['run_function']}")
+    else:
+        original_print(f"Run-Program: {global_vars['joined_run_program']}")
 
     save_global_vars()
     write_process_info()
 
     start_live_share_background_job()
 
+    create_initial_design()
+
+    save_pd_csv()
+
+    start_state_persister_background_job()
+
+    start_candidate_pregeneration()
+
     write_continue_run_uuid_to_file()
 
     disable_tqdm = args.disable_tqdm or ci_env
@@ -6257,8 +9682,285 @@ def test_find_paths(program_code: str) -> int:
 
     return nr_errors
 
+@beartype
+def test_job_state_cache() -> int:
+    """Runs refresh_job_state_cache against a fake squeue and sacct on the PATH."""
+    import tempfile
+
+    global SYSTEM_HAS_SBATCH
+
+    class _FakeSlurmJob(submitit.SlurmJob):
+        def done(self: Any, _force_check: bool = False) -> bool:
+            return has_result_pickle(self)
+
+    def _read_calls() -> str:
+        with open(f"{fake_bin}/calls", mode="r", encoding="utf-8") as f:
+            return f.read()
+
+    nr_errors: int = 0
+
+    old_path = os.environ.get("PATH", "")
+    old_system_has_sbatch = SYSTEM_HAS_SBATCH
+    old_force_local_execution = args.force_local_execution
+    old_job_state_cache_seconds = args.job_state_cache_seconds
+    old_jobs = global_vars["jobs"]
+    old_job_state_cache = dict(JOB_STATE_CACHE)
+
+    with tempfile.TemporaryDirectory() as fake_bin:
+        for program, output in [["squeue", "101|RUNNING\\n102|PENDING"], ["sacct", "103|COMPLETED\\n103.batch|COMPLETED"]]:
+            with open(f"{fake_bin}/{program}", mode="w", encoding="utf-8") as f:
+                f.write(f"#!/bin/bash\necho \"$*\" >> {fake_bin}/calls\nprintf '{output}\\n'\n")
+            os.chmod(f"{fake_bin}/{program}", 0o755)
+
+        try:
+            os.environ["PATH"] = f"{fake_bin}:{old_path}"
+            SYSTEM_HAS_SBATCH = True
+            args.force_local_execution = False
+            args.job_state_cache_seconds = 3600
+
+            jobs = [_FakeSlurmJob(folder=fake_bin, job_id=job_id) for job_id in ["101", "102", "103"]]
+            global_vars["jobs"] = [(job, i) for i, job in enumerate(jobs)]
+            JOB_STATE_CACHE.update({"states": {}, "last_refresh": 0.0, "nr_bulk_queries": 0, "nr_lookups": 0})
+
+            nr_errors += is_equal("get_job_state with a fake squeue and sacct", json.dumps([get_job_state(job) for job in jobs]), json.dumps(["running", "pending", "completed"]))
+            nr_errors += is_equal("get_job_state asks squeue and sacct once for all jobs", JOB_STATE_CACHE["nr_bulk_queries"], 2)
+
+            for job in jobs:
+                get_job_state(job)
+
+            nr_errors += is_equal("get_job_state within --job_state_cache_seconds does not ask again", JOB_STATE_CACHE["nr_bulk_queries"], 2)
+            nr_errors += is_equal("get_job_state lookups from the cache", JOB_STATE_CACHE["nr_lookups"], 6)
+            nr_errors += is_equal("squeue is asked for all jobs in one call", _read_calls().count("--jobs=101,102,103"), 1)
+            nr_errors += is_equal("sacct is only asked for the job squeue does not know", _read_calls().count("--jobs=103"), 1)
+
+            nr_errors += is_equal("is_job_done of a job squeue reports as running", is_job_done(jobs[0]), False)
+
+            Path(jobs[0].paths.result_pickle).touch()
+
+            nr_errors += is_equal("is_job_done of a job squeue reports as running, but with a result", is_job_done(jobs[0]), True)
+            nr_errors += is_equal("is_job_done of a pending job", is_job_done(jobs[1]), False)
+        finally:
+            os.environ["PATH"] = old_path
+            SYSTEM_HAS_SBATCH = old_system_has_sbatch
+            args.force_local_execution = old_force_local_execution
+            args.job_state_cache_seconds = old_job_state_cache_seconds
+            global_vars["jobs"] = old_jobs
+            JOB_STATE_CACHE.update(old_job_state_cache)
+
+    return nr_errors
+
+@beartype
+def test_job_completion_event() -> int:
+    """Runs wait_for_job_completion_event with inotify and with the polling fallback."""
+    import tempfile
+
+    nr_errors: int = 0
+
+    old_no_sleep = args.no_sleep
+    old_jobs = global_vars["jobs"]
+    old_notifier = {key: (value.copy() if isinstance(value, (dict, set)) else value) for key, value in JOB_COMPLETION_NOTIFIER.items()}
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        try:
+            args.no_sleep = False
+
+            JOB_COMPLETION_NOTIFIER.update({"libc": None, "fd": None, "disabled": False, "watches": {}, "seen_result_pickles": set(), "poll_interval": 0.1, "nr_wakeups": 0, "nr_timeouts": 0})
+
+            for i in range(2):
+                os.makedirs(f"{tmpdir}/{i}")
+
+            jobs = [SimpleNamespace(paths=SimpleNamespace(result_pickle=f"{tmpdir}/{i}/{i}_0_result.pkl")) for i in range(2)]
+            global_vars["jobs"] = [(jobs[0], 0)]
+
+            if init_job_completion_notifier():
+                threading.Timer(0.3, Path(jobs[0].paths.result_pickle).touch).start()
+
+                start_time = time.time()
+
+                nr_errors += is_equal("wait_for_job_completion_event with inotify wakes up on a new result", wait_for_job_completion_event(10), True)
+                nr_errors += is_equal("wait_for_job_completion_event with inotify returns before the timeout", time.time() - start_time < 5, True)
+                nr_errors += is_equal("wait_for_job_completion_event watches the folder of the result pickle", f"{tmpdir}/0" in JOB_COMPLETION_NOTIFIER["watches"].values(), True)
+                nr_errors += is_equal("wait_for_job_completion_event with inotify does not report a result twice", wait_for_job_completion_event(0.3), False)
+                nr_errors += is_equal("wait_for_job_completion_event with inotify counts wakeups and timeouts", json.dumps([JOB_COMPLETION_NOTIFIER["nr_wakeups"], JOB_COMPLETION_NOTIFIER["nr_timeouts"]]), json.dumps([1, 1]))
+
+                os.close(JOB_COMPLETION_NOTIFIER["fd"])
+            else: # pragma: no cover
+                print_yellow("test_job_completion_event: inotify is not available, only testing the polling fallback")
+
+            JOB_COMPLETION_NOTIFIER.update({"libc": None, "fd": None, "disabled": True, "watches": {}, "nr_wakeups": 0, "nr_timeouts": 0})
+            global_vars["jobs"] = [(jobs[0], 0), (jobs[1], 1)]
+
+            nr_errors += is_equal("init_job_completion_notifier when inotify is disabled", init_job_completion_notifier(), False)
+
+            threading.Timer(0.3, Path(jobs[1].paths.result_pickle).touch).start()
+
+            nr_errors += is_equal("wait_for_job_completion_event with polling wakes up on a new result", wait_for_job_completion_event(10), True)
+            nr_errors += is_equal("wait_for_job_completion_event with polling times out without a new result", wait_for_job_completion_event(0.3), False)
+            nr_errors += is_equal("wait_for_job_completion_event with polling counts wakeups and timeouts", json.dumps([JOB_COMPLETION_NOTIFIER["nr_wakeups"], JOB_COMPLETION_NOTIFIER["nr_timeouts"]]), json.dumps([1, 1]))
+            nr_errors += is_equal("wait_for_job_completion_event with polling adds no watches", len(JOB_COMPLETION_NOTIFIER["watches"]), 0)
+
+            args.no_sleep = True
+
+            nr_errors += is_equal("wait_for_job_completion_event with --no_sleep", wait_for_job_completion_event(10), False)
+        finally:
+            args.no_sleep = old_no_sleep
+            global_vars["jobs"] = old_jobs
+            JOB_COMPLETION_NOTIFIER.update(old_notifier)
+
+    return nr_errors
+
+@beartype
+def test_early_stopping() -> int:
+    """Runs parse_progress_line on OO_PROGRESS lines and should_stop_trial_early against the curves of completed trials."""
+    global arg_result_names, arg_result_min_or_max
+
+    nr_errors: int = 0
+
+    old_result_names = arg_result_names
+    old_result_min_or_max = arg_result_min_or_max
+    old_early_stopping_args = {key: getattr(args, key) for key in ["early_stopping", "early_stopping_metric", "early_stopping_min_trials", "early_stopping_min_step", "early_stopping_percentile"]}
+    old_progress = EARLY_STOPPING_STATE["progress"]
+
+    try:
+        arg_result_names = ["loss"]
+        arg_result_min_or_max = ["min"]
+        args.early_stopping_metric = None
+
+        for line, expected in [
+            ["OO_PROGRESS step=10 loss=0.3", [10.0, 0.3]],
+            ["OO_PROGRESS step=10 acc=0.3", [10.0, 0.3]],
+            ["OO_PROGRESS step=10 acc=0.3 f1=2", None],
+            ["OO_PROGRESS loss=0.3", None],
+            ["OO_PROGRESS step=10 loss=abc", None],
+            ["OO_PROGRESS step=10 loss=nan", None],
+            ["RESULT: 0.3", None]
+        ]:
+            nr_errors += is_equal(f"parse_progress_line('{line}')", json.dumps(parse_progress_line(line)), json.dumps(expected))
+
+        arg_result_min_or_max = ["max"]
+        nr_errors += is_equal("parse_progress_line negates the value of a maximized result", json.dumps(parse_progress_line("OO_PROGRESS step=10 loss=0.3")), json.dumps([10.0, -0.3]))
+
+        arg_result_min_or_max = ["min"]
+        args.early_stopping_metric = "acc"
+        nr_errors += is_equal("parse_progress_line with --early_stopping_metric", json.dumps(parse_progress_line("OO_PROGRESS step=1 loss=1 acc=2")), json.dumps([1.0, 2.0]))
+        nr_errors += is_equal("parse_progress_line without the --early_stopping_metric key", json.dumps(parse_progress_line("OO_PROGRESS step=1 loss=1")), json.dumps(None))
+
+        EARLY_STOPPING_STATE["progress"] = {
+            0: {1.0: 1.0, 2.0: 0.5, 3.0: 0.2},
+            1: {1.0: 1.2, 2.0: 0.6, 3.0: 0.3},
+            2: {1.0: 0.9, 2.0: 0.4, 3.0: 0.1},
+            3: {1.0: 5.0, 2.0: 4.0},
+            4: {1.0: 0.1, 2.0: 0.05}
+        }
+
+        args.early_stopping = "median"
+        args.early_stopping_min_trials = 3
+        args.early_stopping_min_step = 0
+
+        nr_errors += is_equal("should_stop_trial_early (median) of a trial worse than the completed curves", should_stop_trial_early(3), True)
+        nr_errors += is_equal("should_stop_trial_early (median) of a trial better than the completed curves", should_stop_trial_early(4), False)
+        nr_errors += is_equal("should_stop_trial_early of a trial without progress", should_stop_trial_early(5), False)
+
+        args.early_stopping = "percentile"
+        args.early_stopping_percentile = 25
+
+        nr_errors += is_equal("should_stop_trial_early (percentile) of a trial worse than the completed curves", should_stop_trial_early(3), True)
+        nr_errors += is_equal("should_stop_trial_early (percentile) of a trial better than the completed curves", should_stop_trial_early(4), False)
+
+        args.early_stopping_min_step = 3
+        nr_errors += is_equal("should_stop_trial_early before --early_stopping_min_step", should_stop_trial_early(3), False)
+
+        args.early_stopping_min_step = 0
+        args.early_stopping_min_trials = 5
+        nr_errors += is_equal("should_stop_trial_early with fewer than --early_stopping_min_trials other trials", should_stop_trial_early(3), False)
+    finally:
+        arg_result_names = old_result_names
+        arg_result_min_or_max = old_result_min_or_max
+
+        for key, value in old_early_stopping_args.items():
+            setattr(args, key, value)
+
+        EARLY_STOPPING_STATE["progress"] = old_progress
+
+    return nr_errors
+
+@beartype
+def test_execute_program_streaming() -> int:
+    """Runs small shell commands with execute_program_streaming, with stdout and stderr going to log files as in a job, and through the result file."""
+    import tempfile
+
+    global arg_result_names, arg_result_min_or_max
+
+    def _read_log(path: str) -> str:
+        with open(path, mode="r", encoding="utf-8") as f:
+            return f.read()
+
+    nr_errors: int = 0
+
+    old_result_names = arg_result_names
+    old_result_min_or_max = arg_result_min_or_max
+    old_max_output_tail_lines = args.max_output_tail_lines
+    old_early_stopping = args.early_stopping
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        stdout_log = f"{tmpdir}/0_0_log.out"
+        stderr_log = f"{tmpdir}/0_0_log.err"
+        result_channel_path = f"{tmpdir}/result_channel.jsonl"
+
+        try:
+            arg_result_names = ["RESULT"]
+            arg_result_min_or_max = ["min"]
+            args.max_output_tail_lines = 10
+            args.early_stopping = "none"
+
+            with open(stdout_log, mode="w", encoding="utf-8") as stdout_file, open(stderr_log, mode="w", encoding="utf-8") as stderr_file:
+                with contextlib.redirect_stdout(stdout_file), contextlib.redirect_stderr(stderr_file):
+                    stdout, stderr, exit_code, signal_code = execute_program_streaming('for i in $(seq 1 50); do echo "noise $i"; done; echo "RESULT: 1.5"; echo "OO-Info: host: test"; echo "error" >&2; for i in $(seq 51 100); do echo "noise $i"; done')
+
+            nr_errors += is_equal("execute_program_streaming exit code", exit_code, 0)
+            nr_errors += is_equal("execute_program_streaming signal", signal_code, None)
+            nr_errors += is_equal("execute_program_streaming only keeps the RESULT and OO-Info lines", stdout, "RESULT: 1.5\nOO-Info: host: test\n")
+            nr_errors += is_equal("execute_program_streaming: get_results of the kept lines", json.dumps(get_results(stdout)), json.dumps([1.5]))
+            nr_errors += is_equal("execute_program_streaming: extract_info of the kept lines", json.dumps(extract_info(stdout)), json.dumps([["OO_Info_host"], ["test"]]))
+            nr_errors += is_equal("execute_program_streaming writes all stdout lines to the log file", len(_read_log(stdout_log).splitlines()), 102)
+            nr_errors += is_equal("execute_program_streaming: get_results of the stdout log file", json.dumps(get_results(_read_log(stdout_log))), json.dumps([1.5]))
+            nr_errors += is_equal("execute_program_streaming writes stderr to the log file", _read_log(stderr_log), "error\n")
+            nr_errors += is_equal("execute_program_streaming stderr", stderr, "error\n")
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                exit_code = execute_program_streaming("echo 'RESULT: 2'; exit 3")[2]
+
+            nr_errors += is_equal("execute_program_streaming exit code of a failing program", exit_code, 3)
+
+            args.early_stopping = "median"
+
+            with open(stdout_log, mode="w", encoding="utf-8") as stdout_file:
+                with contextlib.redirect_stdout(stdout_file):
+                    stdout, _, exit_code, _ = execute_program_streaming('printf \'{"step": 1, "RESULT": 9}\\n{"RESULT": 2.5, "info": {"host": "test"}}\\n\' > "$OO_RESULT_FILE"; echo "RESULT: 7"', result_channel_path)
+
+            records = read_result_channel(result_channel_path)
+            channel_results, info = get_final_result_channel_values(records or [])
+
+            nr_errors += is_equal("execute_program_streaming with a result file: exit code", exit_code, 0)
+            nr_errors += is_equal("execute_program_streaming with a result file: records", len(records or []), 2)
+            nr_errors += is_equal("execute_program_streaming with a result file: results", get_results_from_run_function(channel_results, RESULT_CHANNEL_ENV_VAR)[0], 2.5)
+            nr_errors += is_equal("execute_program_streaming with a result file: info", json.dumps(info), json.dumps({"host": "test"}))
+            nr_errors += is_equal("read_result_channel removes the result file", os.path.exists(result_channel_path), False)
+            nr_errors += is_equal("execute_program_streaming with a result file: the RESULT line is still kept", stdout, "RESULT: 7\n")
+            nr_errors += is_equal("execute_program_streaming writes the step records of the result file as OO_PROGRESS lines", "OO_PROGRESS step=1 RESULT=9" in _read_log(stdout_log), True)
+            nr_errors += is_equal("read_result_channel without a result file", read_result_channel(result_channel_path), None)
+        finally:
+            arg_result_names = old_result_names
+            arg_result_min_or_max = old_result_min_or_max
+            args.max_output_tail_lines = old_max_output_tail_lines
+            args.early_stopping = old_early_stopping
+
+    return nr_errors
+
 @beartype
 def run_tests() -> None:
+    import tempfile
+
     print_red("This should be red")
     print_yellow("This should be yellow")
     print_green("This should be green")
@@ -6299,6 +10001,94 @@ def run_tests() -> None:
 
     nr_errors += is_equal('_count_sobol_or_completed("", "")', _count_sobol_or_completed("", ""), 0)
 
+    with tempfile.TemporaryDirectory() as _trial_events_dir:
+        _trial_events_csv = f"{_trial_events_dir}/{TRIAL_EVENTS_CSV_FILENAME}"
+
+        for _trial_index, _status, _result in [[0, "RUNNING", ""], [1, "RUNNING", ""], [0, "COMPLETED", 5.0], [1, "COMPLETED", 3.0]]:
+            write_trial_event_row(_trial_events_csv, {"trial_index": _trial_index, "arm_name": f"{_trial_index}_0", "trial_status": _status, "generation_method": "Sobol", "result": format_results_csv_value(_result), "x": _trial_index})
+
+        nr_errors += is_equal("trial event rows after RUNNING and COMPLETED", TRIAL_EVENTS_WRITER["nr_appended_rows"], 4)
+        nr_errors += is_equal("_count_done_jobs(trial events)", _count_done_jobs(_trial_events_csv), 2)
+        nr_errors += is_equal("get_best_params_from_csv(trial events, False)", json.dumps(get_best_params_from_csv(_trial_events_csv, False)), json.dumps({"result": "3.0", "parameters": {"arm_name": "1_0", "trial_status": "COMPLETED", "generation_method": "Sobol", "x": 1}}))
+
+    TRIAL_EVENTS_WRITER["nr_appended_rows"] = 0
+
+    with tempfile.TemporaryDirectory() as _job_infos_dir:
+        with open(f"{_job_infos_dir}/job_infos.csv", mode="w", encoding="utf-8") as _job_infos_file:
+            _job_infos_file.write("start_time,end_time,run_time,x\n0,1,1,0.1\n0,1,1,0.15\n0,100,100,0.85\n0,100,100,0.9\n")
+
+        _cost_search_space = SimpleNamespace(parameters={"x": RangeParameter(name="x", parameter_type=ParameterType.FLOAT, lower=0, upper=1)})
+        _log_runtimes = predict_log_runtimes(_cost_search_space, [{"x": 0.9}, {"x": 0.1}], read_job_infos_csv(f"{_job_infos_dir}/job_infos.csv"))
+
+        nr_errors += is_equal("predict_log_runtimes: the point near the fast trials is predicted faster", bool(_log_runtimes[1] < _log_runtimes[0]), True)
+        nr_errors += is_equal("get_cost_aware_order with equal expected improvements", json.dumps(get_cost_aware_order(np.array([1.0, 1.0]), _log_runtimes)), json.dumps([1, 0]))
+        nr_errors += is_equal("get_cost_aware_order with a much higher expected improvement", json.dumps(get_cost_aware_order(np.array([1000.0, 1.0]), _log_runtimes)), json.dumps([0, 1]))
+
+        _fidelity_search_space = SimpleNamespace(parameters={
+            "x": RangeParameter(name="x", parameter_type=ParameterType.FLOAT, lower=0, upper=1),
+            "epochs": RangeParameter(name="epochs", parameter_type=ParameterType.INT, lower=0, upper=100, is_fidelity=True, target_value=100)
+        })
+
+        for _run_times, _expected_intercept in [[[10, 55, 100, 55], 0.1111], [[100, 60, 20, 60], FIDELITY_COST_INTERCEPT_MAX], [[1000, 1000.5, 1001, 1000.5], FIDELITY_COST_INTERCEPT_MAX], [[0, 50, 100, 50], FIDELITY_COST_INTERCEPT_MIN]]:
+            with open(f"{_job_infos_dir}/job_infos.csv", mode="w", encoding="utf-8") as _job_infos_file:
+                _job_infos_file.write("start_time,end_time,run_time,x,epochs\n" + "".join(f"0,{run_time},{run_time},0.5,{epochs}\n" for run_time, epochs in zip(_run_times, [0, 50, 100, 50])))
+
+            nr_errors += is_equal(f"get_fidelity_cost_intercept with the run times {_run_times}", round(get_fidelity_cost_intercept(_fidelity_search_space, read_job_infos_csv(f"{_job_infos_dir}/job_infos.csv")), 4), _expected_intercept)
+
+        nr_errors += is_equal("get_fidelity_cost_intercept without a fidelity parameter", get_fidelity_cost_intercept(_cost_search_space, read_job_infos_csv(f"{_job_infos_dir}/job_infos.csv")), None)
+        nr_errors += is_equal("get_fidelity_cost_intercept with too few trials", get_fidelity_cost_intercept(_fidelity_search_space, read_job_infos_csv(f"{_job_infos_dir}/job_infos.csv").head(2)), None)
+
+    with tempfile.TemporaryDirectory() as _worker_pool_dir:
+        _worker_pool = WorkerPoolExecutor(None, _worker_pool_dir, 2)
+        write_json_file_atomically(f"{_worker_pool_dir}/queue/00000000.json", {"x": 1})
+
+        nr_errors += is_equal("claim_worker_pool_task", claim_worker_pool_task(_worker_pool_dir, 1), "00000000")
+        nr_errors += is_equal("claimed task is in claimed/", json.dumps(os.listdir(f"{_worker_pool_dir}/claimed")), json.dumps(["1__00000000.json"]))
+
+        _worker_pool.requeue_tasks_of_worker(0)
+        nr_errors += is_equal("requeue_tasks_of_worker of another worker", json.dumps(os.listdir(f"{_worker_pool_dir}/queue")), json.dumps([]))
+
+        _worker_pool.requeue_tasks_of_worker(1)
+        nr_errors += is_equal("requeue_tasks_of_worker moves the task back to queue/", json.dumps(os.listdir(f"{_worker_pool_dir}/queue")), json.dumps(["00000000.json"]))
+        nr_errors += is_equal("requeue_tasks_of_worker empties claimed/", json.dumps(os.listdir(f"{_worker_pool_dir}/claimed")), json.dumps([]))
+        nr_errors += is_equal("WorkerPoolExecutor.nr_requeued_tasks", _worker_pool.nr_requeued_tasks, 1)
+
+    reset_trial_ledger()
+    ledger_set_trial_status(0, "RUNNING", "Sobol")
+    ledger_set_trial_status(1, "RUNNING", "BoTorch")
+    ledger_set_trial_status(0, "COMPLETED")
+    ledger_set_trial_status(1, "FAILED")
+    nr_errors += is_equal('ledger_count_status("COMPLETED")', ledger_count_status("COMPLETED"), 1)
+    nr_errors += is_equal('ledger_count_status("FAILED")', ledger_count_status("FAILED"), 1)
+    nr_errors += is_equal('ledger_count_status("RUNNING")', ledger_count_status("RUNNING"), 0)
+    nr_errors += is_equal('ledger_count_completed_generation_method("Sobol")', ledger_count_completed_generation_method("Sobol"), 1)
+    nr_errors += is_equal('ledger_count_completed_generation_method("BoTorch")', ledger_count_completed_generation_method("BoTorch"), 0)
+    reset_trial_ledger()
+
+    _old_candidate_buffer = {key: CANDIDATE_BUFFER[key] for key in ["candidates", "nr_hits", "nr_misses", "nr_generated", "nr_stale"]}
+    _nr_of_results = args.pregenerate_max_new_results + 2
+
+    for i in range(_nr_of_results):
+        ledger_set_trial_status(i, "COMPLETED", "BoTorch")
+
+    CANDIDATE_BUFFER.update({"candidates": [
+        {"trial_index": 100, "params": {"x": 1}, "generated_at": time.time(), "nr_results_seen": _nr_of_results},
+        {"trial_index": 101, "params": {"x": 2}, "generated_at": time.time() - args.pregenerate_max_age - 1, "nr_results_seen": _nr_of_results},
+        {"trial_index": 102, "params": {"x": 3}, "generated_at": time.time(), "nr_results_seen": 0}
+    ], "nr_hits": 0, "nr_misses": 0, "nr_generated": 0, "nr_stale": 0})
+
+    nr_errors += is_equal("is_candidate_stale of a fresh candidate", is_candidate_stale(CANDIDATE_BUFFER["candidates"][0]), False)
+    nr_errors += is_equal("is_candidate_stale of a candidate older than --pregenerate_max_age", is_candidate_stale(CANDIDATE_BUFFER["candidates"][1]), True)
+    nr_errors += is_equal("is_candidate_stale of a candidate with too many new results", is_candidate_stale(CANDIDATE_BUFFER["candidates"][2]), True)
+    nr_errors += is_equal("pop_buffered_candidates only returns the fresh candidate", json.dumps(pop_buffered_candidates(3)), json.dumps({"100": {"x": 1}}))
+    nr_errors += is_equal("pop_buffered_candidates counts hits, misses and stale candidates", json.dumps([CANDIDATE_BUFFER["nr_hits"], CANDIDATE_BUFFER["nr_misses"], CANDIDATE_BUFFER["nr_stale"]]), json.dumps([1, 2, 2]))
+    nr_errors += is_equal("pop_buffered_candidates empties the buffer", len(CANDIDATE_BUFFER["candidates"]), 0)
+    nr_errors += is_equal("get_candidate_buffer_summary", get_candidate_buffer_summary(), "candidate buffer: 1 hits, 2 misses (33.3% hit rate), 0 generated, 2 discarded as stale")
+
+    CANDIDATE_BUFFER.update(_old_candidate_buffer)
+    CANDIDATE_BUFFER["wakeup"].clear()
+    reset_trial_ledger()
+
     plot_params = get_plot_commands('_command', {"type": "trial_index_result", "min_done_jobs": 2}, '_tmp', 'plot_type', 'tmp_file', "1200")
 
     nr_errors += is_equal('get_plot_commands', json.dumps(plot_params), json.dumps([['_command --save_to_file=tmp_file ', 'tmp_file', "1200"]]))
@@ -6366,6 +10156,14 @@ Exit-Code: 159
 
     nr_errors += is_equal('state_from_job("")', state_from_job(''), "None")
 
+    nr_errors += is_equal('parse_slurm_job_states("123|RUNNING\\n124|PENDING")', json.dumps(parse_slurm_job_states("123|RUNNING\n124|PENDING")), json.dumps({"123": "running", "124": "pending"}))
+    nr_errors += is_equal('parse_slurm_job_states("125|CANCELLED by 1000\\n125.batch|CANCELLED")', json.dumps(parse_slurm_job_states("125|CANCELLED by 1000\n125.batch|CANCELLED")), json.dumps({"125": "cancelled"}))
+
+    nr_errors += test_job_state_cache()
+    nr_errors += test_job_completion_event()
+    nr_errors += test_early_stopping()
+    nr_errors += test_execute_program_streaming()
+
     nr_errors += is_equal('print_image_to_cli("", "")', print_image_to_cli("", 1200), False)
     nr_errors += is_equal('print_image_to_cli(".tools/slimer.png", 200)', print_image_to_cli(".tools/slimer.png", 200), True)
 
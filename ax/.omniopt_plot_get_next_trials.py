@@ -33,7 +33,7 @@ signal.signal(signal.SIGINT, signal.SIG_DFL)
 @beartype
 def parse_log_file(args: Any, log_file_path: str) -> Union[pd.DataFrame, None]:
     try:
-        data = pd.read_csv(log_file_path, header=None, names=['time', 'got', 'requested'])
+        data = pd.read_csv(log_file_path, header=None, names=['time', 'got', 'requested', 'seconds'])
 
         valid_time_mask = data['time'].apply(helpers.is_valid_time_format)
         if not valid_time_mask.all():
@@ -0,0 +1,45 @@
+# Objective for --run_function, the same shekel function as .tests/optimization_example_all_float:
+#
+# ./omniopt ... --run_function=.tests/optimization_example_function.py:shekel --parameter x range -1000 1000 float ...
+#
+# or, for --batch_objective, with one row per trial:
+#
+# ./omniopt ... --run_function=.tests/optimization_example_function.py:shekel_batch --batch_objective ...
+#
+# https://www.sfu.ca/~ssurjano/shekel.html
+
+import numpy as np
+
+BETA = [b / 10 for b in [1, 2, 2, 4, 4, 6, 3, 7, 5, 5]]
+
+C = [
+    [4, 1, 8, 7, 3, 2, 5, 8, 6, 7],
+    [4, 1, 8, 6, 7, 9, 3, 1, 2, 3.6],
+    [4, 1, 8, 6, 3, 2, 5, 8, 6, 7],
+    [4, 1, 8, 6, 7, 9, 3, 1, 2, 3.6]
+]
+
+def shekel(parameters: dict) -> float:
+    args = [float(parameters[name]) for name in ["x", "y", "z", "a"]]
+
+    print(f"x: {args[0]}")
+    print(f"y: {args[1]}")
+    print(f"z: {args[2]}")
+    print(f"a: {args[3]}")
+
+    outer_sum = 0.0
+
+    for i, beta in enumerate(BETA):
+        inner_sum = sum((args[j] - C[j][i]) ** 2 for j in range(len(args)))
+        outer_sum += 1 / (inner_sum + beta)
+
+    return -outer_sum
+
+def shekel_batch(parameters: np.ndarray) -> np.ndarray:
+    # parameters has one row per trial and the columns x, y, z, a
+    c = np.array(C)
+    beta = np.array(BETA)
+
+    inner_sums = ((parameters[:, :, None] - c[None, :, :]) ** 2).sum(axis=1)
+
+    return -(1 / (inner_sums + beta[None, :])).sum(axis=1)